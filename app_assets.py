@@ -0,0 +1,260 @@
+"""
+Static HTML, CSS and JavaScript for the Streamlit app.
+
+Kept out of app.py so they are built once per process (Streamlit re-executes
+app.py on every rerun, but imported modules stay loaded).
+"""
+
+WELCOME_MESSAGE = (
+    "¡Bienvenido a Luisquisite! Welcome to Luisquisite! I'm your robot waitress. "
+    "How can I help you today? Would you like to see our menu?"
+)
+
+CSS = """
+    <style>
+    .main-header {
+        text-align: center;
+        padding: 2rem 0;
+        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        border-radius: 10px;
+        margin-bottom: 2rem;
+    }
+    .waitress-message {
+        background-color: #e3f2fd;
+        padding: 1rem;
+        border-radius: 10px;
+        border-left: 4px solid #2196f3;
+        margin: 1rem 0;
+    }
+    .customer-message {
+        background-color: #f3e5f5;
+        padding: 1rem;
+        border-radius: 10px;
+        border-left: 4px solid #9c27b0;
+        margin: 1rem 0;
+    }
+    .order-summary {
+        background-color: #fff3e0;
+        padding: 1.5rem;
+        border-radius: 10px;
+        border: 2px solid #ff9800;
+        margin: 1rem 0;
+    }
+    </style>
+"""
+
+HEADER_HTML = """
+    <div class="main-header">
+        <h1>🤖 Luisquisite Robot Waitress</h1>
+        <p>📍 Cartagena, Colombia | Voice-Powered Ordering System</p>
+    </div>
+"""
+
+# Browser text-to-speech for the 🔊 buttons on waitress messages
+TTS_SCRIPT = """
+    <script>
+        function speakText(text, elementId) {
+            if ('speechSynthesis' in window) {
+                // Cancel any ongoing speech
+                window.speechSynthesis.cancel();
+                
+                const utterance = new SpeechSynthesisUtterance(text);
+                utterance.lang = 'es-CO'; // Spanish (Colombia) with English fallback
+                utterance.rate = 0.9;
+                utterance.pitch = 1.0;
+                utterance.volume = 1.0;
+                
+                // Try to find a Spanish voice
+                const voices = window.speechSynthesis.getVoices();
+                const spanishVoice = voices.find(voice => 
+                    voice.lang.startsWith('es') || voice.lang.includes('Spanish')
+                );
+                if (spanishVoice) {
+                    utterance.voice = spanishVoice;
+                }
+                
+                utterance.onstart = function() {
+                    const btn = document.querySelector(`#${elementId} button`);
+                    if (btn) {
+                        btn.textContent = '⏸️ Speaking...';
+                        btn.style.background = '#4caf50';
+                    }
+                };
+                
+                utterance.onend = function() {
+                    const btn = document.querySelector(`#${elementId} button`);
+                    if (btn) {
+                        btn.textContent = '🔊 Speak';
+                        btn.style.background = '#2196f3';
+                    }
+                };
+                
+                utterance.onerror = function(event) {
+                    const btn = document.querySelector(`#${elementId} button`);
+                    if (btn) {
+                        btn.textContent = '🔊 Speak';
+                        btn.style.background = '#2196f3';
+                    }
+                    console.error('Speech synthesis error:', event);
+                };
+                
+                window.speechSynthesis.speak(utterance);
+            } else {
+                alert('Text-to-speech is not supported in this browser.');
+            }
+        }
+        
+        // Load voices when available
+        if ('speechSynthesis' in window) {
+            window.speechSynthesis.onvoiceschanged = function() {
+                // Voices loaded
+            };
+        }
+    </script>
+    """
+
+# Voice input button; injects the transcript into the text input
+VOICE_INPUT_HTML = """
+    <div style="margin-bottom: 1rem;">
+        <button id="voiceBtn" style="
+            padding: 0.75rem 1.5rem;
+            font-size: 1rem;
+            background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            border: none;
+            border-radius: 8px;
+            cursor: pointer;
+            width: 100%;
+            margin-bottom: 0.5rem;
+            font-weight: bold;
+        ">🎤 Click to Speak</button>
+        <div id="status" style="text-align: center; color: #666; font-size: 0.9rem; min-height: 1.5rem;"></div>
+    </div>
+    <script>
+        (function() {
+            const voiceBtn = document.getElementById('voiceBtn');
+            const status = document.getElementById('status');
+            let recognition = null;
+            let isListening = false;
+            
+            // Find the Streamlit text input
+            function findTextInput() {
+                const inputs = document.querySelectorAll('input[type="text"]');
+                for (let input of inputs) {
+                    if (input.placeholder && input.placeholder.includes('salmon bowl')) {
+                        return input;
+                    }
+                }
+                // Fallback: find last text input
+                return inputs[inputs.length - 1];
+            }
+            
+            // Check if browser supports speech recognition
+            if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {
+                const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
+                recognition = new SpeechRecognition();
+                recognition.continuous = false;
+                recognition.interimResults = false;
+                recognition.lang = 'es-CO,en-US'; // Spanish (Colombia) and English
+                
+                recognition.onstart = function() {
+                    isListening = true;
+                    voiceBtn.textContent = '🛑 Listening... Click to Stop';
+                    voiceBtn.style.background = 'linear-gradient(90deg, #f44336 0%, #e91e63 100%)';
+                    status.textContent = '🎤 Listening... Speak now!';
+                    status.style.color = '#f44336';
+                };
+                
+                recognition.onresult = function(event) {
+                    const transcript = event.results[0][0].transcript;
+                    const textInput = findTextInput();
+                    if (textInput) {
+                        textInput.value = transcript;
+                        // Trigger input event to update Streamlit
+                        textInput.dispatchEvent(new Event('input', { bubbles: true }));
+                        textInput.dispatchEvent(new Event('change', { bubbles: true }));
+                    }
+                    status.textContent = '✅ Heard: "' + transcript + '" - Click Send to submit';
+                    status.style.color = '#4caf50';
+                };
+                
+                recognition.onerror = function(event) {
+                    status.textContent = '❌ Error: ' + event.error + ' (Make sure to allow microphone access)';
+                    status.style.color = '#f44336';
+                    isListening = false;
+                    voiceBtn.textContent = '🎤 Click to Speak';
+                    voiceBtn.style.background = 'linear-gradient(90deg, #667eea 0%, #764ba2 100%)';
+                };
+                
+                recognition.onend = function() {
+                    isListening = false;
+                    voiceBtn.textContent = '🎤 Click to Speak';
+                    voiceBtn.style.background = 'linear-gradient(90deg, #667eea 0%, #764ba2 100%)';
+                    if (status.textContent.indexOf('Heard:') === -1 && status.textContent.indexOf('Error') === -1) {
+                        status.textContent = '⏹️ Stopped listening';
+                        status.style.color = '#666';
+                    }
+                };
+                
+                voiceBtn.addEventListener('click', function() {
+                    if (isListening) {
+                        recognition.stop();
+                    } else {
+                        status.textContent = '🎤 Starting...';
+                        status.style.color = '#667eea';
+                        try {
+                            recognition.start();
+                        } catch(e) {
+                            status.textContent = '❌ Error: ' + e.message;
+                            status.style.color = '#f44336';
+                        }
+                    }
+                });
+            } else {
+                voiceBtn.textContent = '❌ Voice not supported in this browser';
+                voiceBtn.disabled = true;
+                voiceBtn.style.background = '#ccc';
+                status.textContent = 'Please use Chrome, Edge, or Safari for voice input';
+                status.style.color = '#f44336';
+            }
+        })();
+    </script>
+    """
+
+FOOTER_HTML = """
+    <div style="text-align: center; color: #666; padding: 2rem;">
+        <p>🤖 Luisquisite Robot Waitress | Built with Streamlit</p>
+        <p>Supports English and Spanish (Español) | <a href="https://github.com/ledp1/luisquisite" target="_blank">View on GitHub</a></p>
+    </div>
+"""
+
+
+def message_html(kind, text, message_id):
+    """
+    HTML for one conversation message, built once when it is added.
+    
+    Args:
+        kind: 'waitress' or 'customer'
+        text: Message text
+        message_id: DOM id for the message (used by the speak button)
+    """
+    if kind == 'waitress':
+        # Escape text for JavaScript
+        escaped_text = text.replace("'", "\\'").replace('"', '\\"').replace('\n', ' ')
+        return f"""
+            <div class="waitress-message" id="{message_id}">
+                <strong>🤖 Waitress:</strong> {text}
+                <button onclick="speakText('{escaped_text}', '{message_id}')" 
+                        style="float: right; background: #2196f3; color: white; border: none; 
+                               border-radius: 4px; padding: 0.25rem 0.5rem; cursor: pointer; 
+                               font-size: 0.8rem; margin-left: 0.5rem;">
+                    🔊 Speak
+                </button>
+            </div>
+        """
+    return f"""
+            <div class="customer-message">
+                <strong>👤 Customer:</strong> {text}
+            </div>
+        """
@@ -0,0 +1,174 @@
+"""
+Always-open microphone capture for the Luisquisite voice agent.
+
+A capture thread keeps one input stream open and writes every chunk into a
+fixed-size ring buffer, so nothing said between two listen() calls is lost
+and no turn pays for reopening the device. Readers keep their own position
+in the ring and get chunks as memoryview slices of it, without copying.
+"""
+
+import threading
+
+
+class AudioRing:
+    """
+    Fixed-size ring of equally sized audio chunks.
+    
+    Chunks are numbered by a running sequence number; chunk n lives in slot
+    n % chunks until it is overwritten chunks writes later. Each chunk also
+    records whether the waitress was talking when it was captured.
+    """
+    
+    def __init__(self, chunk_bytes, chunks):
+        self.chunk_bytes = chunk_bytes
+        self.chunks = chunks
+        self._buffer = bytearray(chunk_bytes * chunks)
+        self._view = memoryview(self._buffer)
+        self._speaking = bytearray(chunks)
+        self.written = 0  # Sequence number of the next chunk
+        self.closed = False
+        self._changed = threading.Condition()
+    
+    @property
+    def oldest(self):
+        """Sequence number of the oldest chunk still in the ring."""
+        return max(0, self.written - self.chunks)
+    
+    def write(self, data, speaking=False):
+        """Copy one chunk into the ring (short chunks are padded with silence)."""
+        slot = self.written % self.chunks
+        offset = slot * self.chunk_bytes
+        size = min(len(data), self.chunk_bytes)
+        self._view[offset:offset + size] = memoryview(data)[:size]
+        if size < self.chunk_bytes:
+            self._view[offset + size:offset + self.chunk_bytes] = bytes(self.chunk_bytes - size)
+        self._speaking[slot] = speaking
+        with self._changed:
+            self.written += 1
+            self._changed.notify_all()
+    
+    def close(self):
+        with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+    
+    def wait_for(self, seq, timeout=None):
+        """Block until chunk seq has been written; False if closed or timed out."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.written > seq or self.closed, timeout) and self.written > seq
+    
+    def chunk(self, seq):
+        """(memoryview, speaking) for a chunk; valid until it is overwritten."""
+        slot = seq % self.chunks
+        offset = slot * self.chunk_bytes
+        return self._view[offset:offset + self.chunk_bytes], bool(self._speaking[slot])
+    
+    def extract(self, start, end):
+        """Chunks start..end-1 as one bytes object (at most two slices)."""
+        start = max(start, self.oldest)
+        if end <= start:
+            return b""
+        first = (start % self.chunks) * self.chunk_bytes
+        last = (end % self.chunks) * self.chunk_bytes or len(self._buffer)
+        if first < last:
+            return self._view[first:last].tobytes()
+        return self._view[first:].tobytes() + self._view[:last].tobytes()
+
+
+class CaptureReader:
+    """A position in an AudioCapture's ring, read chunk by chunk."""
+    
+    def __init__(self, capture, position):
+        self.capture = capture
+        self.position = position
+    
+    @property
+    def SAMPLE_RATE(self):
+        return self.capture.SAMPLE_RATE
+    
+    @property
+    def SAMPLE_WIDTH(self):
+        return self.capture.SAMPLE_WIDTH
+    
+    @property
+    def CHUNK(self):
+        return self.capture.CHUNK
+    
+    def read(self):
+        """
+        Next chunk, blocking until it is captured.
+        
+        Returns:
+            tuple: (memoryview, speaking), or (None, False) once capture stops
+        """
+        ring = self.capture.ring
+        if not ring.wait_for(self.position):
+            return None, False
+        if self.position < ring.oldest:
+            lost = ring.oldest - self.position
+            print(f"⚠️ Audio reader fell behind, skipped {lost * self.CHUNK / self.SAMPLE_RATE:.1f}s")
+            self.position = ring.oldest
+        chunk = ring.chunk(self.position)
+        self.position += 1
+        return chunk
+
+
+class AudioCapture:
+    """Capture thread writing a microphone into an AudioRing."""
+    
+    def __init__(self, microphone, is_speaking=None, seconds=30):
+        """
+        Args:
+            microphone: sr.Microphone (or any source with the same interface)
+            is_speaking: Callable telling whether the waitress is talking,
+                recorded with each chunk
+            seconds: Audio kept in the ring; must exceed the longest phrase
+        """
+        self.microphone = microphone
+        self.is_speaking = is_speaking or (lambda: False)
+        self.seconds = seconds
+        self.ring = None
+        self.error = None
+        self._started = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Open the stream on the capture thread; raise if it fails to open."""
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self.error is not None:
+            raise self.error
+    
+    def _run(self):
+        try:
+            with self.microphone as source:
+                self.SAMPLE_RATE = source.SAMPLE_RATE
+                self.SAMPLE_WIDTH = source.SAMPLE_WIDTH
+                self.CHUNK = source.CHUNK
+                chunk_bytes = source.CHUNK * source.SAMPLE_WIDTH
+                chunks = max(1, int(self.seconds * source.SAMPLE_RATE / source.CHUNK))
+                self.ring = ring = AudioRing(chunk_bytes, chunks)
+                self._started.set()
+                read = source.stream.read
+                while not self._stop.is_set():
+                    data = read(source.CHUNK)
+                    if not data:
+                        break
+                    ring.write(data, self.is_speaking())
+        except Exception as e:
+            self.error = e
+        finally:
+            self._started.set()
+            if self.ring is not None:
+                self.ring.close()
+    
+    def reader(self, preroll=0):
+        """A reader starting preroll chunks before the newest audio."""
+        return CaptureReader(self, max(self.ring.oldest, self.ring.written - preroll))
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,5 @@
+"""
+Benchmarks and regression checks for Luisquisite.
+
+Run from the repository root, e.g. ``python -m benchmarks.intent_regression``.
+"""
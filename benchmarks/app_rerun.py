@@ -0,0 +1,73 @@
+"""
+Streamlit rerun time against conversation length.
+
+Drives app.py headlessly with streamlit.testing's AppTest, preloads a
+conversation of each size, and times a full rerun and a message send. With
+paged, capped history both should stay flat as the conversation grows.
+
+Usage:
+    python -m benchmarks.app_rerun [--sizes 0,100,500] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from app_assets import message_html
+from web_session import WebSession
+
+
+def render_message(kind, text, index):
+    return message_html(kind, text, f"{kind}_msg_{index}")
+
+
+def preloaded_session(size):
+    """A web session with a conversation of size messages."""
+    session = WebSession(render=render_message)
+    session.handler.greeting_said = True
+    for idx in range(size):
+        kind = 'customer' if idx % 2 == 0 else 'waitress'
+        text = "I'd like a tuna bowl" if kind == 'customer' else "Great! I've added Tuna Bowl to your order. Anything else?"
+        session.history.append(kind, text, render_message(kind, text, idx))
+    return session
+
+
+def timed(action, repeat):
+    """Median seconds of action() over repeat runs."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="0,100,500", help="conversation lengths (messages)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    print(f"{'messages':>9} {'rerun':>10} {'send':>10}")
+    for size in (int(part) for part in args.sizes.split(",")):
+        app = AppTest.from_file("app.py", default_timeout=30)
+        app.run()
+        app.session_state.session = preloaded_session(size)
+        
+        rerun = timed(app.run, args.repeat)
+        
+        def send():
+            app.text_input(key="text_input").input("what did I order?")
+            next(button for button in app.button if button.label == "📤 Send").click()
+            app.run()
+        
+        send_time = timed(send, args.repeat)
+        if app.exception:
+            raise SystemExit(f"app raised: {app.exception}")
+        print(f"{size:>9} {rerun * 1e3:>7.1f} ms {send_time * 1e3:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
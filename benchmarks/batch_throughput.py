@@ -0,0 +1,71 @@
+"""
+Transcript replay throughput: naive process_input loop vs. process_batch.
+
+Usage:
+    python -m benchmarks.batch_throughput [--sessions 5000] [--processes N]
+"""
+
+import argparse
+import os
+import time
+
+from menu import MENU
+from order_handler import OrderHandler
+from benchmarks.synthetic import synthetic_transcripts
+
+
+def naive_replay(turns):
+    """One OrderHandler per session, process_input one string at a time."""
+    handlers = {}
+    results = []
+    for session_id, text in turns:
+        handler = handlers.get(session_id)
+        if handler is None:
+            handler = handlers[session_id] = OrderHandler()
+        response, should_continue = handler.process_input(text)
+        results.append((session_id, response, should_continue, handler.last_items))
+    return results
+
+
+def timed(label, func, turns):
+    """Run a replay strategy and print turns per second."""
+    start = time.perf_counter()
+    results = func(turns)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {len(turns) / elapsed:>12,.0f} turns/s  ({elapsed:.2f} s)")
+    return results
+
+
+def by_session(results):
+    """Group results by session so differently ordered runs can be compared."""
+    grouped = {}
+    for result in results:
+        grouped.setdefault(result[0], []).append(result)
+    return grouped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    turns = synthetic_transcripts(args.sessions, MENU, seed=args.seed)
+    print(f"{args.sessions} sessions, {len(turns)} turns")
+    
+    naive = timed("naive loop", naive_replay, turns)
+    batch = timed("process_batch", lambda t: list(OrderHandler.process_batch(t)), turns)
+    pooled = timed(
+        f"process_batch x{args.processes}",
+        lambda t: list(OrderHandler.process_batch(t, processes=args.processes)),
+        turns,
+    )
+    
+    assert batch == naive, "inline batch diverged from process_input"
+    assert by_session(pooled) == by_session(naive), "process pool diverged from process_input"
+    print("all strategies produced identical results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Regression table: compiled intent matcher vs. the original keyword scans.
+
+Usage:
+    python -m benchmarks.intent_regression
+"""
+
+import sys
+import timeit
+
+from menu import MENU
+from order_handler import OrderHandler
+
+
+# Bilingual utterances as they come back from speech recognition
+CORPUS = [
+    "hola",
+    "hello there",
+    "hi, can I see the menu?",
+    "buenos días",
+    "menu please",
+    "el menú por favor",
+    "what dishes do you have",
+    "qué platos tienen",
+    "what do you have today",
+    "qué tienen hoy",
+    "i want a salmon bowl",
+    "I'd like a tuna bowl and a kiwi brunch",
+    "quiero un salmon bowl",
+    "me gustaría pedir el kiwi brunch",
+    "dame dos tuna bowls",
+    "give me the salmon bowl please",
+    "i want a pizza",
+    "order one kiwi brunch",
+    "yes",
+    "sí, eso es todo",
+    "that's all",
+    "confirmar",
+    "listo",
+    "confirm my order",
+    "cancel",
+    "cancelar todo",
+    "start over",
+    "empezar de nuevo",
+    "no thanks",
+    "nada más",
+    "what did i order",
+    "qué pedí",
+    "mi pedido",
+    "what's my order",
+    "this is nice",
+    "the weather is great",
+    "kiwi brunch",
+    "salmon",
+    "",
+    "   ",
+    "uh",
+    "anything with tuna?",
+    "¿tienen algo sin gluten?",
+    "show me something",
+]
+
+
+def legacy_intent(text, greeting_said=True):
+    """Intent chosen by the original chain of any(...) scans in process_input."""
+    if not text:
+        return None
+    text_lower = text.lower().strip()
+    if not greeting_said or any(word in text_lower for word in ["hola", "hello", "hi", "buenos"]):
+        return "greeting"
+    if any(word in text_lower for word in ["menu", "menú", "dishes", "platos", "what do you have", "qué tienen"]):
+        return "menu"
+    order_keywords = ["quiero", "i want", "i'd like", "order", "pedir", "me gustaría", "dame", "give me"]
+    if any(keyword in text_lower for keyword in order_keywords):
+        return "order"
+    if any(word in text_lower for word in ["yes", "sí", "confirm", "confirmar", "that's all", "eso es todo", "listo"]):
+        return "confirm"
+    if any(word in text_lower for word in ["cancel", "cancelar", "start over", "empezar de nuevo", "no", "nada"]):
+        return "cancel"
+    if any(word in text_lower for word in ["what did i order", "qué pedí", "my order", "mi pedido"]):
+        return "summary"
+    return "fallback"
+
+
+def legacy_dishes(text):
+    """Dish keys found by the original per-MENU substring scan in _handle_order."""
+    text_lower = text.lower().strip()
+    return tuple(
+        key for key, item in MENU.items()
+        if key in text_lower or item["name"].lower() in text_lower
+    )
+
+
+def build_table():
+    """Compare legacy and compiled results for every corpus utterance."""
+    rows = []
+    for greeting_said in (False, True):
+        handler = OrderHandler()
+        handler.greeting_said = greeting_said
+        for text in CORPUS:
+            old_intent = legacy_intent(text, greeting_said)
+            new_intent = handler.detect_intent(text)
+            old_dishes = legacy_dishes(text)
+            new_dishes = handler.matcher.scan(text.lower().strip()).dishes
+            same = old_intent == new_intent and old_dishes == new_dishes
+            rows.append((greeting_said, text, old_intent, new_intent, ", ".join(new_dishes), same))
+    return rows
+
+
+def print_table(rows):
+    """Print the regression table in Markdown."""
+    print("| greeted | utterance | legacy | compiled | dishes | same |")
+    print("|---|---|---|---|---|---|")
+    for greeting_said, text, old_intent, new_intent, dishes, same in rows:
+        print(f"| {greeting_said} | {text!r} | {old_intent} | {new_intent} | {dishes} | {'✅' if same else '❌'} |")
+
+
+def time_both(number=2000):
+    """Time one pass over the corpus with each implementation."""
+    handler = OrderHandler()
+    handler.greeting_said = True
+    legacy = timeit.timeit(
+        lambda: [(legacy_intent(t), legacy_dishes(t)) for t in CORPUS], number=number
+    )
+    compiled = timeit.timeit(
+        lambda: [handler.detect_intent(t) for t in CORPUS], number=number
+    )
+    per_turn = number * len(CORPUS)
+    print()
+    print(f"legacy:   {legacy / per_turn * 1e6:.2f} µs/utterance")
+    print(f"compiled: {compiled / per_turn * 1e6:.2f} µs/utterance")
+
+
+def main():
+    rows = build_table()
+    print_table(rows)
+    mismatches = [row for row in rows if not row[-1]]
+    print()
+    print(f"{len(rows) - len(mismatches)}/{len(rows)} utterances match")
+    time_both()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
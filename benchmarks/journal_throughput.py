@@ -0,0 +1,91 @@
+"""
+Order journal throughput and the latency it adds to confirmations.
+
+Many sessions (threads) each take and confirm orders through OrderHandler,
+once without a journal and once with an OrderJournal in a temporary
+directory. Reports confirmation-turn latency, sustained orders per minute,
+and how many commits the writer needed (group commit batches).
+
+Usage:
+    python -m benchmarks.journal_throughput [--sessions 32] [--orders 200]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from menu import MENU
+from order_handler import OrderHandler
+from order_journal import OrderJournal
+
+
+def session(orders, seed, journal, latencies):
+    """One table confirming orders back to back; records confirm-turn latency."""
+    rng = random.Random(seed)
+    names = [item['name'].lower() for item in MENU.values()]
+    handler = OrderHandler(journal=journal)
+    handler.greeting_said = True
+    for _ in range(orders):
+        handler.process_input(f"quiero {rng.randint(1, 3)} {rng.choice(names)}")
+        start = time.perf_counter()
+        handler.process_input("that's all")
+        latencies.append(time.perf_counter() - start)
+        handler.greeting_said = True
+
+
+def run(sessions, orders, journal):
+    latencies = []
+    threads = [
+        threading.Thread(target=session, args=(orders, seed, journal, latencies))
+        for seed in range(sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if journal is not None:
+        journal.flush()
+    return latencies, time.perf_counter() - start
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=32, help="concurrent sessions")
+    parser.add_argument("--orders", type=int, default=200, help="orders confirmed per session")
+    args = parser.parse_args()
+    
+    total = args.sessions * args.orders
+    print(f"{total} confirmations from {args.sessions} sessions")
+    print(f"{'':>12} {'p50':>9} {'p99':>9} {'orders/min':>12}")
+    baseline, _ = run(args.sessions, args.orders, None)
+    baseline.sort()
+    print(f"{'no journal':>12} {percentile(baseline, 0.5) * 1e6:>6.0f} µs "
+          f"{percentile(baseline, 0.99) * 1e6:>6.0f} µs {'':>12}")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        journal = OrderJournal(os.path.join(directory, "orders.db"))
+        latencies, elapsed = run(args.sessions, args.orders, journal)
+        latencies.sort()
+        print(f"{'journal':>12} {percentile(latencies, 0.5) * 1e6:>6.0f} µs "
+              f"{percentile(latencies, 0.99) * 1e6:>6.0f} µs {total / elapsed * 60:>12,.0f}")
+        stored = len(journal.orders_between(0))
+        print(f"commits:     {journal.batches} for {journal.committed} orders "
+              f"({journal.committed / max(journal.batches, 1):.1f} per commit)")
+        journal.close()
+    if stored != total:
+        raise SystemExit(f"journal has {stored} orders, expected {total}")
+    print(f"stored:      {stored} orders, mean confirm {statistics.mean(latencies) * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
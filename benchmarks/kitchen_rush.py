@@ -0,0 +1,118 @@
+"""
+Kitchen dispatch under a synthetic dinner rush.
+
+Orders arrive at random (Poisson) for a stretch of simulated time and are
+dispatched to a Kitchen worked by SimulatedKitchen cooks. When a station is
+full the order is turned away with a retry estimate and comes back then, as
+a customer would. Reports throughput, ticket times, how far quotes were off,
+and per-station queue depth and utilization, to size stations.
+
+Simulated time runs --speed times faster than real time.
+
+Usage:
+    python -m benchmarks.kitchen_rush [--rate 0.5] [--minutes 60] [--speed 600]
+                                      [--bowl-cooks 2] [--brunch-cooks 2]
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import time
+
+from kitchen import DEFAULT_STATIONS, Kitchen, KitchenBusy, SimulatedKitchen, scaled_clock
+from menu import MENU
+
+
+def random_order(rng):
+    """One table's order: 1-3 dishes, 1-2 of each."""
+    keys = rng.sample(list(MENU), rng.randint(1, min(3, len(MENU))))
+    return [(key, rng.choice((1, 1, 2))) for key in keys]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=0.5, help="orders per simulated minute")
+    parser.add_argument("--minutes", type=float, default=60, help="length of the rush (simulated)")
+    parser.add_argument("--speed", type=float, default=600, help="simulated seconds per real second")
+    parser.add_argument("--bowl-cooks", type=int, default=DEFAULT_STATIONS["bowls"]["cooks"])
+    parser.add_argument("--brunch-cooks", type=int, default=DEFAULT_STATIONS["brunch"]["cooks"])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    stations = {name: dict(config) for name, config in DEFAULT_STATIONS.items()}
+    stations["bowls"]["cooks"] = args.bowl_cooks
+    stations["brunch"]["cooks"] = args.brunch_cooks
+    clock = scaled_clock(args.speed)
+    kitchen = Kitchen(stations=stations, clock=clock)
+    cooks = SimulatedKitchen(kitchen, speed=args.speed, seed=args.seed).start()
+    rng = random.Random(args.seed)
+    
+    start = clock()
+    end = start + args.minutes * 60
+    # (due time, sequence, order): new arrivals and customers coming back
+    pending = []
+    sequence = 0
+    arrival = start
+    while arrival < end:
+        arrival += rng.expovariate(args.rate / 60)
+        heapq.heappush(pending, (arrival, sequence, random_order(rng)))
+        sequence += 1
+    
+    tickets = []
+    turned_away = 0
+    depth_samples = {name: [] for name in kitchen.stations}
+    next_sample = start
+    while pending:
+        due = min(pending[0][0], next_sample)
+        delay = (due - clock()) / args.speed
+        if delay > 0:
+            time.sleep(delay)
+        if next_sample <= pending[0][0]:
+            for name, station in kitchen.stats()["stations"].items():
+                depth_samples[name].append(station["depth"])
+            next_sample += 60
+            continue
+        _, number, entries = heapq.heappop(pending)
+        try:
+            tickets.append(kitchen.dispatch(entries))
+        except KitchenBusy as busy:
+            turned_away += 1
+            heapq.heappush(pending, (clock() + max(busy.retry_after, 30), number, entries))
+    
+    for ticket in tickets:
+        ticket.wait()
+    elapsed = clock() - start
+    cooks.stop()
+    stats = kitchen.stats()
+    
+    items = sum(quantity for ticket in tickets for _, quantity in ticket.entries)
+    waits = sorted(kitchen.ticket_seconds)
+    errors = sorted(kitchen.quote_errors)
+    print(f"{len(tickets)} orders ({items} dishes) over {args.minutes:.0f} simulated minutes "
+          f"at {args.rate:g}/min; drained after {elapsed / 60:.0f} min")
+    print(f"throughput:  {items / (elapsed / 60):.2f} dishes/min")
+    print(f"turned away: {turned_away} time(s), all came back and were accepted")
+    print(f"ticket time: p50 {percentile(waits, 0.5) / 60:.1f} min, p95 {percentile(waits, 0.95) / 60:.1f} min, "
+          f"max {waits[-1] / 60 if waits else 0:.1f} min")
+    print(f"quote error: p50 {percentile(errors, 0.5) / 60:+.1f} min, p5 {percentile(errors, 0.05) / 60:+.1f} min, "
+          f"p95 {percentile(errors, 0.95) / 60:+.1f} min (actual - quoted)")
+    print()
+    print(f"{'station':>8} {'cooks':>6} {'depth avg':>10} {'max':>5} {'dishes':>7} {'per batch':>10} {'busy':>6}")
+    for name, station in stats["stations"].items():
+        samples = depth_samples[name]
+        per_batch = station["items_done"] / max(station["batches_done"], 1)
+        print(f"{name:>8} {kitchen.stations[name].cooks:>6} {statistics.mean(samples):>10.1f} "
+              f"{station['max_depth']:>5} {station['items_done']:>7} {per_batch:>10.1f} "
+              f"{station['utilization']:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
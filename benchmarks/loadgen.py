@@ -0,0 +1,327 @@
+"""
+Conversation load generator and replay harness.
+
+Plays bilingual conversations (greet, menu, orders, check, confirm, cancel)
+against OrderHandler in-process or against a session server speaking the
+server.py /turn API, and reports throughput, per-turn latency percentiles
+and errors. Runs are seeded, so the same arguments replay the same load,
+and results can be saved and compared:
+
+    python -m benchmarks.loadgen --concurrency 200 --out before.json
+    # ...change the code...
+    python -m benchmarks.loadgen --concurrency 200 --out after.json --compare before.json
+
+Load is either closed (--concurrency tables, each starting a new
+conversation when one ends) or open (--rate new conversations per second,
+Poisson arrivals, at most --concurrency at once). --think-time adds a
+random pause (exponential, this mean) between a table's turns.
+
+Conversations are synthetic (benchmarks/synthetic.py) or replayed from a
+recorded JSON-lines file with one {"session_id", "text"[, "language"]}
+object per turn, in conversation order.
+
+Usage:
+    python -m benchmarks.loadgen [--target direct|serve|URL] [--conversations 2000]
+                                 [--concurrency 100] [--rate R] [--think-time S]
+                                 [--replay FILE] [--out FILE] [--compare BASELINE]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.server_load import free_port, percentile, request, wait_until_up
+from benchmarks.suite import git_revision
+from benchmarks.synthetic import synthetic_conversation
+from menu import MENU
+from order_handler import OrderHandler
+
+
+class DirectTarget:
+    """OrderHandler in this process; each table gets its own handler."""
+    
+    name = "direct"
+    
+    async def open(self, session_id):
+        return OrderHandler()
+    
+    async def turn(self, handler, session_id, text, language=None):
+        _, should_continue = handler.process_input(text, language)
+        if not should_continue:
+            handler.reset()
+    
+    async def close(self, handler):
+        pass
+
+
+class HttpTarget:
+    """A session server's /turn API, one keep-alive connection per table."""
+    
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.name = f"http://{host}:{port}"
+    
+    async def open(self, session_id):
+        return await asyncio.open_connection(self.host, self.port)
+    
+    async def turn(self, connection, session_id, text, language=None):
+        payload = {"session_id": session_id, "text": text}
+        if language:
+            payload["language"] = language
+        status, body = await request(*connection, "POST", "/turn", payload)
+        if status != 200:
+            raise RuntimeError(f"HTTP {status}: {body}")
+    
+    async def close(self, connection):
+        connection[1].close()
+
+
+def load_replay(path):
+    """Recorded conversations from a JSON-lines file: [[(text, language), ...], ...]."""
+    sessions = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                turn = json.loads(line)
+                sessions.setdefault(turn["session_id"], []).append((turn.get("text"), turn.get("language")))
+    return list(sessions.values())
+
+
+class LoadRun:
+    """One load run: conversations played against a target, and what was measured."""
+    
+    def __init__(self, target, conversations, concurrency=100, rate=None, think_time=0.0, seed=0):
+        self.target = target
+        self.conversations = conversations
+        self.concurrency = concurrency
+        self.rate = rate
+        self.think_time = think_time
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.errors = 0
+        self.completed = 0
+        self.elapsed = 0.0
+    
+    async def play(self, number, turns):
+        """Play one conversation as its own table."""
+        session_id = f"load-{number}"
+        # Each table draws think times from its own seeded stream, so runs
+        # repeat regardless of how tasks interleave
+        rng = random.Random(self.seed * 1_000_003 + number)
+        try:
+            connection = await self.target.open(session_id)
+        except OSError:
+            self.errors += 1
+            return
+        try:
+            for idx, (text, language) in enumerate(turns):
+                if idx and self.think_time:
+                    await asyncio.sleep(rng.expovariate(1 / self.think_time))
+                start = time.perf_counter()
+                try:
+                    await self.target.turn(connection, session_id, text, language)
+                except (OSError, asyncio.IncompleteReadError):
+                    self.errors += 1
+                    return  # The connection is gone
+                except Exception:
+                    self.errors += 1
+                    continue
+                self.latencies.append(time.perf_counter() - start)
+            self.completed += 1
+        finally:
+            await self.target.close(connection)
+    
+    async def run(self):
+        start = time.perf_counter()
+        if self.rate:
+            await self._open_loop()
+        else:
+            await self._closed_loop()
+        self.elapsed = time.perf_counter() - start
+        return self
+    
+    async def _closed_loop(self):
+        pending = iter(enumerate(self.conversations))
+        
+        async def table():
+            for number, turns in pending:
+                await self.play(number, turns)
+        
+        await asyncio.gather(*(table() for _ in range(self.concurrency)))
+    
+    async def _open_loop(self):
+        slots = asyncio.Semaphore(self.concurrency)
+        
+        async def arrive(number, turns):
+            async with slots:
+                await self.play(number, turns)
+        
+        tasks = []
+        due = time.perf_counter()
+        for number, turns in enumerate(self.conversations):
+            due += self.rng.expovariate(self.rate)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(arrive(number, turns)))
+        await asyncio.gather(*tasks)
+    
+    def results(self):
+        latencies = sorted(self.latencies)
+        results = {
+            "conversations": self.completed,
+            "turns": len(latencies),
+            "errors": self.errors,
+            "seconds": self.elapsed,
+            "turns_per_s": len(latencies) / self.elapsed if self.elapsed else 0.0,
+        }
+        if latencies:
+            results.update({
+                "p50_ms": percentile(latencies, 0.50) * 1e3,
+                "p95_ms": percentile(latencies, 0.95) * 1e3,
+                "p99_ms": percentile(latencies, 0.99) * 1e3,
+                "mean_ms": statistics.mean(latencies) * 1e3,
+                "max_ms": latencies[-1] * 1e3,
+            })
+        return results
+
+
+# Compared between runs: (key, higher is better)
+COMPARED = (("turns_per_s", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False))
+
+
+def compare(current, baseline, threshold):
+    """
+    Compare two saved runs.
+    
+    Returns:
+        list: (metric, baseline, current) for metrics worse than baseline by
+            more than threshold, plus errors if there are more of them
+    """
+    regressions = []
+    settings = ("target", "concurrency", "rate", "think_time", "seed", "replay")
+    differing = [key for key in settings if current["meta"].get(key) != baseline["meta"].get(key)]
+    if differing:
+        print(f"\n⚠️ Runs used different settings ({', '.join(differing)}); numbers may not be comparable")
+    print()
+    print(f"{'metric':<14} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key, higher_is_better in COMPARED:
+        before = baseline["results"].get(key)
+        after = current["results"].get(key)
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > threshold:
+            regressions.append((key, before, after))
+            flag = "  ⚠️"
+        print(f"{key:<14} {before:>12.3f} {after:>12.3f} {change:>+8.1%}{flag}")
+    before, after = baseline["results"]["errors"], current["results"]["errors"]
+    print(f"{'errors':<14} {before:>12} {after:>12}")
+    if after > before:
+        regressions.append(("errors", before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", default="direct",
+                        help="'direct' (in-process OrderHandler), 'serve' (start server.py), "
+                             "or a server URL such as http://127.0.0.1:8765")
+    parser.add_argument("--conversations", type=int, default=2000, help="synthetic conversations to play")
+    parser.add_argument("--replay", metavar="FILE", help="recorded conversations (JSON lines) instead")
+    parser.add_argument("--concurrency", type=int, default=100,
+                        help="tables at once (a cap when --rate is set)")
+    parser.add_argument("--rate", type=float, help="new conversations per second (open load)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a table's turns (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="save results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="flag metrics worse than baseline by this fraction")
+    args = parser.parse_args()
+    
+    if args.replay:
+        conversations = load_replay(args.replay)
+    else:
+        rng = random.Random(args.seed)
+        conversations = [
+            [(text, None) for text in synthetic_conversation(rng, MENU)]
+            for _ in range(args.conversations)
+        ]
+    
+    process = None
+    if args.target == "direct":
+        target = DirectTarget()
+    else:
+        if args.target == "serve":
+            host, port = "127.0.0.1", free_port()
+            process = subprocess.Popen(
+                [sys.executable, "server.py", "--port", str(port), "--journal", ""],
+                stdout=subprocess.DEVNULL,
+            )
+        else:
+            url = urlsplit(args.target)
+            host, port = url.hostname, url.port or 80
+        target = HttpTarget(host, port)
+    
+    try:
+        if process is not None:
+            asyncio.run(wait_until_up(port))
+        run = asyncio.run(
+            LoadRun(target, conversations, args.concurrency, args.rate, args.think_time, args.seed).run()
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    
+    results = run.results()
+    load = f"{args.rate:g} conversations/s (max {args.concurrency})" if args.rate else f"{args.concurrency} tables"
+    print(f"target:      {target.name}, {load}, think time {args.think_time:g} s")
+    print(f"played:      {results['conversations']}/{len(conversations)} conversations, "
+          f"{results['turns']} turns in {results['seconds']:.2f} s ({results['turns_per_s']:,.0f} turns/s)")
+    print(f"errors:      {results['errors']}")
+    if results["turns"]:
+        print(f"latency:     p50 {results['p50_ms']:.3f} ms, p95 {results['p95_ms']:.3f} ms, "
+              f"p99 {results['p99_ms']:.3f} ms, max {results['max_ms']:.3f} ms")
+    
+    document = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git": git_revision(),
+            "target": target.name,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "think_time": args.think_time,
+            "seed": args.seed,
+            "replay": args.replay,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, indent=2)
+        print(f"saved:       {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(document, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%}")
+    return 1 if results["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Dish lookup benchmark on a large synthetic menu.
+
+Compares the MenuIndex exact and fuzzy paths with a linear scan that
+computes the edit distance to every dish name.
+
+Usage:
+    python -m benchmarks.menu_lookup [--size 5000] [--queries 500]
+"""
+
+import argparse
+import random
+import time
+
+from menu import MenuIndex, bounded_edit_distance, dish_terms, normalize_term
+from benchmarks.synthetic import synthetic_menu, mishear
+
+
+def linear_candidates(menu, query, max_distance=2):
+    """Reference implementation: edit distance to every name of every dish."""
+    term = normalize_term(query)
+    limit = min(max_distance, len(term) // 4)
+    best = None
+    for key, item in menu.items():
+        for name in dish_terms(key, item):
+            distance = bounded_edit_distance(term, normalize_term(name), limit)
+            if distance is not None and (best is None or distance < best[1]):
+                best = (key, distance)
+    return best
+
+
+def timed(func, queries):
+    """Run func over queries and return (µs per query, results)."""
+    start = time.perf_counter()
+    results = [func(query) for query in queries]
+    elapsed = time.perf_counter() - start
+    return elapsed / len(queries) * 1e6, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=5000, help="number of dishes")
+    parser.add_argument("--queries", type=int, default=500, help="number of lookups")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    menu = synthetic_menu(args.size, seed=args.seed)
+    
+    start = time.perf_counter()
+    index = MenuIndex(menu)
+    build_ms = (time.perf_counter() - start) * 1e3
+    
+    names = [item["name"] for item in menu.values()]
+    exact_queries = [rng.choice(names) for _ in range(args.queries)]
+    fuzzy_queries = [mishear(rng.choice(names).lower(), rng) for _ in range(args.queries)]
+    
+    exact_us, _ = timed(index.lookup, exact_queries)
+    fuzzy_us, fuzzy_results = timed(lambda q: index.candidates(q, limit=5), fuzzy_queries)
+    linear_us, linear_results = timed(lambda q: linear_candidates(menu, q), fuzzy_queries[:50])
+    
+    hits = sum(1 for result in fuzzy_results if result)
+    agree = sum(
+        1 for indexed, linear in zip(fuzzy_results, linear_results)
+        if (indexed[0].distance if indexed else None) == (linear[1] if linear else None)
+    )
+    
+    print(f"menu size:          {args.size} dishes")
+    print(f"index build:        {build_ms:.1f} ms")
+    print(f"exact lookup:       {exact_us:.2f} µs/query")
+    print(f"fuzzy candidates:   {fuzzy_us:.1f} µs/query ({hits}/{len(fuzzy_queries)} resolved)")
+    print(f"linear scan:        {linear_us:.1f} µs/query")
+    print(f"best-distance agreement with linear scan: {agree}/{len(linear_results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Live turn latency while a large menu is reloaded.
+
+Publishes a synthetic menu (5,000 dishes by default), then runs customer
+turns on a following OrderHandler at a steady pace and measures each one
+from when it was due to when its reply was ready, first with nothing else
+going on and then while MenuWatcher rebuilds a changed copy of the menu on
+its own thread: as a plain build (the default) and as a quiet build
+(MenuWatcher(quiet_build=True): shorter thread switch interval and garbage
+collection held off, see menu_store.py).
+
+Usage:
+    python -m benchmarks.menu_reload [--dishes 5000] [--pace-ms 2] [--seconds 1]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import menu_store
+from benchmarks.synthetic import synthetic_menu
+from order_handler import OrderHandler
+
+UTTERANCES = (
+    "quiero un spicy salmon bowl",
+    "I'd like two tuna tacos",
+    "what did I order?",
+    "cancel",
+)
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def live_turns(pace, until):
+    """
+    Run turns every pace seconds until until() is true.
+    
+    Returns:
+        list: Seconds from each turn being due to its reply
+    """
+    handler = OrderHandler()
+    handler.greeting_said = True
+    latencies = []
+    due = time.perf_counter()
+    idx = 0
+    while not until():
+        due += pace
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        handler.process_input(UTTERANCES[idx % len(UTTERANCES)])
+        latencies.append(time.perf_counter() - due)
+        due = max(due, time.perf_counter() - pace)  # Don't queue up a backlog
+        idx += 1
+    return latencies
+
+
+def during_reload(watcher, path, dishes, pace, seed):
+    """Change the menu file and measure live turns until the new version is live."""
+    menu = synthetic_menu(dishes, seed=seed)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"dishes": menu}, f)
+    build = threading.Thread(target=watcher.check)
+    start = time.perf_counter()
+    build.start()
+    latencies = live_turns(pace, lambda: not build.is_alive())
+    build.join()
+    return latencies, time.perf_counter() - start
+
+
+def report(name, latencies, extra=""):
+    values = sorted(latencies)
+    print(f"{name:<26} {len(values):>6} {percentile(values, 0.5) * 1e3:>8.2f} "
+          f"{percentile(values, 0.99) * 1e3:>8.2f} {values[-1] * 1e3:>8.2f}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dishes", type=int, default=5000)
+    parser.add_argument("--pace-ms", type=float, default=2.0, help="time between live turns")
+    parser.add_argument("--seconds", type=float, default=1.0, help="length of the steady-state run")
+    args = parser.parse_args()
+    pace = args.pace_ms / 1e3
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "menu.json")
+        watcher = menu_store.MenuWatcher(path)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"dishes": synthetic_menu(args.dishes)}, f)
+        start = time.perf_counter()
+        watcher.check()
+        print(f"initial build: {time.perf_counter() - start:.2f} s for {args.dishes} dishes\n")
+        
+        print(f"{'':<26} {'turns':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        end = time.perf_counter() + args.seconds
+        report("steady", live_turns(pace, lambda: time.perf_counter() >= end))
+        
+        for seed, (name, quiet_build) in enumerate((("reload, plain build", False),
+                                                    ("reload, quiet build", True)), 1):
+            watcher.quiet_build = quiet_build
+            latencies, seconds = during_reload(watcher, path, args.dishes, pace, seed)
+            report(name, latencies, f"   (build {seconds:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
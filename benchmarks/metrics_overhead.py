@@ -0,0 +1,78 @@
+"""
+Cost of leaving metrics on.
+
+Times a bare span, a counter increment, and a loop of OrderHandler turns
+(each recording a process_input span and dish counts) with metrics on and
+off, and renders the Prometheus exposition once.
+
+Usage:
+    python -m benchmarks.metrics_overhead [--turns 50000]
+"""
+
+import argparse
+import time
+
+import metrics
+from order_handler import OrderHandler
+
+UTTERANCES = (
+    "hola",
+    "I'd like a salmon bowl",
+    "quiero dos tuna bowls y un kiwi brunch",
+    "what did I order?",
+    "show me the menu",
+    "cancel",
+)
+
+
+def per_call(action, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        action()
+    return (time.perf_counter() - start) / calls
+
+
+def turns(count):
+    handler = OrderHandler()
+    start = time.perf_counter()
+    for idx in range(count):
+        handler.process_input(UTTERANCES[idx % len(UTTERANCES)])
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=50_000)
+    args = parser.parse_args()
+    
+    series = metrics.STAGE_SECONDS.labels("benchmark")
+    
+    def span():
+        with series.time():
+            pass
+    
+    counter = metrics.DISHES_MATCHED.labels("benchmark")
+    
+    print(f"{'':>14} {'on':>9} {'off':>9}")
+    results = {}
+    for state in ("on", "off"):
+        if state == "on":
+            metrics.enable()
+        else:
+            metrics.disable()
+        results[state] = (
+            per_call(span, args.turns),
+            per_call(counter.inc, args.turns),
+            turns(args.turns),
+        )
+    metrics.enable()
+    for idx, name in enumerate(("span", "counter inc", "process_input")):
+        print(f"{name:>14} {results['on'][idx] * 1e9:>6.0f} ns {results['off'][idx] * 1e9:>6.0f} ns")
+    
+    start = time.perf_counter()
+    text = metrics.render()
+    print(f"\nrender: {(time.perf_counter() - start) * 1e3:.2f} ms for {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Reply length and turn time per session language.
+
+Plays the same synthetic conversations with the session language unknown
+(bilingual replies), English and Spanish, and reports characters spoken per
+turn (speech rendering and playback grow with them) and process_input time.
+
+Usage:
+    python -m benchmarks.response_catalog [--conversations 2000]
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.synthetic import synthetic_conversation
+from menu import MENU
+from order_handler import OrderHandler
+
+LANGUAGE_TAGS = (("bilingual", None), ("english", "en-US"), ("spanish", "es-CO"))
+
+
+def play(conversations, language):
+    """Total reply characters, turns and seconds for a session language."""
+    handler = OrderHandler()
+    characters = turns = 0
+    elapsed = 0.0
+    for conversation in conversations:
+        for text in conversation:
+            start = time.perf_counter()
+            response, should_continue = handler.process_input(text, language)
+            elapsed += time.perf_counter() - start
+            characters += len(response)
+            turns += 1
+            if not should_continue:
+                handler.reset()
+    return characters, turns, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    conversations = [synthetic_conversation(rng, MENU) for _ in range(args.conversations)]
+    
+    print(f"{'language':>10} {'chars/turn':>11} {'vs bilingual':>13} {'µs/turn':>9}")
+    baseline = None
+    for name, language in LANGUAGE_TAGS:
+        characters, turns, elapsed = play(conversations, language)
+        per_turn = characters / turns
+        baseline = baseline or per_turn
+        print(f"{name:>10} {per_turn:>11.0f} {per_turn / baseline - 1:>+13.0%} {elapsed / turns * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Load test for the asyncio conversation server.
+
+Starts server.py in a subprocess (or targets --port of a running one) and
+drives many concurrent table sessions, each over its own keep-alive
+connection, reporting p50/p99 turn latency.
+
+Usage:
+    python -m benchmarks.server_load [--sessions 1000] [--port PORT]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from menu import MENU
+from benchmarks.synthetic import synthetic_conversation
+
+
+def free_port():
+    """Ask the OS for an unused local port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def request(reader, writer, method, path, payload=None):
+    """Send one HTTP/1.1 request on an open connection and parse the reply."""
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1")
+        + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def wait_until_up(port, timeout=10.0):
+    """Poll /health until the server answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await request(reader, writer, "GET", "/health")
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def table(port, session_id, turns, start_gate, latencies, errors, think_time):
+    """One table: open a connection and play a conversation turn by turn."""
+    await start_gate.wait()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    except OSError:
+        errors.append(session_id)
+        return
+    try:
+        for text in turns:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", "/turn", {"session_id": session_id, "text": text})
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(session_id)
+            if think_time:
+                await asyncio.sleep(random.uniform(0, think_time))
+    except (OSError, asyncio.IncompleteReadError):
+        errors.append(session_id)
+    finally:
+        writer.close()
+
+
+async def run_load(port, sessions, think_time, seed):
+    """Run all sessions concurrently and return (latencies, errors, seconds)."""
+    rng = random.Random(seed)
+    conversations = [synthetic_conversation(rng, MENU) for _ in range(sessions)]
+    latencies = []
+    errors = []
+    start_gate = asyncio.Event()
+    tasks = [
+        asyncio.create_task(table(port, f"table-{idx}", turns, start_gate, latencies, errors, think_time))
+        for idx, turns in enumerate(conversations)
+    ]
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    start_gate.set()
+    await asyncio.gather(*tasks)
+    return latencies, errors, time.perf_counter() - start
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=1000, help="concurrent table sessions")
+    parser.add_argument("--port", type=int, help="use an already running server")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="max random pause between a table's turns (seconds)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    process = None
+    port = args.port
+    if port is None:
+        port = free_port()
+        process = subprocess.Popen(
+            [sys.executable, "server.py", "--port", str(port), "--journal", ""],
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        asyncio.run(wait_until_up(port))
+        latencies, errors, elapsed = asyncio.run(
+            run_load(port, args.sessions, args.think_time, args.seed)
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    
+    latencies.sort()
+    print(f"sessions:   {args.sessions} concurrent")
+    print(f"turns:      {len(latencies)} in {elapsed:.2f} s ({len(latencies) / elapsed:,.0f} turns/s)")
+    print(f"errors:     {len(errors)}")
+    if latencies:
+        print(f"p50:        {percentile(latencies, 0.50) * 1e3:.2f} ms")
+        print(f"p99:        {percentile(latencies, 0.99) * 1e3:.2f} ms")
+        print(f"mean:       {statistics.mean(latencies) * 1e3:.2f} ms")
+        print(f"max:        {latencies[-1] * 1e3:.2f} ms")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
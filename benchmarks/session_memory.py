@@ -0,0 +1,94 @@
+"""
+Memory per live session: list-of-dicts orders vs. the compact Order.
+
+Builds many sessions holding the same orders the way OrderHandler used to
+keep them (an instance dict, and a list with one MENU dict reference per
+item) and as the current OrderHandler (slots and an Order), with the same
+other fields, and reports traced bytes per whole session. Shared objects
+(the matcher, the menu) aren't counted.
+
+Usage:
+    python -m benchmarks.session_memory [--sessions 10000]
+"""
+
+import argparse
+import gc
+import random
+import tracemalloc
+
+from menu import MENU
+from order_handler import OrderHandler
+
+
+class LegacyOrderHandler:
+    """Session state as OrderHandler kept it before orders stored counts."""
+    
+    def __init__(self, template):
+        # Today's fields, in an instance dict as before
+        for field in OrderHandler.__slots__:
+            setattr(self, field, getattr(template, field))
+        self.current_order = []
+
+
+def random_orders(sessions, max_quantity, seed):
+    """Per-session orders as lists of (dish_key, quantity); empty for max_quantity 0."""
+    rng = random.Random(seed)
+    keys = list(MENU)
+    return [
+        [(key, rng.randint(1, max_quantity)) for key in rng.sample(keys, rng.randint(1, len(keys)))]
+        if max_quantity else []
+        for _ in range(sessions)
+    ]
+
+
+def build_legacy(orders):
+    template = OrderHandler()
+    sessions = []
+    for order in orders:
+        handler = LegacyOrderHandler(template)
+        for key, quantity in order:
+            handler.current_order.extend([MENU[key]] * quantity)
+        sessions.append(handler)
+    return sessions
+
+
+def build_compact(orders):
+    sessions = []
+    for order in orders:
+        handler = OrderHandler()
+        for key, quantity in order:
+            handler.current_order = handler.current_order.added(key, quantity)
+        sessions.append(handler)
+    return sessions
+
+
+def traced_bytes(build, orders):
+    """Bytes still allocated after build(orders), while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = build(orders)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sessions
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    print(f"{args.sessions} sessions")
+    print(f"{'items/session':>14} {'list of dicts':>16} {'compact Order':>16} {'saved':>7}")
+    # Tables that haven't ordered yet, small two-person orders up to large party tables
+    for max_quantity in (0, 1, 3, 10):
+        orders = random_orders(args.sessions, max_quantity, args.seed)
+        items = sum(quantity for order in orders for _, quantity in order) / args.sessions
+        legacy = traced_bytes(build_legacy, orders) / args.sessions
+        compact = traced_bytes(build_compact, orders) / args.sessions
+        print(f"{items:>14.1f} {legacy:>10.1f} B/ses {compact:>10.1f} B/ses {1 - compact / legacy:>7.0%}")
+
+if __name__ == "__main__":
+    main()
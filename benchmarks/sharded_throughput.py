@@ -0,0 +1,88 @@
+"""
+Turns per second with sessions sharded over worker processes.
+
+Plays the same seeded conversations (closed load, --concurrency tables)
+against the in-process SessionRegistry and against ShardedRegistry with 1,
+2, 4, 8 and 16 worker processes, and reports throughput, speedup over the
+in-process registry and turn latency. Turns go straight to the registry,
+without HTTP, so the numbers show what sharding itself buys. Scaling is
+bounded by the CPU count, which is printed first.
+
+Usage:
+    python -m benchmarks.sharded_throughput [--workers 1,2,4,8,16] [--conversations 2000]
+                                            [--concurrency 200]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.loadgen import LoadRun
+from benchmarks.synthetic import synthetic_conversation
+from menu import MENU
+from server import SessionRegistry
+from supervisor import ShardedRegistry
+
+
+class RegistryTarget:
+    """A session registry's process_turn, called directly."""
+    
+    def __init__(self, registry):
+        self.registry = registry
+    
+    async def open(self, session_id):
+        return None
+    
+    async def turn(self, _, session_id, text, language=None):
+        await self.registry.process_turn(session_id, text, language)
+    
+    async def close(self, _):
+        pass
+
+
+async def measure(registry, conversations, concurrency, seed):
+    """Warm every worker up, then play the conversations."""
+    warmup = 8
+    if isinstance(registry, ShardedRegistry):
+        registry.start()
+        warmup *= registry.processes
+    try:
+        # Fresh workers import the menu and matcher; keep that out of the run
+        await asyncio.gather(*(registry.process_turn(f"warmup-{idx}", "hello") for idx in range(warmup)))
+        run = await LoadRun(RegistryTarget(registry), conversations, concurrency, seed=seed).run()
+    finally:
+        registry.close()
+    return run.results()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default="1,2,4,8,16", help="comma-separated worker process counts")
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    conversations = [
+        [(text, None) for text in synthetic_conversation(rng, MENU)]
+        for _ in range(args.conversations)
+    ]
+    print(f"{os.cpu_count()} CPU(s), {args.conversations} conversations, {args.concurrency} tables\n")
+    
+    print(f"{'':<14} {'turns/s':>9} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    runs = [("in-process", lambda: SessionRegistry(executor=ThreadPoolExecutor(max_workers=4)))]
+    for count in (int(n) for n in args.workers.split(",")):
+        runs.append((f"{count} worker(s)", lambda count=count: ShardedRegistry(count, journal_path=None)))
+    baseline = None
+    for name, make_registry in runs:
+        results = asyncio.run(measure(make_registry(), conversations, args.concurrency, args.seed))
+        baseline = baseline or results["turns_per_s"]
+        print(f"{name:<14} {results['turns_per_s']:>9,.0f} {results['turns_per_s'] / baseline:>7.2f}x "
+              f"{results['p50_ms']:>8.2f} {results['p99_ms']:>8.2f} {results['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
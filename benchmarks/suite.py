@@ -0,0 +1,263 @@
+"""
+Benchmark suite for the ordering and menu hot paths.
+
+Times every OrderHandler.process_input branch, _handle_order with growing
+dish counts, order summaries and confirmations on long orders, and the menu
+helpers on synthetic menus from 3 to 10k dishes. Results are written as JSON
+so two runs can be compared and regressions over a threshold flagged.
+
+Usage:
+    python -m benchmarks.suite --out results.json
+    python -m benchmarks.suite --out new.json --compare results.json --threshold 0.10
+    python -m benchmarks.suite --quick --only menu
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+from intent_matcher import IntentMatcher
+from menu import MENU, MenuIndex, format_menu_for_display, get_menu_item
+from order_handler import EMPTY_ORDER, OrderHandler
+from benchmarks.synthetic import (
+    CANCELS, CONFIRMS, FILLERS, GREETINGS, MENU_REQUESTS, SUMMARIES,
+    mishear, synthetic_menu, synthetic_order,
+)
+
+
+CORPUS_SIZES = (100, 1000, 10000)
+DISH_COUNTS = (1, 5, 20)
+ORDER_LENGTHS = (10, 100, 1000)
+MENU_SIZES = (3, 100, 1000, 10000)
+
+BRANCH_UTTERANCES = {
+    "greeting": GREETINGS,
+    "menu": MENU_REQUESTS,
+    "confirm": CONFIRMS,
+    "cancel": CANCELS,
+    "summary": SUMMARIES,
+    "fallback": [text for text in FILLERS if text and "hi" not in text and "no" not in text],
+}
+
+
+def measure(func, repeat=5, min_time=0.05):
+    """
+    Time func and return statistics in microseconds per call.
+    
+    The call count per repeat is calibrated so each repeat takes at least
+    min_time seconds; the median of the repeats is the headline number.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    samples = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": statistics.median(samples),
+        "min_us": min(samples),
+        "max_us": max(samples),
+        "calls": number * repeat,
+    }
+
+
+def corpus(rng, utterances, size):
+    """Draw a corpus of the given size, with light ASR noise on some entries."""
+    return [
+        mishear(text, rng) if text and rng.random() < 0.1 else text
+        for text in (rng.choice(utterances) for _ in range(size))
+    ]
+
+
+def bench_process_input(rng, sizes):
+    """process_input for each intent branch over corpora of several sizes."""
+    results = {}
+    for size in sizes:
+        corpora = {branch: corpus(rng, texts, size) for branch, texts in BRANCH_UTTERANCES.items()}
+        corpora["order"] = [synthetic_order(rng, MENU, rng.randint(1, 3)) for _ in range(size)]
+        corpora["empty"] = [""] * size
+        
+        for branch, texts in corpora.items():
+            handler = OrderHandler()
+            handler.greeting_said = True
+            order = EMPTY_ORDER.added("salmon bowl").added("tuna bowl", 2)
+            
+            def run(texts=texts, handler=handler, order=order):
+                for text in texts:
+                    # Keep state steady: confirm/cancel would empty the order
+                    handler.current_order = order
+                    handler.greeting_said = True
+                    handler.process_input(text)
+            
+            stats = measure(run, repeat=3)
+            stats["per_utterance_us"] = stats["median_us"] / size
+            results[f"process_input/{branch}/n={size}"] = stats
+    return results
+
+
+def bench_handle_order(rng, dish_counts, menu_sizes):
+    """_handle_order with 1..N dishes in one utterance, on several menu sizes."""
+    results = {}
+    for menu_size in menu_sizes:
+        menu = synthetic_menu(menu_size, seed=menu_size)
+        matcher = IntentMatcher(menu)
+        for count in dish_counts:
+            if count > menu_size:
+                continue
+            text = synthetic_order(rng, menu, count).lower()
+            handler = OrderHandler(matcher)
+            
+            def run(handler=handler, text=text):
+                handler.current_order = EMPTY_ORDER
+                handler._handle_order(text)
+            
+            results[f"handle_order/menu={menu_size}/dishes={count}"] = measure(run)
+    return results
+
+
+def fill_order(keys):
+    """An Order of one of each dish key."""
+    order = EMPTY_ORDER
+    for key in keys:
+        order = order.added(key)
+    return order
+
+
+def bench_long_orders(lengths):
+    """_get_current_order_summary and _confirm_order on long orders of distinct dishes."""
+    results = {}
+    for length in lengths:
+        menu = synthetic_menu(length, seed=length)
+        keys = list(menu)
+        handler = OrderHandler(IntentMatcher(menu))
+        handler.current_order = fill_order(keys)
+        results[f"order_summary/items={length}"] = measure(handler._get_current_order_summary)
+        
+        def confirm(handler=handler, keys=keys):
+            handler.current_order = fill_order(keys)
+            handler._confirm_order()
+        
+        results[f"confirm_order/items={length}"] = measure(confirm)
+    return results
+
+
+def bench_menu(rng, menu_sizes):
+    """format_menu_for_display and get_menu_item (exact and fuzzy) per menu size."""
+    results = {}
+    for size in menu_sizes:
+        menu = MENU if size == len(MENU) else synthetic_menu(size, seed=size)
+        index = MenuIndex(menu)
+        names = [item["name"] for item in menu.values()]
+        exact = [rng.choice(names) for _ in range(200)]
+        fuzzy = [mishear(rng.choice(names).lower(), rng) for _ in range(200)]
+        
+        results[f"format_menu/items={size}"] = measure(lambda menu=menu: format_menu_for_display(menu))
+        stats = measure(lambda: [get_menu_item(name, index) for name in exact])
+        stats["per_lookup_us"] = stats["median_us"] / len(exact)
+        results[f"get_menu_item/exact/items={size}"] = stats
+        stats = measure(lambda: [get_menu_item(name, index) for name in fuzzy], repeat=3)
+        stats["per_lookup_us"] = stats["median_us"] / len(fuzzy)
+        results[f"get_menu_item/fuzzy/items={size}"] = stats
+    return results
+
+
+def git_revision():
+    """Current git commit, if available, so result files are traceable."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(quick=False, only=None, seed=0):
+    """Run the selected groups and return the results document."""
+    rng = random.Random(seed)
+    groups = {
+        "process_input": lambda: bench_process_input(rng, CORPUS_SIZES[:1] if quick else CORPUS_SIZES),
+        "handle_order": lambda: bench_handle_order(rng, DISH_COUNTS, MENU_SIZES[:2] if quick else MENU_SIZES),
+        "orders": lambda: bench_long_orders(ORDER_LENGTHS[:2] if quick else ORDER_LENGTHS),
+        "menu": lambda: bench_menu(rng, MENU_SIZES[:2] if quick else MENU_SIZES),
+    }
+    results = {}
+    for name, group in groups.items():
+        if only and name not in only:
+            continue
+        start = time.perf_counter()
+        results.update(group())
+        print(f"  {name}: {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Compare two result documents on median time.
+    
+    Returns:
+        list: (case, baseline_us, current_us, ratio) for cases slower than
+            baseline by more than threshold (e.g. 0.10 for 10%)
+    """
+    regressions = []
+    print()
+    print(f"{'case':<48} {'baseline µs':>12} {'current µs':>12} {'change':>8}")
+    for case, stats in sorted(current["results"].items()):
+        before = baseline["results"].get(case)
+        if before is None:
+            continue
+        ratio = stats["median_us"] / before["median_us"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append((case, before["median_us"], stats["median_us"], ratio))
+            flag = "  ⚠️"
+        print(f"{case:<48} {before['median_us']:>12.2f} {stats['median_us']:>12.2f} {ratio - 1:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", default="bench_results.json", help="where to write results")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="flag cases slower than baseline by this fraction")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a fast check")
+    parser.add_argument("--only", nargs="+", choices=["process_input", "handle_order", "orders", "menu"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    print("Running benchmarks...", file=sys.stderr)
+    document = run_suite(quick=args.quick, only=args.only, seed=args.seed)
+    with open(args.out, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=2, ensure_ascii=False)
+    
+    for case, stats in document["results"].items():
+        print(f"{case:<48} {stats['median_us']:>12.2f} µs")
+    print(f"\nSaved {len(document['results'])} results to {args.out}")
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(document, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
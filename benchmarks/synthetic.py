@@ -0,0 +1,143 @@
+"""
+Synthetic menus and utterances for benchmarks.
+"""
+
+import random
+
+
+PROTEINS = [
+    "salmon", "tuna", "shrimp", "chicken", "tofu", "beef", "octopus", "pork",
+    "mushroom", "lobster", "crab", "duck", "lamb", "tempeh", "mahi", "eel",
+]
+PROTEINS_ES = {
+    "salmon": "salmón", "tuna": "atún", "shrimp": "camarón", "chicken": "pollo",
+    "tofu": "tofu", "beef": "res", "octopus": "pulpo", "pork": "cerdo",
+    "mushroom": "champiñón", "lobster": "langosta", "crab": "cangrejo",
+    "duck": "pato", "lamb": "cordero", "tempeh": "tempeh", "mahi": "dorado",
+    "eel": "anguila",
+}
+STYLES = [
+    "bowl", "brunch", "wrap", "salad", "taco", "burrito", "poke", "ramen",
+    "curry", "arepa", "sandwich", "plate", "soup", "skewer", "toast", "roll",
+]
+STYLES_ES = {
+    "bowl": "bowl", "brunch": "brunch", "wrap": "wrap", "salad": "ensalada",
+    "taco": "taco", "burrito": "burrito", "poke": "poke", "ramen": "ramen",
+    "curry": "curry", "arepa": "arepa", "sandwich": "sándwich", "plate": "plato",
+    "soup": "sopa", "skewer": "pincho", "toast": "tostada", "roll": "rollo",
+}
+FLAVORS = [
+    "", "spicy", "smoked", "citrus", "coconut", "mango", "garlic", "ginger",
+    "teriyaki", "chipotle", "lime", "sesame", "pesto", "miso", "honey",
+    "tamarind", "lulo", "guava", "maracuya", "cilantro",
+]
+SIDES = ["sushi rice", "avocado", "kale", "quinoa", "plantain", "beet", "spinach", "corn"]
+
+
+def synthetic_menu(size, seed=0):
+    """
+    Build a menu dict shaped like menu.MENU with size distinct dishes.
+    
+    Names are combinations of flavor, protein and style, numbered once the
+    combinations run out, so menus up to any size stay unique.
+    """
+    rng = random.Random(seed)
+    combos = [(f, p, s) for f in FLAVORS for p in PROTEINS for s in STYLES]
+    rng.shuffle(combos)
+    menu = {}
+    for idx in range(size):
+        flavor, protein, style = combos[idx % len(combos)]
+        suffix = f" {idx // len(combos) + 1}" if idx >= len(combos) else ""
+        name = " ".join(part for part in (flavor, protein, style) if part) + suffix
+        name_es = f"{STYLES_ES[style]} de {PROTEINS_ES[protein]}"
+        if flavor:
+            name_es += f" {flavor}"
+        name_es += suffix
+        ingredients = [protein] + rng.sample(SIDES, 3)
+        menu[name] = {
+            "name": name.title(),
+            "name_es": name_es.capitalize(),
+            "aliases": [f"{protein} {style}{suffix}"] if flavor else [],
+            "description": ", ".join(ingredients).capitalize(),
+            "price": 0,
+            "ingredients": ingredients,
+        }
+    return menu
+
+
+def mishear(text, rng, edits=1):
+    """Apply a few random character edits, like an ASR mishearing."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    chars = list(text)
+    for _ in range(edits):
+        pos = rng.randrange(len(chars))
+        action = rng.choice(("replace", "delete", "insert"))
+        if action == "replace":
+            chars[pos] = rng.choice(letters)
+        elif action == "delete" and len(chars) > 1:
+            del chars[pos]
+        else:
+            chars.insert(pos, rng.choice(letters))
+    return "".join(chars)
+
+
+GREETINGS = ["hola", "hello", "hi there", "buenos días", "buenas tardes, hola"]
+MENU_REQUESTS = ["menu please", "el menú por favor", "what do you have", "qué platos tienen", "can I see the dishes"]
+ORDER_PREFIXES = ["i want", "i'd like", "quiero", "me gustaría pedir", "dame", "give me", "can I order"]
+QUANTITIES = ["a", "one", "two", "un", "una", "dos", "3", "the"]
+CONFIRMS = ["that's all", "eso es todo", "yes", "sí, confirmar", "listo"]
+CANCELS = ["cancel", "cancelar", "start over", "empezar de nuevo"]
+SUMMARIES = ["qué pedí", "mi pedido por favor", "que pedí hasta ahora"]
+FILLERS = ["uh", "the weather is great", "¿tienen algo sin gluten?", "", "mmm"]
+
+
+def synthetic_order(rng, menu, dishes=1):
+    """One ordering utterance naming several dishes from menu."""
+    names = rng.sample(list(menu), min(dishes, len(menu)))
+    mentions = [f"{rng.choice(QUANTITIES)} {name}" for name in names]
+    joiner = rng.choice([" and ", " y ", ", "])
+    return f"{rng.choice(ORDER_PREFIXES)} {joiner.join(mentions)}"
+
+
+def synthetic_conversation(rng, menu, max_dishes=3):
+    """
+    A scripted bilingual conversation: greet, menu, orders, check, confirm.
+    
+    Some conversations cancel and reorder or include filler turns, so every
+    intent branch of OrderHandler is exercised.
+    """
+    turns = [rng.choice(GREETINGS)]
+    if rng.random() < 0.7:
+        turns.append(rng.choice(MENU_REQUESTS))
+    for _ in range(rng.randint(1, 3)):
+        turns.append(synthetic_order(rng, menu, rng.randint(1, max_dishes)))
+        if rng.random() < 0.2:
+            turns.append(rng.choice(FILLERS))
+    if rng.random() < 0.3:
+        turns.append(rng.choice(SUMMARIES))
+    if rng.random() < 0.15:
+        turns.append(rng.choice(CANCELS))
+        turns.append(synthetic_order(rng, menu, 1))
+    turns.append(rng.choice(CONFIRMS))
+    return turns
+
+
+def synthetic_transcripts(sessions, menu, seed=0):
+    """Interleaved (session_id, text) turns for many concurrent sessions."""
+    rng = random.Random(seed)
+    pending = {
+        f"table-{idx}": synthetic_conversation(rng, menu)
+        for idx in range(sessions)
+    }
+    positions = dict.fromkeys(pending, 0)
+    active = list(pending)
+    turns = []
+    while active:
+        slot = rng.randrange(len(active))
+        session_id = active[slot]
+        turns.append((session_id, pending[session_id][positions[session_id]]))
+        positions[session_id] += 1
+        if positions[session_id] == len(pending[session_id]):
+            active[slot] = active[-1]
+            active.pop()
+    return turns
@@ -0,0 +1,111 @@
+"""
+Reply latency per table on a shared voice host, fair pool vs. plain pool.
+
+Writes WAV fixtures for quiet tables (a phrase every few seconds) and noisy
+tables (guests talking almost without pause), plays them in real time into
+one VoiceHost with a scripted recognizer that takes --recognition-ms per
+phrase, and reports per kind of table the turns taken, reply latency (from
+the end of a phrase in the room to the reply being queued) and phrases
+dropped for being over budget. It runs once with a plain shared FIFO pool
+and once with FairPool.
+
+Usage:
+    python -m benchmarks.voice_host [--quiet 3] [--noisy 6] [--workers 2]
+                                    [--recognition-ms 800] [--budget 2.0] [--seconds 30]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import tempfile
+
+from benchmarks.server_load import percentile
+from benchmarks.synthetic import synthetic_conversation
+from menu import MENU
+from recognizers import ScriptedBackend
+from voice_agent import CalibrationStore
+from voice_host import Device, VoiceHost
+from wav_devices import SimulatedRenderer, SimulatedSpeaker, WavMicrophone, write_phrases
+
+# (seconds of room noise before a phrase, seconds of speech) per kind of table
+PATTERNS = {"quiet": (2.5, 1.2), "noisy": (0.9, 1.0)}
+# Energy threshold for the fixtures' room noise (what calibration arrives at)
+CALIBRATED_THRESHOLD = 100
+
+
+def write_fixtures(directory, quiet, noisy, seconds):
+    """WAV files per table: {name: (kind, path)}."""
+    fixtures = {}
+    for kind, count in (("quiet", quiet), ("noisy", noisy)):
+        gap, speech = PATTERNS[kind]
+        for idx in range(count):
+            # Pauses vary by up to a third, so tables don't talk in lockstep
+            rng = random.Random(len(fixtures))
+            phrases = [(1.5, speech)]
+            elapsed = 1.5 + speech
+            while elapsed < seconds:
+                phrases.append((gap * rng.uniform(2 / 3, 4 / 3), speech))
+                elapsed += phrases[-1][0] + speech
+            path = os.path.join(directory, f"{kind}-{idx}.wav")
+            write_phrases(path, phrases, seed=len(fixtures))
+            fixtures[f"{kind}-{idx}"] = (kind, path)
+    return fixtures
+
+
+def run(fixtures, transcripts, args, fair, directory):
+    """Play the fixtures into a host; returns {kind: (turns, latencies, shed)}."""
+    devices = [
+        Device(name, WavMicrophone(path, name), SimulatedSpeaker(),
+               ScriptedBackend(itertools.cycle(transcripts), delay=args.recognition_ms / 1e3))
+        for name, (_, path) in fixtures.items()
+    ]
+    # Saved thresholds, so the tables start together instead of one
+    # calibration second apart
+    calibration = CalibrationStore(os.path.join(directory, f"calibration-{fair}.json"))
+    for name in fixtures:
+        calibration.save(name, CALIBRATED_THRESHOLD)
+    host = VoiceHost(devices, SimulatedRenderer(), workers=args.workers, budget=args.budget, fair=fair,
+                     language="es-CO", calibration=calibration, vad=False).start()
+    host.join()
+    stats = host.stats()
+    tables = {table.name: table for table in host.tables}
+    host.stop()
+    
+    results = {}
+    for name, (kind, _) in fixtures.items():
+        turns, latencies, shed = results.get(kind, (0, [], 0))
+        results[kind] = (turns + stats[name]["turns"], latencies + tables[name].latencies, shed + stats[name]["shed"])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quiet", type=int, default=3, help="tables with a phrase every few seconds")
+    parser.add_argument("--noisy", type=int, default=6, help="tables talking almost nonstop")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--recognition-ms", type=float, default=800)
+    parser.add_argument("--budget", type=float, default=2.0)
+    parser.add_argument("--seconds", type=float, default=30, help="length of each table's audio")
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    transcripts = [text for _ in range(50) for text in synthetic_conversation(rng, MENU)]
+    with tempfile.TemporaryDirectory() as directory:
+        fixtures = write_fixtures(directory, args.quiet, args.noisy, args.seconds)
+        rows = []
+        for name, fair in (("plain pool", False), ("FairPool", True)):
+            for kind, (turns, latencies, shed) in run(fixtures, transcripts, args, fair, directory).items():
+                latencies.sort()
+                rows.append((name, kind, turns, percentile(latencies, 0.5) * 1e3,
+                             percentile(latencies, 0.99) * 1e3, shed))
+    
+    print(f"\n{args.quiet} quiet + {args.noisy} noisy tables, {args.workers} workers, "
+          f"{args.recognition_ms:.0f} ms recognition, {args.budget:g} s budget\n")
+    print(f"{'':<11} {'tables':<7} {'turns':>6} {'p50 ms':>8} {'p99 ms':>8} {'dropped':>8}")
+    for name, kind, turns, p50, p99, shed in rows:
+        print(f"{name:<11} {kind:<7} {turns:>6} {p50:>8.0f} {p99:>8.0f} {shed:>8}")
+
+
+if __name__ == "__main__":
+    main()
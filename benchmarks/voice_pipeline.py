@@ -0,0 +1,269 @@
+"""
+Per-turn timings of main.py's conversation loop, end to end, without hardware.
+
+Plays recorded bilingual sessions (Spanish, English and mixed) into
+main.run_conversation() through a WavMicrophone, with a scripted recognizer
+that returns each phrase's transcript after --recognition-ms and a simulated
+speaker, so everything between the microphone and the speaker runs as it
+does at a table: capture ring, endpointing, VAD, two-language recognition
+with partials, the order handler and the speech queue. Reports per turn and
+per stage (p50/p95) the capture, VAD, recognition, processing and speech
+timings and the reply latency (end of the phrase in the room to the reply
+being queued).
+
+Sessions are built in; --sessions reads a JSON list of {"name", "turns":
+[[text, language], ...], "wav"} instead, where "wav" is a 16-bit mono
+recording with one phrase per turn (fixtures are synthesized if it's left
+out). Audio plays at --speed times real time.
+
+Usage:
+    python -m benchmarks.voice_pipeline [--speed 4] [--recognition-ms 300]
+    python -m benchmarks.voice_pipeline --out voice.json --compare baseline.json --threshold 0.10
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.server_load import percentile
+from benchmarks.suite import git_revision
+from main import ANOTHER_ORDER_PROMPT, WELCOME_MESSAGE, run_conversation
+from order_handler import OrderHandler, TurnPreview
+from recognizers import ScriptedBackend
+from voice_agent import CalibrationStore, VoiceAgent
+from wav_devices import SimulatedSpeaker, WavMicrophone, write_phrases
+
+SESSIONS = [
+    {"name": "es", "turns": [
+        ("hola", "es-CO"), ("qué platos tienen", "es-CO"), ("quiero un salmon bowl", "es-CO"),
+        ("dame dos kiwi brunch", "es-CO"), ("mi pedido por favor", "es-CO"), ("eso es todo", "es-CO"),
+        ("no", "es-CO"),
+    ]},
+    {"name": "en", "turns": [
+        ("hello", "en-US"), ("what do you have", "en-US"), ("i'd like a tuna bowl", "en-US"),
+        ("and one salmon bowl", "en-US"), ("that's all", "en-US"), ("no", "en-US"),
+    ]},
+    {"name": "mixed", "turns": [
+        ("hola", "es-CO"), ("menu please", "en-US"), ("quiero un tuna bowl", "es-CO"),
+        ("give me two kiwi brunch", "en-US"), ("mi pedido por favor", "es-CO"), ("that's all", "en-US"),
+        ("no", "en-US"),
+    ]},
+]
+LANGUAGES = ("es-CO", "en-US")
+# Speaking rates (characters per second) of the waitress and of guests
+SPEECH_RATE = 15.0
+WORD_SECONDS = 0.3
+# Energy threshold for the fixtures' room noise (what calibration arrives at)
+CALIBRATED_THRESHOLD = 100
+# Stages reported, in pipeline order
+STAGES = ("capture", "vad", "recognition", "processing", "latency", "speech_wait", "speech")
+# Compared between runs; capture depends on the fixtures' pauses, not the code
+COMPARED = ("vad", "recognition", "processing", "latency", "speech_wait")
+# Sub-millisecond stages jitter by more than any threshold; smaller changes aren't flagged
+MIN_CHANGE_MS = 1.0
+
+
+def replies(turns):
+    """What the waitress says before each turn, from a dry run of the order handler."""
+    # Through TurnPreview like run_conversation(), whose replies can come
+    # from the last partial transcript
+    preview = TurnPreview(OrderHandler())
+    said = [WELCOME_MESSAGE]
+    for text, language in turns:
+        preview.update(text)
+        response, more = preview.commit(text, language)
+        said.append(response + (" " + ANOTHER_ORDER_PROMPT if not more else ""))
+    return said
+
+
+def write_session(path, turns, args):
+    """
+    Synthesize a session: each phrase starts once the previous reply has been spoken.
+    
+    Returns:
+        float: Length of the recording in seconds
+    """
+    # Between phrases: the end-of-phrase pause, recognition (in audio time at
+    # this speed) and the reply, then the guest's own pause
+    overhead = 0.8 + args.recognition_ms / 1e3 * args.speed + args.pause
+    phrases = []
+    for (text, _), before in zip(turns, replies(turns)):
+        phrases.append((len(before) / SPEECH_RATE + overhead, max(0.6, WORD_SECONDS * len(text.split()))))
+    return write_phrases(path, phrases, seed=len(turns))
+
+
+def run_session(session, path, args, directory):
+    """Play one session through run_conversation(); returns a row per turn."""
+    microphone = WavMicrophone(path, session["name"], speed=args.speed)
+    # A saved threshold, as on a robot that has run in this room before
+    calibration = CalibrationStore(os.path.join(directory, "calibration.json"))
+    calibration.save(microphone.device_name, CALIBRATED_THRESHOLD)
+    handler = OrderHandler()
+    backend = ScriptedBackend([tuple(turn) for turn in session["turns"]], delay=args.recognition_ms / 1e3,
+                              calls_per_phrase=len(LANGUAGES))
+    agent = VoiceAgent(recognizer_backend=backend, language=LANGUAGES, microphone=microphone,
+                       output=SimulatedSpeaker(SPEECH_RATE * args.speed), scorer=handler.match_score,
+                       calibration=calibration)
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+            agent.speak(WELCOME_MESSAGE)
+            turns = run_conversation(agent, handler, listen_timeout=10 / args.speed + 5)
+            agent.wait_until_done()
+    finally:
+        agent.shutdown()
+    
+    rows = []
+    for expected, turn in zip(session["turns"], turns):
+        utterance = turn["utterance"]
+        rows.append({
+            "session": session["name"],
+            "heard": turn["heard"],
+            "expected": expected[0],
+            "language": turn["language"],
+            **{stage: turn[stage] for stage in ("capture", "vad", "recognition", "processing", "latency")},
+            "speech_wait": utterance.started - utterance.queued if utterance.started else None,
+            "speech": utterance.finished - utterance.started if utterance.finished else None,
+            "interrupted": utterance.interrupted,
+        })
+    for expected in session["turns"][len(turns):]:
+        rows.append({"session": session["name"], "heard": None, "expected": expected[0], "language": None,
+                     **{stage: None for stage in STAGES}, "interrupted": False})
+    return rows
+
+
+def summarize(rows):
+    """p50/p95 in ms per stage, over the turns that reached it."""
+    results = {}
+    for stage in STAGES:
+        values = sorted(row[stage] for row in rows if row[stage] is not None)
+        if values:
+            results[stage] = {"turns": len(values), "p50_ms": percentile(values, 0.5) * 1e3,
+                              "p95_ms": percentile(values, 0.95) * 1e3}
+    results["misheard"] = sum(1 for row in rows if row["heard"] != row["expected"])
+    return results
+
+
+def compare(current, baseline, threshold):
+    """
+    Compare two saved runs on each stage's p50 and p95.
+    
+    Returns:
+        list: (metric, baseline_ms, current_ms) for metrics slower than
+            baseline by more than threshold, plus misheard turns if there
+            are more of them
+    """
+    regressions = []
+    settings = ("speed", "recognition_ms", "pause", "sessions")
+    differing = [key for key in settings if current["meta"].get(key) != baseline["meta"].get(key)]
+    if differing:
+        print(f"\n⚠️ Runs used different settings ({', '.join(differing)}); numbers may not be comparable")
+    print()
+    print(f"{'metric':<18} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for stage in COMPARED:
+        for key in ("p50_ms", "p95_ms"):
+            before = baseline["results"].get(stage, {}).get(key)
+            after = current["results"].get(stage, {}).get(key)
+            if not before or after is None:
+                continue
+            change = after / before - 1
+            flag = ""
+            if change > threshold and after - before > MIN_CHANGE_MS:
+                regressions.append((f"{stage} {key}", before, after))
+                flag = "  ⚠️"
+            print(f"{stage + ' ' + key[:3]:<18} {before:>12.1f} {after:>12.1f} {change:>+8.1%}{flag}")
+    before, after = baseline["results"]["misheard"], current["results"]["misheard"]
+    print(f"{'misheard':<18} {before:>12} {after:>12}")
+    if after > before:
+        regressions.append(("misheard", before, after))
+    return regressions
+
+
+def _ms(value):
+    return f"{value * 1e3:.0f}" if value is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", metavar="FILE", help="JSON list of sessions instead of the built-in ones")
+    parser.add_argument("--speed", type=float, default=4.0, help="times real time the audio plays at")
+    parser.add_argument("--recognition-ms", type=float, default=300, help="scripted recognizer delay per call")
+    parser.add_argument("--pause", type=float, default=1.0,
+                        help="seconds a synthesized guest waits after a reply before talking")
+    parser.add_argument("--verbose", action="store_true", help="show the conversations")
+    parser.add_argument("--out", help="save results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="flag stages slower than baseline by this fraction")
+    args = parser.parse_args()
+    
+    if args.sessions:
+        with open(args.sessions, encoding="utf-8") as handle:
+            sessions = json.load(handle)
+    else:
+        sessions = SESSIONS
+    
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for session in sessions:
+            path = session.get("wav")
+            if not path:
+                path = os.path.join(directory, f"{session['name']}.wav")
+                write_session(path, session["turns"], args)
+            start = time.perf_counter()
+            rows.extend(run_session(session, path, args, directory))
+            print(f"  {session['name']}: {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    
+    print(f"\n{len(sessions)} session(s) at {args.speed:g}x, {args.recognition_ms:.0f} ms recognition\n")
+    print(f"{'session':<8} {'heard':<26} {'lang':<6} {'capture':>8} {'vad':>5} {'recog':>6} "
+          f"{'process':>8} {'latency':>8} {'wait':>6} {'speech':>7}")
+    for row in rows:
+        heard = row["heard"] if row["heard"] == row["expected"] else f"{row['heard']} (≠ {row['expected']})"
+        speech = _ms(row["speech"]) + ("*" if row["interrupted"] else "")
+        print(f"{row['session']:<8} {str(heard)[:26]:<26} {str(row['language'])[:6]:<6} {_ms(row['capture']):>8} "
+              f"{_ms(row['vad']):>5} {_ms(row['recognition']):>6} {_ms(row['processing']):>8} "
+              f"{_ms(row['latency']):>8} {_ms(row['speech_wait']):>6} {speech:>7}")
+    print("(ms; * = cut off by barge-in)")
+    
+    results = summarize(rows)
+    print(f"\n{'stage':<12} {'turns':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for stage in STAGES:
+        if stage in results:
+            stats = results[stage]
+            print(f"{stage:<12} {stats['turns']:>6} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f}")
+    print(f"misheard turns: {results['misheard']}/{len(rows)}")
+    
+    document = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git": git_revision(),
+            "speed": args.speed,
+            "recognition_ms": args.recognition_ms,
+            "pause": args.pause,
+            "sessions": args.sessions,
+        },
+        "results": results,
+        "turns": rows,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, indent=2, ensure_ascii=False)
+        print(f"saved: {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(document, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Single-pass keyword matcher for Luisquisite order handling.
+
+All intent keywords and dish names are compiled into one trie-shaped regular
+expression, so every hit in an utterance is found with one scan of the text.
+"""
+
+import re
+from collections import namedtuple
+
+from menu import MenuIndex, dish_name, dish_plural, dish_terms, format_menu_for_display
+from responses import BILINGUAL, LANGUAGES, format_list
+
+
+GREETING_KEYWORDS = ("hola", "hello", "hi", "buenos")
+MENU_KEYWORDS = ("menu", "menú", "dishes", "platos", "what do you have", "qué tienen")
+ORDER_KEYWORDS = ("quiero", "i want", "i'd like", "order", "pedir", "me gustaría", "dame", "give me")
+CONFIRM_KEYWORDS = ("yes", "sí", "confirm", "confirmar", "that's all", "eso es todo", "listo")
+CANCEL_KEYWORDS = ("cancel", "cancelar", "start over", "empezar de nuevo", "no", "nada")
+SUMMARY_KEYWORDS = ("what did i order", "qué pedí", "my order", "mi pedido")
+
+# Intents in the order OrderHandler checks them
+INTENT_KEYWORDS = {
+    "greeting": GREETING_KEYWORDS,
+    "menu": MENU_KEYWORDS,
+    "order": ORDER_KEYWORDS,
+    "confirm": CONFIRM_KEYWORDS,
+    "cancel": CANCEL_KEYWORDS,
+    "summary": SUMMARY_KEYWORDS,
+}
+INTENT_PRIORITY = tuple(INTENT_KEYWORDS)
+
+
+# English and Spanish number words accepted as dish quantities
+QUANTITY_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "un": 1, "una": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10,
+}
+MAX_QUANTITY = 99
+
+# Dishes named in the reply to an order for a dish that isn't on the menu
+SUGGESTED_DISHES = 3
+
+_PUNCTUATION = ".,;:!?¿¡'\"()"
+
+ScanResult = namedtuple("ScanResult", ["intents", "dishes", "mentions"])
+
+
+def quantity_before(text, start):
+    """
+    Read the quantity said just before position start ("dos", "three", "3").
+    
+    Returns:
+        int: The quantity, or 1 when no number precedes the mention
+    """
+    words = text[max(0, start - 24):start].split()
+    if not words:
+        return 1
+    word = words[-1].strip(_PUNCTUATION)
+    if word.isdigit():
+        return min(max(int(word), 1), MAX_QUANTITY)
+    return QUANTITY_WORDS.get(word, 1)
+
+
+def _build_trie(terms):
+    """Build a character trie; the empty-string key marks the end of a term."""
+    root = {}
+    for term in terms:
+        node = root
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = True
+    return root
+
+
+def _trie_pattern(node):
+    """Render a trie as a regex that prefers the longest term at a position."""
+    branches = [
+        re.escape(char) + _trie_pattern(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        body = "(?:" + body + ")?"
+    return body
+
+
+class IntentMatcher:
+    """Find every intent keyword and dish mention in one pass over the text."""
+    
+    def __init__(self, menu, index=None):
+        """
+        Compile the matcher for a menu.
+        
+        Args:
+            menu: Mapping of dish key to dish data (as in menu.MENU)
+            index: MenuIndex for fuzzy dish lookup (built from menu if omitted)
+        """
+        self.menu = menu
+        self.index = index or MenuIndex(menu)
+        # The menu reply and dish names in each language, rendered once
+        self.menu_texts = {language: format_menu_for_display(menu, language) for language in LANGUAGES}
+        self.dish_names = {
+            language: {key: dish_name(item, language) for key, item in menu.items()} for language in LANGUAGES
+        }
+        # Plurals the menu gives for names that don't follow the rules
+        self.dish_plurals = {
+            language: {key: dish_plural(item, language) for key, item in menu.items() if dish_plural(item, language)}
+            for language in LANGUAGES
+        }
+        self.menu_text = self.menu_texts[BILINGUAL]
+        # Dishes suggested when an order names none ("A, B or C")
+        self.suggestions = {
+            language: format_list(tuple(names.values())[:SUGGESTED_DISHES], language, choice=True)
+            for language, names in self.dish_names.items()
+        }
+        self._dish_order = {key: idx for idx, key in enumerate(menu)}
+        
+        intents_by_term = {}
+        dishes_by_term = {}
+        for intent, keywords in INTENT_KEYWORDS.items():
+            for keyword in keywords:
+                intents_by_term.setdefault(keyword, set()).add(intent)
+        for key, item in menu.items():
+            for term in dish_terms(key, item):
+                dishes_by_term.setdefault(term, set()).add(key)
+        
+        terms = set(intents_by_term) | set(dishes_by_term)
+        
+        # The regex reports only the longest term starting at a position.
+        # Every shorter term at that position is a prefix of it, so fold the
+        # labels of all prefixes into each term to keep substring semantics.
+        # Dish labels keep the length of the longest name for that dish, so
+        # each mention knows where it ends.
+        self._labels = {}
+        for term in terms:
+            intents = set()
+            dishes = {}
+            for end in range(1, len(term) + 1):
+                prefix = term[:end]
+                intents |= intents_by_term.get(prefix, set())
+                for key in dishes_by_term.get(prefix, ()):
+                    dishes[key] = end
+            self._labels[term] = (frozenset(intents), tuple(dishes.items()))
+        
+        self._pattern = re.compile(_trie_pattern(_build_trie(terms)))
+    
+    def scan(self, text):
+        """
+        Scan lowercased text for intent keywords and dish mentions.
+        
+        Args:
+            text: Lowercased customer input
+        
+        Returns:
+            ScanResult: intents hit (frozenset), dish keys hit in menu order,
+                and mentions as (dish_key, start, end) in text order
+        """
+        # Restart one character after each hit so overlapping terms are seen;
+        # search() skips ahead to candidate characters in C.
+        search = self._pattern.search
+        labels = self._labels
+        intents = set()
+        mentions = []
+        match = search(text, 0)
+        while match is not None:
+            start = match.start()
+            term_intents, term_dishes = labels[match.group()]
+            intents |= term_intents
+            for key, length in term_dishes:
+                mentions.append((key, start, start + length))
+            match = search(text, start + 1)
+        
+        if not mentions:
+            return ScanResult(frozenset(intents), (), ())
+        
+        # A mention starting inside an earlier mention of the same dish is
+        # another name for the same words, so count it once
+        kept = []
+        covered = {}
+        for key, start, end in mentions:
+            if start < covered.get(key, -1):
+                continue
+            covered[key] = end
+            kept.append((key, start, end))
+        dishes = self.in_menu_order({key for key, _, _ in kept})
+        return ScanResult(frozenset(intents), dishes, tuple(kept))
+    
+    def score(self, text):
+        """
+        Count the intent keywords and dish names a transcript contains.
+        
+        Used to compare recognition hypotheses of the same audio: the one
+        that reads like an order for this restaurant is usually right.
+        """
+        scan = self.scan(text.lower())
+        return len(scan.intents) + len(scan.mentions)
+    
+    def in_menu_order(self, keys):
+        """Return dish keys sorted as they appear on the menu."""
+        return tuple(sorted(keys, key=self._dish_order.__getitem__))
@@ -0,0 +1,468 @@
+"""
+Kitchen dispatch: confirmed orders go to bounded per-station queues.
+
+Every dish is cooked at one station (its "station" in menu.py). A station
+has a bounded queue of items and a number of cooks, and a cook takes a batch
+at a time: the oldest queued item plus later ones from the same prep group,
+i.e. dishes at the station that share an ingredient (both poke bowls start
+from sushi rice), so shared prep is done once per batch.
+
+dispatch() only accepts an order when every station it needs has room; a
+full station makes it wait (up to a timeout) and then raise KitchenBusy, so
+the kitchen never takes on more than it can cook on time. Each accepted
+ticket is quoted a wait from the work queued ahead of it, scaled by how long
+batches have actually been taking compared with the menu's prep times.
+
+SimulatedKitchen consumes the queues with timed fake cooks, for local runs,
+tests and benchmarks.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+from menu_store import current_menu
+
+
+DEFAULT_STATION = "kitchen"
+DEFAULT_PREP_SECONDS = 240
+
+# Per station: cooks, queued items allowed (counting quantities), one-off
+# prep per batch (rice, eggs on the griddle) and most items per batch
+DEFAULT_STATIONS = {
+    "bowls": {"cooks": 2, "capacity": 24, "setup_seconds": 120, "batch_size": 4},
+    "brunch": {"cooks": 2, "capacity": 12, "setup_seconds": 60, "batch_size": 3},
+}
+STATION_DEFAULTS = {"cooks": 1, "capacity": 12, "setup_seconds": 60, "batch_size": 3}
+
+# Weight of the latest batch in the actual/estimated duration average
+CORRECTION_ALPHA = 0.2
+
+# Ticket times kept for percentiles
+SAMPLE_SIZE = 10_000
+
+
+KitchenItem = namedtuple("KitchenItem", ["ticket", "key", "quantity", "group"])
+
+
+class KitchenBusy(Exception):
+    """A station has no room for the order."""
+    
+    def __init__(self, station, retry_after):
+        """
+        Args:
+            station: Name of the full station
+            retry_after: Estimated seconds until it has room
+        """
+        super().__init__(f"{station} station is full; room in about {retry_after:.0f}s")
+        self.station = station
+        self.retry_after = retry_after
+
+
+def prep_groups(menu):
+    """
+    Group dishes cooked at the same station that share an ingredient.
+    
+    Sharing is transitive: if A and B share rice and B and C share kale,
+    all three are one group.
+    
+    Returns:
+        dict: {dish_key: group number}
+    """
+    parent = {key: key for key in menu}
+    
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+    
+    first_with = {}
+    for key, item in menu.items():
+        station = item.get("station", DEFAULT_STATION)
+        for ingredient in item.get("ingredients", ()):
+            other = first_with.setdefault((station, ingredient.lower()), key)
+            parent[find(key)] = find(other)
+    roots = {}
+    return {key: roots.setdefault(find(key), len(roots)) for key in menu}
+
+
+def scaled_clock(speed):
+    """A monotonic clock running speed times faster than real time."""
+    return lambda: time.monotonic() * speed
+
+
+class Ticket:
+    """A dispatched order; ready once all of its items are cooked."""
+    
+    __slots__ = ("uid", "entries", "submitted_at", "quoted_seconds", "ready_at", "_remaining", "_ready")
+    
+    def __init__(self, uid, entries, submitted_at):
+        self.uid = uid
+        self.entries = entries
+        self.submitted_at = submitted_at
+        self.quoted_seconds = 0.0
+        self.ready_at = None
+        self._remaining = 0  # Queued or cooking items
+        self._ready = threading.Event()
+    
+    @property
+    def ready(self):
+        return self._ready.is_set()
+    
+    def wait(self, timeout=None):
+        """Block until the order is ready; False if timeout passed first."""
+        return self._ready.wait(timeout)
+
+
+class Batch:
+    """Items a cook is working on together."""
+    
+    __slots__ = ("station", "group", "items", "started_at", "estimate")
+    
+    def __init__(self, station, group, items, started_at, estimate):
+        self.station = station
+        self.group = group
+        self.items = items
+        self.started_at = started_at
+        self.estimate = estimate  # Nominal seconds, from the menu's prep times
+
+
+class Station:
+    """One station's queue, cooks and counters."""
+    
+    __slots__ = (
+        "name", "cooks", "capacity", "setup_seconds", "batch_size", "queue", "depth",
+        "max_depth", "cooking", "items_done", "batches_done", "busy_seconds", "correction",
+    )
+    
+    def __init__(self, name, cooks=1, capacity=12, setup_seconds=60, batch_size=3):
+        self.name = name
+        self.cooks = cooks
+        self.capacity = capacity
+        self.setup_seconds = setup_seconds
+        self.batch_size = batch_size
+        self.queue = deque()
+        self.depth = 0  # Queued items, counting quantities
+        self.max_depth = 0
+        self.cooking = []  # Batches in progress
+        self.items_done = 0
+        self.batches_done = 0
+        self.busy_seconds = 0.0
+        self.correction = 1.0  # Actual / estimated batch time, averaged
+    
+    def has_room(self, quantity):
+        # An order bigger than the whole queue still goes through when it's empty
+        return self.depth == 0 or self.depth + quantity <= self.capacity
+
+
+class Kitchen:
+    """Dispatcher from confirmed orders to station queues."""
+    
+    def __init__(self, menu=None, stations=None, clock=time.monotonic):
+        """
+        Args:
+            menu: Mapping of dish key to dish data (defaults to the live menu)
+            stations: {station: {cooks, capacity, setup_seconds, batch_size}},
+                defaults to DEFAULT_STATIONS; missing values come from
+                STATION_DEFAULTS
+            clock: Time source in seconds (scaled_clock() for simulations)
+        """
+        self.clock = clock
+        self.config = DEFAULT_STATIONS if stations is None else stations
+        self.groups = {}
+        self.prep_seconds = {}
+        self.station_of = {}
+        self.stations = {}
+        self._load_menu(current_menu().menu if menu is None else menu)
+        self.started_at = clock()
+        self.tickets_done = 0
+        self.rejected = 0
+        self.ticket_seconds = deque(maxlen=SAMPLE_SIZE)
+        self.quote_errors = deque(maxlen=SAMPLE_SIZE)  # Actual minus quoted
+        self._cond = threading.Condition()
+        self._closed = False
+    
+    def update_menu(self, menu):
+        """
+        Switch to a new menu version (e.g. from menu_store.on_publish).
+        
+        Queued items keep the prep group they were dispatched with, and
+        dishes at a station the kitchen didn't have get a new one (with
+        STATION_DEFAULTS unless configured).
+        """
+        with self._cond:
+            self._load_menu(menu)
+    
+    def _load_menu(self, menu):
+        self.menu = menu
+        # Number groups after the previous version's, so queued items only
+        # batch with dishes from the same version
+        offset = max(self.groups.values(), default=-1) + 1
+        # Dishes no longer on the menu keep their entries, for orders taken
+        # before the change
+        self.groups.update((key, offset + group) for key, group in prep_groups(menu).items())
+        self.prep_seconds.update(
+            (key, item.get("prep_seconds", DEFAULT_PREP_SECONDS)) for key, item in menu.items()
+        )
+        self.station_of.update((key, item.get("station", DEFAULT_STATION)) for key, item in menu.items())
+        for name in dict.fromkeys(self.station_of.values()):
+            if name not in self.stations:
+                self.stations[name] = Station(name, **{**STATION_DEFAULTS, **self.config.get(name, {})})
+    
+    def dispatch(self, entries, uid=None, timeout=0):
+        """
+        Queue a confirmed order's items at their stations.
+        
+        Args:
+            entries: [(dish_key, quantity), ...]
+            uid: Order id (e.g. the journal's); a new one if None
+            timeout: Real seconds to wait for room at full stations; None
+                waits as long as it takes
+        
+        Returns:
+            Ticket: With quoted_seconds set
+        
+        Raises:
+            KitchenBusy: A station stayed full for the whole timeout
+        """
+        demand = {}
+        for key, quantity in entries:
+            station = self.station_of[key]
+            demand[station] = demand.get(station, 0) + quantity
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        with self._cond:
+            while True:
+                full = next((name for name, quantity in demand.items() if not self.stations[name].has_room(quantity)), None)
+                if full is None:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.rejected += 1
+                    raise KitchenBusy(full, self._room_in(self.stations[full], self.clock(), demand[full]))
+                self._cond.wait(remaining)
+            
+            now = self.clock()
+            ticket = Ticket(uid or uuid.uuid4().hex, list(entries), now)
+            for key, quantity in entries:
+                station = self.stations[self.station_of[key]]
+                station.queue.append(KitchenItem(ticket, key, quantity, self.groups[key]))
+                station.depth += quantity
+                station.max_depth = max(station.max_depth, station.depth)
+                ticket._remaining += 1
+            ticket.quoted_seconds = max(
+                (self._ready_in(self.stations[name], now, ticket) for name in demand), default=0.0
+            )
+            if not ticket._remaining:
+                ticket.ready_at = now
+                ticket._ready.set()
+            self._cond.notify_all()
+        return ticket
+    
+    def next_batch(self, station_name, timeout=None):
+        """
+        Take the next batch for a cook at a station.
+        
+        Returns:
+            Batch: The oldest item and queued items of its prep group, or None
+                on timeout or once the kitchen is closed and drained
+        """
+        station = self.stations[station_name]
+        with self._cond:
+            while not station.queue:
+                if self._closed or not self._cond.wait(timeout):
+                    return None
+            items, station.queue = self._take(station, station.queue)
+            station.depth -= sum(item.quantity for item in items)
+            batch = Batch(station, items[0].group, items, self.clock(), self._work_seconds(station, items))
+            station.cooking.append(batch)
+            # Room freed up for waiting dispatches
+            self._cond.notify_all()
+        return batch
+    
+    def complete(self, batch):
+        """Mark a batch cooked; tickets with nothing left become ready."""
+        with self._cond:
+            now = self.clock()
+            station = batch.station
+            station.cooking.remove(batch)
+            elapsed = now - batch.started_at
+            station.busy_seconds += elapsed
+            station.batches_done += 1
+            station.items_done += sum(item.quantity for item in batch.items)
+            if batch.estimate > 0:
+                station.correction += CORRECTION_ALPHA * (elapsed / batch.estimate - station.correction)
+            for item in batch.items:
+                ticket = item.ticket
+                ticket._remaining -= 1
+                if ticket._remaining == 0:
+                    ticket.ready_at = now
+                    waited = now - ticket.submitted_at
+                    self.tickets_done += 1
+                    self.ticket_seconds.append(waited)
+                    self.quote_errors.append(waited - ticket.quoted_seconds)
+                    ticket._ready.set()
+    
+    def close(self):
+        """Stop accepting waits; cooks finish what is queued and then stop."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+    
+    def _work_seconds(self, station, items):
+        """Nominal seconds to cook items: prep per dish plus setup per batch."""
+        per_group = {}
+        prep = 0.0
+        for item in items:
+            per_group[item.group] = per_group.get(item.group, 0) + item.quantity
+            prep += self.prep_seconds[item.key] * item.quantity
+        batches = sum(-(-count // station.batch_size) for count in per_group.values())
+        return prep + batches * station.setup_seconds
+    
+    @staticmethod
+    def _take(station, queue):
+        """
+        Split the next batch off a queue: its oldest item plus later items of
+        the same prep group, up to batch_size.
+        
+        Returns:
+            tuple: (batch items, rest of the queue)
+        """
+        head = queue[0]
+        items = [head]
+        size = head.quantity
+        rest = deque()
+        for item in itertools.islice(queue, 1, None):
+            if item.group == head.group and size + item.quantity <= station.batch_size:
+                items.append(item)
+                size += item.quantity
+            else:
+                rest.append(item)
+        return items, rest
+    
+    def _plan(self, station, now):
+        """
+        Project how a station's queue will be cooked: batches taken as
+        next_batch would, each started by the first cook to come free, at the
+        menu's times scaled by the station's correction.
+        
+        Yields:
+            tuple: (start, finish, items, depth once started), times in
+                seconds from now
+        """
+        free = [
+            max(0.0, batch.started_at + batch.estimate * station.correction - now)
+            for batch in station.cooking
+        ]
+        free += [0.0] * (station.cooks - len(free))
+        heapq.heapify(free)
+        queue = station.queue
+        depth = station.depth
+        while queue:
+            items, queue = self._take(station, queue)
+            depth -= sum(item.quantity for item in items)
+            start = heapq.heappop(free)
+            finish = start + self._work_seconds(station, items) * station.correction
+            heapq.heappush(free, finish)
+            yield start, finish, items, depth
+    
+    def _ready_in(self, station, now, ticket):
+        """Expected seconds until a queued ticket's items at a station are cooked."""
+        ready = 0.0
+        for _, finish, items, _ in self._plan(station, now):
+            if any(item.ticket is ticket for item in items):
+                ready = finish
+        return ready
+    
+    def _room_in(self, station, now, quantity):
+        """Expected seconds until a station can queue quantity more items."""
+        for start, _, _, depth in self._plan(station, now):
+            if depth == 0 or depth + quantity <= station.capacity:
+                return start
+        return 0.0
+    
+    def stats(self):
+        """
+        Snapshot of queue depths and throughput.
+        
+        Returns:
+            dict: tickets_done, rejected, and per station (under "stations")
+                depth, max_depth, cooking, items_done, batches_done,
+                utilization (share of cook time busy) and correction
+        """
+        with self._cond:
+            elapsed = max(self.clock() - self.started_at, 1e-9)
+            return {
+                "tickets_done": self.tickets_done,
+                "rejected": self.rejected,
+                "stations": {
+                    name: {
+                        "depth": station.depth,
+                        "max_depth": station.max_depth,
+                        "cooking": len(station.cooking),
+                        "items_done": station.items_done,
+                        "batches_done": station.batches_done,
+                        "utilization": station.busy_seconds / (station.cooks * elapsed),
+                        "correction": station.correction,
+                    }
+                    for name, station in self.stations.items()
+                },
+            }
+
+
+class SimulatedKitchen:
+    """
+    Fake cooks for a Kitchen: one thread per cook, each taking batches and
+    spending their estimated time on them.
+    """
+    
+    def __init__(self, kitchen, speed=1.0, pace=1.0, jitter=0.2, seed=None):
+        """
+        Args:
+            kitchen: Kitchen to consume; give it scaled_clock(speed) when speed != 1
+            speed: Simulated seconds per real second
+            pace: How long batches really take relative to their estimate
+            jitter: Random spread of batch times (0.2 = ±20%)
+            seed: Seed for reproducible batch times
+        """
+        self.kitchen = kitchen
+        self.speed = speed
+        self.pace = pace
+        self.jitter = jitter
+        self.seed = seed
+        self._threads = []
+    
+    def start(self):
+        """Start every station's cooks."""
+        number = 0
+        for station in self.kitchen.stations.values():
+            for cook in range(station.cooks):
+                rng = random.Random(None if self.seed is None else self.seed + number)
+                thread = threading.Thread(
+                    target=self._cook, args=(station.name, rng), name=f"cook-{station.name}-{cook}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+                number += 1
+        return self
+    
+    def _cook(self, station_name, rng):
+        while True:
+            batch = self.kitchen.next_batch(station_name)
+            if batch is None:
+                return
+            seconds = batch.estimate * self.pace * rng.uniform(1 - self.jitter, 1 + self.jitter)
+            time.sleep(seconds / self.speed)
+            self.kitchen.complete(batch)
+    
+    def stop(self):
+        """Close the kitchen and wait for the cooks to finish what is queued."""
+        self.kitchen.close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
@@ -3,9 +3,109 @@
 Main entry point for Luisquisite Robot Waitress Voice Agent.
 """
 
+import os
 import sys
-from voice_agent import VoiceAgent
-from order_handler import OrderHandler
+import time
+
+# Measured from here so cold starts (the robot is power-cycled during
+# service) show up in the logs
+STARTED = time.perf_counter()
+
+
+WELCOME_MESSAGE = (
+    "¡Bienvenido a Luisquisite! Welcome to Luisquisite! "
+    "I'm your robot waitress. How can I help you today?"
+)
+ANOTHER_ORDER_PROMPT = "Would you like to place another order? Say 'yes' to continue or 'no' to exit."
+CONTINUE_PROMPT = "Great! How can I help you?"
+FAREWELL_MESSAGE = "Thank you! Have a wonderful day! ¡Hasta luego!"
+FIXED_PROMPTS = (WELCOME_MESSAGE, ANOTHER_ORDER_PROMPT, CONTINUE_PROMPT, FAREWELL_MESSAGE)
+
+
+def detected_language(voice_agent):
+    """Language of the last transcript, or None if nothing was understood."""
+    result = voice_agent.last_recognition
+    return result.language if result is not None else None
+
+
+def _turn(voice_agent, heard, response, processing, utterance):
+    """Timings of one turn, in seconds."""
+    timings = voice_agent.last_timings
+    ended = voice_agent.phrase_ended
+    return {
+        "heard": heard,
+        "language": detected_language(voice_agent),
+        "response": response,
+        "capture": timings.get("capture"),
+        "vad": timings.get("vad"),
+        "recognition": timings.get("recognition"),
+        "processing": processing,
+        # From the end of the phrase in the room to the reply being queued
+        "latency": utterance.queued - ended if heard is not None and ended is not None else None,
+        "utterance": utterance,
+    }
+
+
+def run_conversation(voice_agent, order_handler, listen_timeout=10):
+    """
+    Take orders until the customer says they're done.
+    
+    Args:
+        voice_agent: VoiceAgent to listen and speak through
+        order_handler: OrderHandler holding the order
+        listen_timeout: Seconds to wait for the customer to start talking
+    
+    Returns:
+        list: One dict per turn with what was heard and the reply, the
+            seconds spent in capture, vad, recognition and processing, the
+            reply latency and the reply's Utterance (speech timings)
+    """
+    from order_handler import TurnPreview
+    
+    # Replies are prepared from partial transcripts while the customer
+    # talks, and committed once the final transcript arrives
+    preview = TurnPreview(order_handler)
+    
+    def on_partial(text):
+        response = preview.update(text)
+        if response is not None:
+            print(f"⚡ Prepared reply for '{text}' ({preview.intent})")
+            voice_agent.prepare_reply(response)
+    
+    turns = []
+    continue_conversation = True
+    while continue_conversation:
+        # Listen for customer input
+        customer_input = voice_agent.listen(timeout=listen_timeout, phrase_time_limit=15, on_partial=on_partial)
+        if customer_input is None and voice_agent.audio_ended():
+            break
+        
+        # Process input and get response
+        started = time.perf_counter()
+        response, continue_conversation = preview.commit(customer_input, detected_language(voice_agent))
+        processing = time.perf_counter() - started
+        
+        # Speak the response; the next listen() starts while it plays and
+        # the customer can interrupt it
+        utterance = voice_agent.speak(response)
+        turns.append(_turn(voice_agent, customer_input, response, processing, utterance))
+        
+        # If order is confirmed, ask if they want to place another order
+        if not continue_conversation:
+            voice_agent.speak(ANOTHER_ORDER_PROMPT)
+            another_order = voice_agent.listen(timeout=listen_timeout, phrase_time_limit=10)
+            
+            started = time.perf_counter()
+            if another_order and any(word in another_order.lower() for word in ["yes", "sí", "si"]):
+                order_handler.reset()
+                continue_conversation = True
+                response = CONTINUE_PROMPT
+            else:
+                response = FAREWELL_MESSAGE
+            processing = time.perf_counter() - started
+            utterance = voice_agent.speak(response, block=not continue_conversation)
+            turns.append(_turn(voice_agent, another_order, response, processing, utterance))
+    return turns
 
 
 def main():
@@ -16,50 +116,53 @@ def main():
     print("=" * 60)
     print()
     
+    voice_agent = None
+    journal = None
     try:
-        # Initialize components
-        voice_agent = VoiceAgent()
-        order_handler = OrderHandler()
+        # Imported after the banner: speech_recognition and the menu index
+        # take a moment to load, and the audio drivers load in the background
+        from voice_agent import VoiceAgent
+        from order_handler import OrderHandler
+        from order_journal import OrderJournal
+        from metrics import serve_prometheus
+        from menu_store import MenuWatcher
+        
+        # Stage latencies and recognition counters for Prometheus
+        metrics_port = os.environ.get("LUISQUISITE_METRICS_PORT")
+        if metrics_port:
+            serve_prometheus(int(metrics_port))
+        
+        # Pick up edits to the menu file between turns
+        MenuWatcher().start()
+        
+        # Initialize components; transcripts are recognized in Spanish and
+        # English and the one that reads like an order wins
+        journal = OrderJournal()
+        order_handler = OrderHandler(journal=journal)
+        voice_agent = VoiceAgent(scorer=order_handler.match_score)
         
         # Welcome message
-        welcome_msg = (
-            "¡Bienvenido a Luisquisite! Welcome to Luisquisite! "
-            "I'm your robot waitress. How can I help you today?"
-        )
-        voice_agent.speak(welcome_msg)
+        voice_agent.speak(WELCOME_MESSAGE)
+        print(f"⏱️ Welcome queued {(time.perf_counter() - STARTED) * 1000:.0f} ms after start")
+        
+        # Render fixed phrases to the audio cache while the customer thinks
+        voice_agent.prepare(*order_handler.fixed_responses(), *FIXED_PROMPTS)
         
         # Main conversation loop
-        continue_conversation = True
-        while continue_conversation:
-            # Listen for customer input
-            customer_input = voice_agent.listen(timeout=10, phrase_time_limit=15)
-            
-            # Process input and get response
-            response, continue_conversation = order_handler.process_input(customer_input)
-            
-            # Speak the response
-            voice_agent.speak(response)
-            
-            # If order is confirmed, ask if they want to place another order
-            if not continue_conversation:
-                voice_agent.speak("Would you like to place another order? Say 'yes' to continue or 'no' to exit.")
-                another_order = voice_agent.listen(timeout=10, phrase_time_limit=10)
-                
-                if another_order and any(word in another_order.lower() for word in ["yes", "sí", "si"]):
-                    order_handler.reset()
-                    continue_conversation = True
-                    voice_agent.speak("Great! How can I help you?")
-                else:
-                    voice_agent.speak("Thank you! Have a wonderful day! ¡Hasta luego!")
-                    break
+        run_conversation(voice_agent, order_handler)
         
     except KeyboardInterrupt:
         print("\n\n👋 Shutting down...")
-        voice_agent.speak("Goodbye! Have a wonderful day!")
+        if voice_agent is not None:
+            voice_agent.speak("Goodbye! Have a wonderful day!", block=True)
         sys.exit(0)
     except Exception as e:
         print(f"\n❌ Error: {e}")
         sys.exit(1)
+    finally:
+        if journal is not None:
+            # Commit confirmed orders still queued for the journal
+            journal.close()
 
 
 if __name__ == "__main__":
@@ -1,42 +1,428 @@
 """
 Menu configuration for Luisquisite restaurant.
+
+The menu lives in menu.json next to this module (or the JSON/TOML file named
+by LUISQUISITE_MENU), one entry per dish key under "dishes". It is loaded
+into MENU once at import as a read-only mapping; menu_store.py reloads the
+file while the robot runs, and the lookup helpers below read the live
+version from it.
 """
 
-MENU = {
-    "salmon bowl": {
-        "name": "Salmon Bowl",
-        "description": "Raw salmon, sushi rice, asparagus, avocado, broccoli",
-        "price": 0,  # Price can be added later
-        "ingredients": ["raw salmon", "sushi rice", "asparagus", "avocado", "broccoli"]
-    },
-    "kiwi brunch": {
-        "name": "Kiwi Brunch",
-        "description": "3 kiwis, 3 raw oatmeal spoons, 2 fried eggs, 2 brazil nuts",
-        "price": 0,
-        "ingredients": ["3 kiwis", "3 raw oatmeal spoons", "2 fried eggs", "2 brazil nuts"]
-    },
-    "tuna bowl": {
-        "name": "Tuna Bowl",
-        "description": "Raw tuna, sushi rice, beet, spinach, kale",
-        "price": 0,
-        "ingredients": ["raw tuna", "sushi rice", "beet", "spinach", "kale"]
-    }
-}
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict, namedtuple
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None  # JSON menus only
+
+from responses import SPANISH, template
+
+MENU_PATH = os.environ.get("LUISQUISITE_MENU", os.path.join(os.path.dirname(os.path.abspath(__file__)), "menu.json"))
+
+# Fields every dish must have; the rest ("name_es", "name_es_plural",
+# "description_es", "aliases", "station", ...) are optional
+REQUIRED_FIELDS = ("name", "description")
+# Types of the fields a dish can have, checked when a menu is parsed so a bad
+# file is rejected instead of failing later in the matcher
+TEXT_FIELDS = ("name", "name_es", "name_es_plural", "description", "description_es", "station")
+TEXT_LIST_FIELDS = ("aliases", "ingredients")
+NUMBER_FIELDS = ("price", "prep_seconds")
+
+
+def parse_menu(data, source="menu"):
+    """
+    Parse the bytes of a menu file.
+    
+    Args:
+        data: File contents, JSON or (for a .toml source) TOML
+        source: File name, for the format and error messages
+    
+    Returns:
+        dict: Dish key to dish data, in file order
+    
+    Raises:
+        ValueError: The file doesn't parse, or a dish is missing a field or
+            has one of the wrong type
+    """
+    if source.endswith(".toml") and tomllib is None:
+        raise ValueError(f"{source}: TOML menus need Python 3.11+ or the tomli package")
+    try:
+        if source.endswith(".toml"):
+            document = tomllib.loads(data.decode("utf-8"))
+        else:
+            document = json.loads(data)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"{source}: {e}") from e
+    dishes = document.get("dishes") if isinstance(document, dict) else None
+    if not isinstance(dishes, dict) or not dishes:
+        raise ValueError(f"{source}: expected a non-empty \"dishes\" table")
+    for key, item in dishes.items():
+        missing = [field for field in REQUIRED_FIELDS if not isinstance(item, dict) or field not in item]
+        if missing:
+            raise ValueError(f"{source}: dish '{key}' is missing {', '.join(missing)}")
+        for field, value in item.items():
+            if field in TEXT_FIELDS:
+                valid, expected = isinstance(value, str), "text"
+            elif field in TEXT_LIST_FIELDS:
+                valid = isinstance(value, list) and all(isinstance(entry, str) for entry in value)
+                expected = "a list of text"
+            elif field in NUMBER_FIELDS:
+                valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+                expected = "a number"
+            else:
+                continue
+            if not valid:
+                raise ValueError(f"{source}: dish '{key}' field \"{field}\" must be {expected}, not {value!r}")
+    return dishes
+
+
+def read_menu_file(path):
+    """Read and parse a menu file (see parse_menu)."""
+    with open(path, "rb") as f:
+        return parse_menu(f.read(), path)
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict.
+    
+    Unlike a MappingProxyType it pickles, so matchers built from a frozen
+    menu can be sent to worker processes (OrderHandler.process_batch).
+    """
+    
+    __slots__ = ()
+    
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("the menu is read-only; edit the menu file instead")
+    
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze_menu(menu):
+    """Read-only copy of a parsed menu: mappings become FrozenDicts, lists tuples."""
+    return FrozenDict({
+        key: FrozenDict({
+            field: tuple(value) if isinstance(value, list) else value
+            for field, value in item.items()
+        })
+        for key, item in menu.items()
+    })
+
+
+MENU = freeze_menu(read_menu_file(MENU_PATH))
+
+
+# Process-wide dish ids: small integers that stay stable for a dish key, so
+# orders can store counts of ids instead of references to dish dicts
+_DISH_IDS = {}
+_DISH_KEYS = []
+
+
+def dish_id(key):
+    """Return the small integer id for a dish key, assigning one on first use."""
+    dish = _DISH_IDS.get(key)
+    if dish is None:
+        dish = _DISH_IDS[key] = len(_DISH_KEYS)
+        _DISH_KEYS.append(key)
+    return dish
+
+
+def dish_key(dish):
+    """Return the dish key for an id from dish_id."""
+    return _DISH_KEYS[dish]
+
+
+MenuCandidate = namedtuple("MenuCandidate", ["key", "item", "term", "distance"])
+
+_NON_WORD = re.compile(r"[^\w\s']+")
+_WORD = re.compile(r"\S+")
+
+
+def normalize_term(text):
+    """Lowercase, strip accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def dish_terms(key, item):
+    """Return every lowercased way a dish can be named (key, names, aliases)."""
+    names = [key, item["name"]]
+    if item.get("name_es"):
+        names.append(item["name_es"])
+    names.extend(item.get("aliases", ()))
+    terms = []
+    for name in names:
+        for term in (name.lower().strip(), normalize_term(name)):
+            if term and term not in terms:
+                terms.append(term)
+    return terms
+
+
+def bounded_edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or None if it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for i, char_b in enumerate(b, 1):
+        current = [i]
+        for j, char_a in enumerate(a, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class MenuIndex:
+    """
+    Precomputed lookup index over dish keys, names, aliases and Spanish names.
+    
+    Exact lookups are a single dict access. Fuzzy lookups correct each word
+    against the menu vocabulary (through a trigram index), intersect the
+    postings of the corrected words, and only then check whole names with a
+    bounded edit distance, so the work tracks the vocabulary, not the menu.
+    """
+    
+    GRAM = 3
+    
+    def __init__(self, menu):
+        """
+        Build the index for a menu.
+        
+        Args:
+            menu: Mapping of dish key to dish data (as in MENU)
+        """
+        self.menu = menu
+        self._order = {key: idx for idx, key in enumerate(menu)}
+        self._exact = {}
+        self._terms = []
+        self._word_postings = defaultdict(set)
+        self._gram_postings = defaultdict(list)
+        self._word_counts = set()
+        
+        for key, item in menu.items():
+            for term in dish_terms(key, item):
+                if self._exact.setdefault(term, key) != key or term != normalize_term(term):
+                    continue
+                term_id = len(self._terms)
+                self._terms.append((term, key))
+                words = term.split()
+                self._word_counts.add(len(words))
+                for word in words:
+                    self._word_postings[word].add(term_id)
+        
+        for word in self._word_postings:
+            for gram in self._grams(word):
+                self._gram_postings[gram].append(word)
+    
+    @classmethod
+    def _grams(cls, word):
+        """Distinct padded character n-grams of a word."""
+        padded = f" {word} "
+        return {padded[i:i + cls.GRAM] for i in range(len(padded) - cls.GRAM + 1)}
+    
+    def _correct_word(self, word):
+        """Return menu vocabulary words within a small edit distance of word."""
+        if word in self._word_postings:
+            return [word]
+        if len(word) < 3:
+            return []
+        limit = 2 if len(word) >= 8 else 1
+        
+        # Prefix filter: a word within k edits keeps all but k * GRAM of the
+        # query's grams, so it must share one of the k * GRAM + 1 rarest ones.
+        grams = sorted(self._grams(word), key=lambda gram: len(self._gram_postings.get(gram, ())))
+        seen = set()
+        matches = []
+        for gram in grams[:limit * self.GRAM + 1]:
+            for candidate in self._gram_postings.get(gram, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if bounded_edit_distance(word, candidate, limit) is not None:
+                    matches.append(candidate)
+        return matches
+    
+    def _postings_for_word(self, word):
+        """
+        Return posting sets for a heard word.
+        
+        A word that matches nothing may be two words run together
+        ("tunaroll"), so try every split into two correctable halves.
+        """
+        corrected = self._correct_word(word)
+        if corrected:
+            return [set().union(*(self._word_postings[match] for match in corrected))]
+        for split in range(3, len(word) - 2):
+            left = self._correct_word(word[:split])
+            right = left and self._correct_word(word[split:])
+            if right:
+                return [
+                    set().union(*(self._word_postings[match] for match in left)),
+                    set().union(*(self._word_postings[match] for match in right)),
+                ]
+        return []
+    
+    def lookup(self, query):
+        """Return the dish key named exactly by query, or None."""
+        key = self._exact.get(query.lower().strip())
+        if key is None:
+            key = self._exact.get(normalize_term(query))
+        return key
+    
+    def candidates(self, query, limit=5, max_distance=2):
+        """
+        Rank dishes whose names are within max_distance edits of query.
+        
+        Args:
+            query: Dish name as heard (e.g. "salmon bol")
+            limit: Maximum number of candidates to return
+            max_distance: Largest edit distance accepted; shorter queries
+                get a tighter bound (one edit per four characters)
+            
+        Returns:
+            list: MenuCandidate tuples, closest first
+        """
+        term = normalize_term(query)
+        if not term:
+            return []
+        key = self._exact.get(term)
+        if key is not None:
+            return [MenuCandidate(key, self.menu[key], term, 0)]
+        
+        limit_distance = min(max_distance, len(term) // 4)
+        if limit_distance == 0:
+            return []
+        
+        postings = []
+        for word in term.split():
+            word_postings = self._postings_for_word(word)
+            if not word_postings:
+                return []
+            postings.extend(word_postings)
+        postings.sort(key=len)
+        term_ids = postings[0].intersection(*postings[1:])
+        
+        best = {}
+        for term_id in term_ids:
+            candidate, key = self._terms[term_id]
+            distance = bounded_edit_distance(term, candidate, limit_distance)
+            if distance is not None and (key not in best or distance < best[key][1]):
+                best[key] = (candidate, distance)
+        
+        ranked = sorted(best.items(), key=lambda entry: (entry[1][1], self._order[entry[0]]))
+        return [
+            MenuCandidate(key, self.menu[key], candidate, distance)
+            for key, (candidate, distance) in ranked[:limit]
+        ]
+    
+    def find_mentions(self, text, max_distance=2):
+        """
+        Find dish mentions in free text, tolerating misheard words.
+        
+        Args:
+            text: Customer input
+            max_distance: Largest edit distance accepted per mention
+            
+        Returns:
+            list: (dish_key, start, end) in text order, with offsets into
+                normalize_term(text)
+        """
+        normalized = normalize_term(text)
+        words = [(match.start(), match.end()) for match in _WORD.finditer(normalized)]
+        found = []
+        # Also try one word fewer, in case two words were heard as one
+        sizes = self._word_counts | {count - 1 for count in self._word_counts if count > 1}
+        for size in sizes:
+            for first in range(len(words) - size + 1):
+                start, end = words[first][0], words[first + size - 1][1]
+                matches = self.candidates(normalized[start:end], limit=1, max_distance=max_distance)
+                if matches:
+                    found.append((matches[0].distance, end - start, matches[0].key, start, end))
+        
+        # Overlapping windows can hit the same dish; keep the closest one
+        kept = []
+        for _, _, key, start, end in sorted(found):
+            if not any(k == key and s < end and start < e for k, s, e in kept):
+                kept.append((key, start, end))
+        return sorted(kept, key=lambda mention: mention[1])
+    
+    def find_in_text(self, text, max_distance=2):
+        """
+        Find dishes mentioned in free text, tolerating misheard words.
+        
+        Args:
+            text: Customer input
+            max_distance: Largest edit distance accepted per mention
+            
+        Returns:
+            list: Dish keys found, in menu order
+        """
+        found = {key for key, _, _ in self.find_mentions(text, max_distance)}
+        return sorted(found, key=self._order.__getitem__)
+
+
+MENU_INDEX = MenuIndex(MENU)
+
+def _live_index():
+    """MenuIndex of the live menu version (after reloads, not MENU_INDEX)."""
+    # Imported here: menu_store builds its first snapshot from this module
+    from menu_store import current_menu
+    return current_menu().matcher.index
 
 def get_menu_items():
     """Return list of menu item names."""
-    return list(MENU.keys())
+    return list(_live_index().menu.keys())
 
-def get_menu_item(item_name):
-    """Get menu item by name (case-insensitive)."""
-    item_name_lower = item_name.lower().strip()
-    return MENU.get(item_name_lower)
+def get_menu_item(item_name, index=None):
+    """Get menu item by key, name, alias or Spanish name, tolerating small typos."""
+    index = index or _live_index()
+    key = index.lookup(item_name)
+    if key is None:
+        matches = index.candidates(item_name, limit=1)
+        if not matches:
+            return None
+        key = matches[0].key
+    return index.menu[key]
 
-def format_menu_for_display():
-    """Format menu for voice announcement."""
-    items = []
-    for key, item in MENU.items():
-        items.append(f"{item['name']}: {item['description']}")
-    return "Here is our menu today: " + ". ".join(items) + "."
+def find_menu_items(query, limit=5, max_distance=2):
+    """Return ranked MenuCandidate matches for a (possibly misheard) dish name."""
+    return _live_index().candidates(query, limit=limit, max_distance=max_distance)
 
+def dish_name(item, language=None):
+    """A dish's name in a catalog language (see responses.py)."""
+    if language == SPANISH:
+        return item.get("name_es") or item["name"]
+    return item["name"]
 
+def dish_plural(item, language=None):
+    """The plural of dish_name() the menu gives for irregular names, or None to derive it."""
+    if language == SPANISH and item.get("name_es"):
+        return item.get("name_es_plural")
+    return None
+
+def format_menu_for_display(menu=None, language=None):
+    """Format menu for voice announcement, in a catalog language (see responses.py)."""
+    items = []
+    for key, item in (_live_index().menu if menu is None else menu).items():
+        description = item.get("description_es") if language == SPANISH else None
+        items.append(f"{dish_name(item, language)}: {description or item['description']}")
+    return template("menu", language)(dishes=". ".join(items))
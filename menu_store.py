@@ -0,0 +1,192 @@
+"""
+Live menu: versioned snapshots of the menu file, swapped in while serving.
+
+A snapshot holds one version of the menu together with everything derived
+from it (lookup index, compiled matcher, the spoken menu), all built before
+it is published, so a turn never waits on a rebuild. Publishing replaces a
+single module global, so readers see the old snapshot or the new one, never
+a mix. Sessions that follow the live menu (OrderHandler without a matcher)
+pick up the current snapshot at the start of each turn.
+
+MenuWatcher polls the menu file and builds the new snapshot on its own
+thread. With quiet_build, the interpreter switches threads more often and
+the garbage collector is held off while it builds, so live turns neither
+queue behind the build for whole switch intervals nor stall in full
+collections set off by its allocations. Both are process-wide settings, so
+this is opt-in. benchmarks/menu_reload.py measures the difference on a
+5k-dish menu.
+"""
+
+import gc
+import hashlib
+import os
+import sys
+import threading
+from collections import namedtuple
+
+from intent_matcher import IntentMatcher
+from menu import MENU, MENU_INDEX, MENU_PATH, MenuIndex, freeze_menu, parse_menu
+
+
+# Seconds between checks of the menu file
+WATCH_INTERVAL = 2.0
+# Thread switch interval during a quiet build (the default is 5 ms)
+BUILD_SWITCH_INTERVAL = 0.0005
+
+MenuSnapshot = namedtuple("MenuSnapshot", ["version", "digest", "source", "menu", "matcher", "menu_text"])
+
+
+def build_snapshot(data, source, version):
+    """
+    Parse a menu file and precompute everything derived from it.
+    
+    Args:
+        data: Bytes of the menu file
+        source: Its path (the extension picks JSON or TOML)
+        version: Version number for the snapshot
+    
+    Returns:
+        MenuSnapshot
+    
+    Raises:
+        ValueError: The file isn't a valid menu
+    """
+    menu = freeze_menu(parse_menu(data, source))
+    matcher = IntentMatcher(menu, MenuIndex(menu))
+    return MenuSnapshot(version, hashlib.sha256(data).hexdigest(), source, menu, matcher, matcher.menu_text)
+
+
+def _initial_snapshot():
+    """Version 1: the menu menu.py loaded at import, reusing its index."""
+    try:
+        with open(MENU_PATH, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        digest = None
+    matcher = IntentMatcher(MENU, MENU_INDEX)
+    return MenuSnapshot(1, digest, MENU_PATH, MENU, matcher, matcher.menu_text)
+
+
+_current = _initial_snapshot()
+_publish_lock = threading.Lock()
+_listeners = []
+
+
+def current_menu():
+    """The live MenuSnapshot."""
+    return _current
+
+
+def publish(snapshot):
+    """
+    Make snapshot the live menu and notify listeners.
+    
+    Returns:
+        MenuSnapshot: The snapshot it replaced
+    """
+    global _current
+    with _publish_lock:
+        previous, _current = _current, snapshot
+        listeners = list(_listeners)
+    for listener in listeners:
+        listener(snapshot)
+    return previous
+
+
+def on_publish(listener):
+    """Call listener(snapshot) after each new menu version goes live."""
+    with _publish_lock:
+        _listeners.append(listener)
+
+
+class MenuWatcher:
+    """Reload the menu file when it changes."""
+    
+    def __init__(self, path=None, interval=WATCH_INTERVAL, quiet_build=False):
+        """
+        Args:
+            path: Menu file to watch (defaults to menu.MENU_PATH)
+            interval: Seconds between checks
+            quiet_build: Shorten the thread switch interval and hold off
+                garbage collection while a snapshot builds; these change
+                the whole process, so only for processes that own them
+        """
+        self.path = path or MENU_PATH
+        self.interval = interval
+        self.quiet_build = quiet_build
+        self._stat = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def start(self):
+        """Load the file now if it differs from the live menu, then watch it."""
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="menu-watcher", daemon=True)
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # A bug in one reload mustn't end hot reloading for good
+                print(f"❌ Menu reload failed, keeping version {current_menu().version}: {e}")
+    
+    def check(self):
+        """
+        Reload the file if it changed since the last check.
+        
+        Returns:
+            MenuSnapshot: The new live snapshot, or None if nothing changed or
+                the file is invalid (the previous version stays live)
+        """
+        stat = self._file_stat()
+        if stat is None or stat == self._stat:
+            return None
+        self._stat = stat
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            print(f"⚠️ Could not read menu {self.path}: {e}")
+            return None
+        live = current_menu()
+        if hashlib.sha256(data).hexdigest() == live.digest:
+            return None  # Touched but not changed
+        
+        # The build holds the GIL in long stretches; a quiet build switches
+        # threads often meanwhile so live turns keep their latency. Its
+        # allocations would also set off full garbage collections, each
+        # pausing every thread for tens of milliseconds, so the collector
+        # waits until it's done.
+        switch_interval = sys.getswitchinterval()
+        collecting = gc.isenabled()
+        if self.quiet_build:
+            sys.setswitchinterval(min(switch_interval, BUILD_SWITCH_INTERVAL))
+            gc.disable()
+        try:
+            snapshot = build_snapshot(data, self.path, live.version + 1)
+        except ValueError as e:
+            print(f"⚠️ Menu not reloaded, keeping version {live.version}: {e}")
+            return None
+        finally:
+            if self.quiet_build:
+                sys.setswitchinterval(switch_interval)
+                if collecting:
+                    gc.enable()
+        publish(snapshot)
+        print(f"🔄 Menu version {snapshot.version} loaded: {len(snapshot.menu)} dish(es) from {self.path}")
+        return snapshot
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
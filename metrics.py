@@ -0,0 +1,349 @@
+"""
+In-process latency histograms and counters for each stage of a turn.
+
+Code times a stage with a span:
+    
+    with STAGE_SECONDS.labels("recognition").time():
+        ...
+
+and counts events with COUNTER.labels(...).inc(). Observations go into
+fixed buckets under a per-series lock, about a microsecond per span, next
+to stages that take milliseconds (a few percent of process_input, see
+benchmarks/metrics_overhead.py). Set LUISQUISITE_METRICS=off (or call
+disable()) to turn them off entirely: spans and counters then return at
+once and nothing is recorded.
+
+Exporters:
+    render()                  Prometheus text exposition format
+    serve_prometheus(port)    /metrics on a local HTTP port
+    RollingFileExporter(path) JSON-lines snapshots in size-rotated files,
+                              for processes with no port of their own (Streamlit)
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Seconds; covers sub-millisecond matching up to multi-second recognition
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+ENABLED = os.environ.get("LUISQUISITE_METRICS", "on").lower() not in ("0", "off", "false", "no")
+
+_METRICS = []  # Every registered metric, in registration order
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    """Stop recording; spans and counters become no-ops."""
+    global ENABLED
+    ENABLED = False
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _NullTimer:
+    """Span used while metrics are off."""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("series", "start")
+    
+    def __init__(self, series):
+        self.series = series
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.series.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _HistogramSeries:
+    """One label combination of a histogram."""
+    
+    __slots__ = ("buckets", "counts", "sum", "lock")
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+    
+    def observe(self, value):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+    
+    def time(self):
+        """Context manager that observes the seconds spent inside it."""
+        return _Timer(self) if ENABLED else _NULL_TIMER
+    
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum
+
+
+class _CounterSeries:
+    """One label combination of a counter."""
+    
+    __slots__ = ("value", "lock")
+    
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+    
+    def inc(self, amount=1):
+        if not ENABLED:
+            return
+        with self.lock:
+            self.value += amount
+
+
+class _Metric:
+    kind = None
+    
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self.labels()  # Exported as 0 before the first event
+        _METRICS.append(self)
+    
+    def labels(self, *values):
+        """The series for these label values (in labelnames order)."""
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+    
+    def _new_series(self):
+        raise NotImplementedError
+    
+    def _items(self):
+        with self._lock:
+            return sorted(self._series.items())
+
+
+class Histogram(_Metric):
+    """Latency histogram with fixed buckets."""
+    
+    kind = "histogram"
+    
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+    
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+    
+    def observe(self, value, *labels):
+        self.labels(*labels).observe(value)
+    
+    def time(self, *labels):
+        """Span: with HISTOGRAM.time("stage"): ..."""
+        return self.labels(*labels).time() if ENABLED else _NULL_TIMER
+    
+    def render(self):
+        lines = []
+        for values, series in self._items():
+            counts, total = series.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, values, le)} {cumulative}")
+            labels = _label_text(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+    
+    def summary(self):
+        """{label values joined by ",": {"count", "sum", "p50", "p95", "p99"}}, from the buckets."""
+        result = {}
+        for values, series in self._items():
+            counts, total = series.snapshot()
+            count = sum(counts)
+            quantiles = {}
+            for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)) if count else ():
+                rank = fraction * count
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    if cumulative >= rank:
+                        quantiles[name] = bound
+                        break
+            result[",".join(values)] = {"count": count, "sum": total, **quantiles}
+        return result
+
+
+class Counter(_Metric):
+    """Monotonic event counter."""
+    
+    kind = "counter"
+    
+    def _new_series(self):
+        return _CounterSeries()
+    
+    def inc(self, amount=1, *labels):
+        self.labels(*labels).inc(amount)
+    
+    def render(self):
+        return [f"{self.name}{_label_text(self.labelnames, values)} {series.value}" for values, series in self._items()]
+    
+    def summary(self):
+        return {",".join(values): series.value for values, series in self._items()}
+
+
+# Turn stages: capture, vad, recognition, speak, turn (end to end); tts_render
+# (background speech synthesis into the cache) and html_render (Streamlit chat HTML)
+STAGE_SECONDS = Histogram("luisquisite_stage_seconds", "Seconds spent in each stage of a turn", ("stage",))
+PROCESS_INPUT_SECONDS = Histogram(
+    "luisquisite_process_input_seconds", "Seconds in OrderHandler.process_input by intent", ("intent",)
+)
+PHRASES = Counter("luisquisite_phrases_total", "Phrases sent to speech recognition")
+UNRECOGNIZED = Counter("luisquisite_unrecognized_audio_total", "Phrases recognition could not understand")
+RECOGNITION_ERRORS = Counter("luisquisite_recognition_errors_total", "Speech recognition RequestErrors")
+DISHES_MATCHED = Counter("luisquisite_dishes_matched_total", "Dishes matched in customer turns", ("dish",))
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """All metrics as plain data: {name: summary()}."""
+    return {metric.name: metric.summary() for metric in _METRICS}
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the console
+
+
+def serve_prometheus(port=9464, host="127.0.0.1"):
+    """
+    Serve /metrics for Prometheus on a background thread.
+    
+    Returns:
+        ThreadingHTTPServer: call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+class RollingFileExporter:
+    """
+    Append a snapshot() line to a file every interval, rotating by size.
+    
+    When the file passes max_bytes it becomes path.1 (path.1 becomes
+    path.2, ...), keeping `backups` old files.
+    """
+    
+    def __init__(self, path=None, interval=15, max_bytes=1024 * 1024, backups=3):
+        """
+        Args:
+            path: Output file; defaults to LUISQUISITE_METRICS_FILE, then metrics.jsonl
+            interval: Seconds between snapshots
+            max_bytes: Size at which the file is rotated
+            backups: Rotated files kept
+        """
+        self.path = path or os.environ.get("LUISQUISITE_METRICS_FILE", "metrics.jsonl")
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+    
+    def write(self):
+        """Append one snapshot now."""
+        if not ENABLED:
+            return
+        line = json.dumps({"time": time.time(), "metrics": snapshot()}) + "\n"
+        if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+    
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+    
+    def stop(self):
+        """Stop and write a final snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
@@ -2,133 +2,552 @@
 Order handling logic for Luisquisite restaurant.
 """
 
-from menu import MENU, get_menu_item, format_menu_for_display
+import struct
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from kitchen import KitchenBusy
+from metrics import DISHES_MATCHED, PROCESS_INPUT_SECONDS
+from menu import dish_id, dish_key, normalize_term
+from menu_store import current_menu
+from intent_matcher import INTENT_PRIORITY, quantity_before
+from responses import LANGUAGES, dish_phrase, format_list, language_code, response, static_responses, template
+
+
+# Compiled once at startup from the menu file (menu_store's first version)
+DEFAULT_MATCHER = current_menu().matcher
+
+# Distinct utterances whose scans process_batch keeps around
+_SCAN_CACHE_SIZE = 100_000
+
+# Session snapshots (OrderHandler.to_bytes): format version, flags, language
+# length, dish count; then the language tag, and per dish its key length, key
+# and quantity. Dish keys rather than ids, since ids are per process.
+_SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("<BBBH")
+_SNAPSHOT_DISH = struct.Struct("<HI")
+_GREETING_SAID = 1
+
+# Order pairs are unsigned 16-bit: dish ids (distinct dish keys per process)
+# and quantities both stay below this
+_ORDER_TYPECODE = "H"
+_ORDER_MAX = 0xFFFF
+
+
+class Order(bytes):
+    """
+    A customer's order as quantities of dishes.
+    
+    (dish id, quantity) pairs packed as 16-bit integers, in the order dishes
+    were first added, instead of one dish dict reference per item. Orders are
+    immutable: added() returns a new one, and sessions without an order all
+    share EMPTY_ORDER, so an idle session's order costs nothing and a copy of
+    a session shares its order.
+    """
+    
+    __slots__ = ()
+    
+    def _pairs(self):
+        return array(_ORDER_TYPECODE, self)
+    
+    def added(self, key, quantity=1):
+        """Return this order with quantity more of the dish with this key."""
+        dish = dish_id(key)
+        pairs = self._pairs()
+        try:
+            pos = 2 * pairs[0::2].index(dish)
+        except ValueError:
+            pairs.append(dish)
+            pairs.append(min(quantity, _ORDER_MAX))
+        else:
+            pairs[pos + 1] = min(pairs[pos + 1] + quantity, _ORDER_MAX)
+        return Order(pairs.tobytes())
+    
+    def entries(self):
+        """Return (dish_key, quantity) pairs in the order dishes were added."""
+        pairs = self._pairs()
+        return [(dish_key(pairs[pos]), pairs[pos + 1]) for pos in range(0, len(pairs), 2)]
+    
+    def total(self):
+        """Total number of items, counting quantities."""
+        return sum(self._pairs()[1::2])
+
+
+EMPTY_ORDER = Order()
+
+
+def _minutes(seconds):
+    """Whole minutes for a spoken estimate, at least one."""
+    return max(1, round(seconds / 60))
+
+
+def _describe(names, plurals, key, quantity, language=None):
+    """
+    Render one order line, e.g. "Salmon Bowl" or "2 Tuna Bowls".
+    
+    Args:
+        names: The matcher's dish names in language (IntentMatcher.dish_names)
+        plurals: The menu's irregular plurals in language (IntentMatcher.dish_plurals)
+    """
+    # Dishes taken off the menu since they were ordered are named by key
+    name = names.get(key, key)
+    return name if quantity == 1 else dish_phrase(name, quantity, language, plurals.get(key))
 
 
 class OrderHandler:
-    def __init__(self):
-        """Initialize order handler."""
-        self.current_order = []
+    __slots__ = (
+        "current_order", "greeting_said", "matcher", "follow_menu", "last_items", "language", "journal", "kitchen",
+        "metrics", "order_uid",
+    )
+    
+    def __init__(self, matcher=None, journal=None, kitchen=None):
+        """
+        Initialize order handler.
+        
+        Args:
+            matcher: IntentMatcher to use; None follows the live menu
+                (menu_store), switching versions between turns
+            journal: OrderJournal that confirmed orders are recorded in
+            kitchen: Kitchen that confirmed orders are dispatched to
+        """
+        self.current_order = EMPTY_ORDER
         self.greeting_said = False
+        self.follow_menu = matcher is None
+        self.matcher = matcher or current_menu().matcher
+        self.last_items = ()  # Dish keys added by the most recent turn
+        self.language = None  # Language of the latest recognized input
+        self.journal = journal
+        self.kitchen = kitchen
+        self.metrics = True  # Off for speculative copies, so turns aren't counted twice
+        # Journal id for an order confirmed by the next turn, set by callers
+        # that may run a turn twice (supervisor.py); None for a fresh one
+        self.order_uid = None
     
-    def process_input(self, text):
+    def process_input(self, text, language=None):
         """
         Process customer input and return appropriate response.
         
         Args:
             text: Customer's spoken input
+            language: Language the input was recognized in ("es-CO",
+                "en-US"), remembered for the session; None keeps the last one
             
         Returns:
             tuple: (response_text, should_continue)
         """
+        start = time.perf_counter()
+        if self.follow_menu:
+            # A reload swaps in a new snapshot; a turn uses one version throughout
+            self.matcher = current_menu().matcher
+        self.last_items = ()
+        if language:
+            self.language = language
         if not text:
-            return "I'm sorry, I didn't catch that. Could you repeat?", True
+            return response("not_heard", language_code(self.language)), True
         
         text_lower = text.lower().strip()
+        scan = self.matcher.scan(text_lower)
+        intent = self._resolve_intent(scan)
+        result = self._respond(text_lower, scan, intent)
+        if self.metrics:
+            PROCESS_INPUT_SECONDS.observe(time.perf_counter() - start, intent)
+            _count_dishes(self.last_items)
+        return result
+    
+    def _respond(self, text_lower, scan, intent=None):
+        """Act on an utterance that has already been normalized and scanned."""
+        if intent is None:
+            intent = self._resolve_intent(scan)
+        language = language_code(self.language)
         
         # Greeting
-        if not self.greeting_said or any(word in text_lower for word in ["hola", "hello", "hi", "buenos"]):
+        if intent == "greeting":
             self.greeting_said = True
-            greeting = (
-                "¡Bienvenido a Luisquisite! Welcome to Luisquisite! "
-                "I'm your robot waitress. How can I help you today? "
-                "Would you like to see our menu?"
-            )
-            return greeting, True
+            return response("greeting", language), True
         
         # Menu request
-        if any(word in text_lower for word in ["menu", "menú", "dishes", "platos", "what do you have", "qué tienen"]):
-            menu_text = format_menu_for_display()
-            return menu_text, True
+        if intent == "menu":
+            return self.matcher.menu_texts[language], True
         
         # Ordering items
-        order_keywords = ["quiero", "i want", "i'd like", "order", "pedir", "me gustaría", "dame", "give me"]
-        if any(keyword in text_lower for keyword in order_keywords):
-            return self._handle_order(text_lower), True
+        if intent == "order":
+            return self._handle_order(text_lower, scan), True
         
         # Confirming order
-        if any(word in text_lower for word in ["yes", "sí", "confirm", "confirmar", "that's all", "eso es todo", "listo"]):
+        if intent == "confirm":
             if not self.current_order:
-                return "You haven't ordered anything yet. What would you like?", True
-            return self._confirm_order(), False
+                return response("nothing_to_confirm", language), True
+            try:
+                return self._confirm_order(), False
+            except KitchenBusy as busy:
+                # Backpressure: keep the order and let the customer confirm later
+                return template("kitchen_busy", language)(minutes=_minutes(busy.retry_after)), True
         
         # Canceling or starting over
-        if any(word in text_lower for word in ["cancel", "cancelar", "start over", "empezar de nuevo", "no", "nada"]):
-            self.current_order = []
-            return "Order canceled. How can I help you?", True
+        if intent == "cancel":
+            self.current_order = EMPTY_ORDER
+            return response("canceled", language), True
         
         # Check current order
-        if any(word in text_lower for word in ["what did i order", "qué pedí", "my order", "mi pedido"]):
+        if intent == "summary":
             return self._get_current_order_summary(), True
         
         # Default response
-        return (
-            "I'm here to take your order. You can ask for the menu, "
-            "order a dish, or say 'that's all' when you're done. What would you like?",
-            True
+        return response("fallback", language), True
+    
+    def detect_intent(self, text):
+        """
+        Return the intent branch process_input would take, without side effects.
+        
+        Args:
+            text: Customer's spoken input
+            
+        Returns:
+            str: Intent name ("greeting", "menu", ..., "fallback") or None if empty
+        """
+        if not text:
+            return None
+        return self._resolve_intent(self.matcher.scan(text.lower().strip()))
+    
+    def _resolve_intent(self, scan):
+        """Pick the intent to act on from a scan, by priority."""
+        if not self.greeting_said or "greeting" in scan.intents:
+            return "greeting"
+        for intent in INTENT_PRIORITY[1:]:
+            if intent in scan.intents:
+                return intent
+        return "fallback"
+    
+    def _handle_order(self, text, scan=None):
+        """Extract order items and quantities from text and add to current order."""
+        if scan is None:
+            scan = self.matcher.scan(text)
+        mentions = scan.mentions
+        quantity_text = text
+        if not mentions:
+            # Fall back to fuzzy matching for misheard names ("salmon bol")
+            mentions = self.matcher.index.find_mentions(text)
+            quantity_text = normalize_term(text)
+        
+        quantities = {}
+        for key, start, _ in mentions:
+            quantities[key] = quantities.get(key, 0) + quantity_before(quantity_text, start)
+        
+        # Report dishes in menu order, as before
+        language = language_code(self.language)
+        names = self.matcher.dish_names[language]
+        plurals = self.matcher.dish_plurals[language]
+        found = self.matcher.in_menu_order(quantities)
+        order = self.current_order
+        for key in found:
+            order = order.added(key, quantities[key])
+        self.current_order = order
+        self.last_items = tuple(found)
+        
+        if not found:
+            return template("unknown_dish", language)(dishes=self.matcher.suggestions[language])
+        items = format_list(
+            tuple(_describe(names, plurals, key, quantities[key], language) for key in found), language
         )
+        total = self.current_order.total()
+        if total > sum(quantities.values()):
+            return template("added_total", language)(items=items, total=total)
+        return template("added", language)(items=items)
     
-    def _handle_order(self, text):
-        """Extract order items from text and add to current order."""
-        found_items = []
-        
-        # Check for each menu item
-        for item_key, item_data in MENU.items():
-            item_name = item_data["name"].lower()
-            # Check if item name or key is mentioned
-            if item_key in text or item_name in text:
-                found_items.append(item_data)
-                self.current_order.append(item_data)
-        
-        if found_items:
-            items_list = ", ".join([item["name"] for item in found_items])
-            response = f"Great! I've added {items_list} to your order."
-            if len(self.current_order) > len(found_items):
-                response += f" Your order now has {len(self.current_order)} item(s)."
-            response += " Anything else?"
-            return response
-        else:
-            return (
-                "I'm sorry, I didn't recognize that dish. "
-                "Please ask for the menu if you'd like to see our options, "
-                "or try ordering one of our dishes: salmon bowl, kiwi brunch, or tuna bowl."
-            )
+    def _order_text(self, language):
+        """The current order as a spoken list, one item per dish with its quantity."""
+        names = self.matcher.dish_names[language]
+        plurals = self.matcher.dish_plurals[language]
+        return format_list(
+            tuple(_describe(names, plurals, key, quantity, language) for key, quantity in self.current_order.entries()),
+            language,
+        )
     
     def _get_current_order_summary(self):
         """Get summary of current order."""
+        language = language_code(self.language)
         if not self.current_order:
-            return "You haven't ordered anything yet."
-        
-        items = [item["name"] for item in self.current_order]
-        if len(items) == 1:
-            return f"Your order: {items[0]}."
-        else:
-            items_text = ", ".join(items[:-1]) + f", and {items[-1]}"
-            return f"Your order: {items_text}."
+            return response("empty_order", language)
+        return template("summary", language)(items=self._order_text(language))
     
     def _confirm_order(self):
         """Confirm the final order."""
+        language = language_code(self.language)
         if not self.current_order:
-            return "You haven't ordered anything yet."
+            return response("empty_order", language)
         
-        items = [item["name"] for item in self.current_order]
-        items_text = ", ".join(items[:-1]) + f", and {items[-1]}" if len(items) > 1 else items[0]
+        entries = self.current_order.entries()
+        ready_text = response("ready_shortly", language)
+        uid = self.order_uid
+        if self.kitchen is not None:
+            # Raises KitchenBusy (before anything is recorded) if a station is full
+            ticket = self.kitchen.dispatch(entries)
+            ready_text = template("ready_in", language)(minutes=_minutes(ticket.quoted_seconds))
+            uid = ticket.uid
         
-        confirmation = (
-            f"Perfect! Your order is confirmed: {items_text}. "
-            f"Your order will be ready shortly. ¡Gracias por visitar Luisquisite! "
-            f"Thank you for visiting Luisquisite!"
-        )
+        confirmation = template("confirmed", language)(items=self._order_text(language), ready=ready_text)
+        
+        if self.journal is not None:
+            # Queued for the journal's writer thread; doesn't wait for disk
+            self.journal.record(entries, self.language, uid=uid)
         
         # Reset order for next customer
-        self.current_order = []
+        self.current_order = EMPTY_ORDER
         self.greeting_said = False
         
         return confirmation
     
+    def fixed_responses(self):
+        """
+        Every reply that doesn't depend on the order, including the menu and
+        the reply naming dishes to try.
+        
+        In the session's language once it is known, else in every language.
+        """
+        languages = (language_code(self.language),) if self.language else LANGUAGES
+        return tuple(
+            text
+            for language in languages
+            for text in (
+                *static_responses(language),
+                self.matcher.menu_texts[language],
+                template("unknown_dish", language)(dishes=self.matcher.suggestions[language]),
+            )
+        )
+    
+    def match_score(self, text):
+        """Intent keywords and dish names in text, for ranking transcripts."""
+        return self.matcher.score(text) if text else 0
+    
+    def to_bytes(self):
+        """
+        Compact snapshot of the session: order, greeting state and language.
+        
+        A few bytes per dish, for moving a session to another process or
+        restoring it after a crash (see from_bytes). The matcher, journal
+        and kitchen are not included.
+        """
+        entries = self.current_order.entries()
+        language = (self.language or "").encode("ascii", "replace")[:255]
+        parts = [_SNAPSHOT_HEADER.pack(
+            _SNAPSHOT_VERSION, _GREETING_SAID if self.greeting_said else 0, len(language), len(entries)
+        ), language]
+        for key, quantity in entries:
+            key = key.encode("utf-8")
+            parts.append(_SNAPSHOT_DISH.pack(len(key), quantity))
+            parts.append(key)
+        return b"".join(parts)
+    
+    @classmethod
+    def from_bytes(cls, data, matcher=None, journal=None, kitchen=None):
+        """
+        Restore a session from to_bytes().
+        
+        Args:
+            data: The snapshot
+            matcher, journal, kitchen: As for OrderHandler()
+        
+        Returns:
+            OrderHandler
+        
+        Raises:
+            ValueError: data isn't a snapshot this version can read
+        """
+        try:
+            version, flags, language_length, dishes = _SNAPSHOT_HEADER.unpack_from(data)
+            if version != _SNAPSHOT_VERSION:
+                raise ValueError(f"unsupported session snapshot version {version}")
+            pos = _SNAPSHOT_HEADER.size
+            language = data[pos:pos + language_length].decode("ascii")
+            pos += language_length
+            handler = cls(matcher, journal, kitchen)
+            order = EMPTY_ORDER
+            for _ in range(dishes):
+                key_length, quantity = _SNAPSHOT_DISH.unpack_from(data, pos)
+                pos += _SNAPSHOT_DISH.size
+                order = order.added(data[pos:pos + key_length].decode("utf-8"), quantity)
+                pos += key_length
+            handler.current_order = order
+        except (struct.error, UnicodeDecodeError) as e:
+            raise ValueError(f"corrupt session snapshot: {e}") from e
+        handler.greeting_said = bool(flags & _GREETING_SAID)
+        handler.language = language or None
+        return handler
+    
+    def copy(self):
+        """Independent copy of the session state, sharing the matcher (not the journal or kitchen)."""
+        clone = OrderHandler.__new__(OrderHandler)
+        clone.current_order = self.current_order  # Immutable, so shared
+        clone.greeting_said = self.greeting_said
+        clone.matcher = self.matcher
+        clone.follow_menu = self.follow_menu
+        clone.last_items = self.last_items
+        clone.language = self.language
+        clone.journal = None
+        clone.kitchen = None
+        clone.metrics = False
+        clone.order_uid = None
+        return clone
+    
     def reset(self):
         """Reset the order handler for a new customer."""
-        self.current_order = []
+        self.current_order = EMPTY_ORDER
         self.greeting_said = False
+        self.language = None
+    
+    @classmethod
+    def process_batch(cls, turns, processes=None, matcher=None):
+        """
+        Replay logged turns, one OrderHandler per session.
+        
+        Each session sees exactly what process_input would produce turn by
+        turn. Normalization and keyword scans are cached across the batch, so
+        repeated utterances are only matched once.
+        
+        Args:
+            turns: Iterable of (session_id, text) in conversation order
+            processes: Number of worker processes; None processes inline and
+                streams results in input order. With workers, sessions are
+                split across processes and results arrive grouped by session
+                (turn order within a session is kept)
+            matcher: IntentMatcher to use (defaults to the live menu's)
+            
+        Yields:
+            tuple: (session_id, response, should_continue, parsed_items)
+        """
+        if not processes:
+            yield from _replay_turns(turns, matcher)
+            return
+        
+        sessions = {}
+        for session_id, text in turns:
+            sessions.setdefault(session_id, []).append((session_id, text))
+        if not sessions:
+            return
+        
+        # Ship several sessions per task to keep pickling overhead down
+        groups = list(sessions.values())
+        per_task = max(1, len(groups) // (processes * 4))
+        chunks = [
+            [turn for group in groups[i:i + per_task] for turn in group]
+            for i in range(0, len(groups), per_task)
+        ]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for results in pool.map(_replay_chunk, chunks, [matcher] * len(chunks)):
+                yield from results
+
+
+class TurnPreview:
+    """
+    Speculative turn processing on partial transcripts.
+    
+    While the customer is still talking, update() runs each new partial
+    transcript through a copy of the handler, so the reply is ready before
+    they finish. commit() decides on the final transcript: if it matches the
+    last partial (and was recognized in the session's language), the copy's
+    state and reply are adopted; otherwise the turn runs on the real handler.
+    Either way the result equals process_input().
+    """
+    
+    __slots__ = ("handler", "text", "intent", "result", "_speculative")
+    
+    def __init__(self, handler):
+        self.handler = handler
+        self._clear()
+    
+    def _clear(self):
+        self.text = None
+        self.intent = None
+        self.result = None
+        self._speculative = None
+    
+    def update(self, partial):
+        """
+        Prepare the reply to a partial transcript.
+        
+        Returns:
+            str: The prepared response if it changed, else None
+        """
+        text = partial.lower().strip() if partial else ""
+        if not text or text == self.text:
+            return None
+        speculative = self.handler.copy()
+        previous = self.result
+        self.text = text
+        self.intent = self.handler.detect_intent(text)
+        self.result = speculative.process_input(text)
+        self._speculative = speculative
+        if previous is not None and previous[0] == self.result[0]:
+            return None
+        return self.result[0]
+    
+    def commit(self, final_text, language=None):
+        """
+        Apply the final transcript to the real handler.
+        
+        Args:
+            final_text: Final transcript (None if nothing was understood)
+            language: Language it was recognized in, as for process_input
+        
+        Returns:
+            tuple: (response_text, should_continue), as from process_input
+        """
+        start = time.perf_counter()
+        text = final_text.lower().strip() if final_text else ""
+        speculative = self._speculative
+        # The prepared reply was worded in the session's language so far; a
+        # turn recognized in another language is replayed so it answers in
+        # that one. A confirmation is replayed for real so it reaches the journal.
+        same_language = not language or language_code(language) == language_code(self.handler.language)
+        if speculative is not None and text == self.text and self.result[1] and same_language:
+            result = self.result
+            handler = self.handler
+            handler.current_order = speculative.current_order
+            handler.greeting_said = speculative.greeting_said
+            handler.last_items = speculative.last_items
+            if language:
+                handler.language = language
+            if handler.metrics:
+                # The turn's time on the critical path is just the adoption
+                PROCESS_INPUT_SECONDS.observe(time.perf_counter() - start, self.intent)
+                _count_dishes(handler.last_items)
+        else:
+            result = self.handler.process_input(final_text, language)
+        self._clear()
+        return result
+
+
+def _count_dishes(keys):
+    for key in keys:
+        DISHES_MATCHED.labels(key).inc()
+
+
+def _replay_turns(turns, matcher=None):
+    """Process (session_id, text) turns inline; see OrderHandler.process_batch."""
+    handlers = {}
+    scans = {}
+    for session_id, text in turns:
+        handler = handlers.get(session_id)
+        if handler is None:
+            handler = handlers[session_id] = OrderHandler(matcher)
+        
+        if not text:
+            response, should_continue = handler.process_input(text)
+        else:
+            cached = scans.get(text)
+            if cached is None:
+                if len(scans) >= _SCAN_CACHE_SIZE:
+                    scans.clear()
+                text_lower = text.lower().strip()
+                cached = scans[text] = (text_lower, handler.matcher.scan(text_lower))
+            handler.last_items = ()
+            response, should_continue = handler._respond(*cached)
+        yield session_id, response, should_continue, handler.last_items
+
+
+def _replay_chunk(turns, matcher=None):
+    """Worker entry point for process_batch: replay a chunk of whole sessions."""
+    return list(_replay_turns(turns, matcher))
 
 
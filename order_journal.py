@@ -0,0 +1,305 @@
+"""
+Durable, append-only journal of confirmed orders.
+
+Confirmations are handed to a writer thread and never wait for the disk:
+record() appends the entry to a spool file (one write, no fsync) and queues
+it. The writer commits whatever has queued up in one SQLite transaction
+(group commit), so a burst of confirmations costs one commit, not one each.
+Once everything queued is committed the spool is emptied; if the process
+dies first, the next journal opened on the same database replays the spool.
+Each journal holds an flock on its spool while it runs, so a spool nobody
+has locked is orphaned whatever became of its process id. Replays are
+idempotent because every order carries a unique id. A batch that can't be
+written (e.g. the database is locked by another process) is retried with
+backoff and the error kept in `error`; if it still fails, its orders stay
+in the spool and are retried every RETRY_INTERVAL seconds, and on close
+the spool is kept for the next journal to replay.
+
+The database runs in WAL mode, so the kitchen and reports can query it
+while orders are being written. Orders are indexed by confirmation time,
+and their items by dish and time.
+"""
+
+import fcntl
+import glob
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+# Attempts at writing a batch, and the first pause between them (doubling)
+WRITE_ATTEMPTS = 5
+RETRY_DELAY = 0.05
+# Seconds between further tries of batches that failed every attempt
+RETRY_INTERVAL = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    order_uid TEXT NOT NULL UNIQUE,
+    confirmed_at REAL NOT NULL,
+    language TEXT,
+    items INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_confirmed_at ON orders (confirmed_at);
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id INTEGER NOT NULL REFERENCES orders (id),
+    dish TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    confirmed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS order_items_dish ON order_items (dish, confirmed_at);
+"""
+
+
+class OrderJournal:
+    """Asynchronous, group-committed SQLite journal of confirmed orders."""
+    
+    def __init__(self, path=None, batch_size=1000):
+        """
+        Open (or create) a journal and start its writer thread.
+        
+        Args:
+            path: SQLite database; defaults to LUISQUISITE_JOURNAL, then orders.db
+            batch_size: Most orders written in one transaction
+        """
+        self.path = path or os.environ.get("LUISQUISITE_JOURNAL", "orders.db")
+        self.batch_size = batch_size
+        # One spool per journal, so several server workers can share a database
+        self.spool_path = f"{self.path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.spool"
+        self.committed = 0
+        self.batches = 0
+        self.failed = 0  # Orders whose batch failed, waiting for a retry
+        self.error = None  # Latest write (or startup) error
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()  # Orders spool appends against truncation
+        self._spool = None
+        self._failed_orders = []
+        self._ready = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="order-journal", daemon=True)
+        self._writer.start()
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+    
+    def record(self, entries, language=None, confirmed_at=None, uid=None):
+        """
+        Journal a confirmed order without waiting for it to be written.
+        
+        Args:
+            entries: [(dish_key, quantity), ...]
+            language: Language the order was taken in
+            confirmed_at: Unix time of confirmation (defaults to now)
+            uid: Order id to store (e.g. the kitchen ticket's); a new one if None
+        
+        Returns:
+            str: The order's unique id
+        """
+        order = {
+            "uid": uid or uuid.uuid4().hex,
+            "at": confirmed_at if confirmed_at is not None else time.time(),
+            "language": language,
+            "items": [[key, quantity] for key, quantity in entries],
+        }
+        line = (json.dumps(order, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            os.write(self._spool, line)
+            self._queue.put(order)
+        return order["uid"]
+    
+    def flush(self):
+        """Block until every order recorded so far is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+    
+    def close(self):
+        """Commit what is queued and stop the writer."""
+        self._queue.put(None)
+        self._writer.join()
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only syncs at checkpoints; the spool covers crashes
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _run(self):
+        try:
+            conn = self._connect()
+            conn.executescript(SCHEMA)
+            self._replay_spools(conn)
+            self._spool = self._open_spool()
+        except Exception as e:
+            self.error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        
+        stopping = False
+        while not stopping:
+            # Group commit: take everything that queued up during the last commit
+            try:
+                batch = [self._queue.get(timeout=RETRY_INTERVAL if self._failed_orders else None)]
+            except queue.Empty:
+                batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Batches that failed before go first; they are still in the spool
+            orders = self._failed_orders + [item for item in batch if isinstance(item, dict)]
+            stopping = None in batch
+            if orders:
+                if self._commit(conn, orders):
+                    self.committed += len(orders)
+                    self.batches += 1
+                    self._failed_orders = []
+                else:
+                    self._failed_orders = orders
+                self.failed = len(self._failed_orders)
+            try:
+                with self._lock:
+                    if self._queue.empty() and not self.failed:
+                        # Everything in the spool is committed
+                        os.ftruncate(self._spool, 0)
+            except OSError as e:
+                self.error = e
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+        if self.failed:
+            print(f"⚠️ {self.failed} order(s) not journaled; kept in {self.spool_path} for the next start")
+        else:
+            os.remove(self.spool_path)
+        os.close(self._spool)  # Releases the lock
+        conn.close()
+    
+    def _commit(self, conn, orders):
+        """
+        Write a batch, retrying with backoff.
+        
+        Returns:
+            bool: False if every attempt failed (the error is in self.error)
+        """
+        delay = RETRY_DELAY
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                self._write(conn, orders)
+                return True
+            except Exception as e:
+                self.error = e
+                print(f"⚠️ Order journal write failed ({e}), attempt {attempt + 1} of {WRITE_ATTEMPTS}")
+                if attempt + 1 < WRITE_ATTEMPTS:
+                    time.sleep(delay)
+                    delay *= 2
+        return False
+    
+    @staticmethod
+    def _write(conn, orders):
+        with conn:
+            for order in orders:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO orders (order_uid, confirmed_at, language, items) VALUES (?, ?, ?, ?)",
+                    (order["uid"], order["at"], order["language"], sum(q for _, q in order["items"])),
+                )
+                if cursor.rowcount:
+                    conn.executemany(
+                        "INSERT INTO order_items (order_id, dish, quantity, confirmed_at) VALUES (?, ?, ?, ?)",
+                        [(cursor.lastrowid, key, quantity, order["at"]) for key, quantity in order["items"]],
+                    )
+    
+    def _open_spool(self):
+        """Create this journal's spool, locked for as long as the journal runs."""
+        # Locked under a name replays don't look at, then renamed into place,
+        # so no other journal ever sees it unlocked
+        creating = self.spool_path + ".new"
+        fd = os.open(creating, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.rename(creating, self.spool_path)
+        except OSError:
+            os.close(fd)
+            raise
+        return fd
+    
+    def _replay_spools(self, conn):
+        """Commit orders left in spools by journals that died."""
+        for spool_path in glob.glob(glob.escape(self.path) + ".*.spool"):
+            try:
+                fd = os.open(spool_path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue  # Replayed by another journal meanwhile
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # Its journal is running
+                try:
+                    if os.fstat(fd).st_ino != os.stat(spool_path).st_ino:
+                        continue  # Replayed and removed while this journal waited for the lock
+                except FileNotFoundError:
+                    continue
+                orders = []
+                with os.fdopen(os.dup(fd), encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            orders.append(json.loads(line))
+                        except ValueError:
+                            break  # Torn final write
+                if orders:
+                    self._write(conn, orders)
+                    print(f"♻️ Replayed {len(orders)} order(s) from {spool_path}")
+                # Removed before the lock is released, so nobody replays it twice
+                os.remove(spool_path)
+            finally:
+                os.close(fd)
+    
+    # Kitchen and reporting queries; safe to run while orders are written
+    
+    def orders_between(self, start, end=None):
+        """
+        Orders confirmed in [start, end), oldest first.
+        
+        Returns:
+            list: (order_uid, confirmed_at, language, [(dish, quantity), ...])
+        """
+        end = end if end is not None else time.time() + 1
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT o.id, o.order_uid, o.confirmed_at, o.language, i.dish, i.quantity "
+                "FROM orders o JOIN order_items i ON i.order_id = o.id "
+                "WHERE o.confirmed_at >= ? AND o.confirmed_at < ? ORDER BY o.confirmed_at, o.id",
+                (start, end),
+            ).fetchall()
+        finally:
+            conn.close()
+        orders = {}
+        for order_id, uid, confirmed_at, language, dish, quantity in rows:
+            order = orders.setdefault(order_id, (uid, confirmed_at, language, []))
+            order[3].append((dish, quantity))
+        return list(orders.values())
+    
+    def dish_totals(self, since=0.0, dish=None):
+        """Quantity ordered per dish since a time: {dish: quantity}."""
+        conn = self._connect()
+        try:
+            if dish is None:
+                rows = conn.execute(
+                    "SELECT dish, SUM(quantity) FROM order_items WHERE confirmed_at >= ? GROUP BY dish",
+                    (since,),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT dish, SUM(quantity) FROM order_items WHERE dish = ? AND confirmed_at >= ?",
+                    (dish, since),
+                ).fetchall()
+        finally:
+            conn.close()
+        return {name: total for name, total in rows if name is not None}
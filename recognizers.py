@@ -0,0 +1,465 @@
+"""
+Speech recognition backends for the Luisquisite voice agent.
+
+Every backend takes an sr.AudioData and returns a RecognitionResult with the
+transcript, a confidence between 0 and 1 (None if the engine gives none) and
+the call latency. Failures use the speech_recognition exceptions:
+sr.UnknownValueError when nothing was understood and sr.RequestError when the
+engine itself is unavailable.
+
+Backends can also stream: stream() returns an object that takes audio chunks
+as they are captured and returns partial transcripts, so intent detection can
+start before the customer stops talking.
+
+MultiLanguageRecognizer runs one backend in several languages in parallel
+and keeps the hypothesis that scores best.
+
+Backends are chosen by name, e.g. create_backend("vosk"), or through the
+LUISQUISITE_RECOGNIZER environment variable. A comma-separated list such as
+"google,vosk" falls back to the next backend when one is unavailable.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+
+RecognitionResult = namedtuple(
+    "RecognitionResult", ["text", "confidence", "latency", "backend", "language"]
+)
+
+
+class RecognizerBackend:
+    """Base class: subclasses implement _recognize()."""
+    
+    name = "base"
+    
+    def recognize(self, audio, language="es-CO"):
+        """
+        Transcribe audio.
+        
+        Args:
+            audio: sr.AudioData to transcribe
+            language: BCP-47 language tag, e.g. "es-CO" or "en-US"
+        
+        Returns:
+            RecognitionResult: text, confidence, latency (seconds), backend, language
+        
+        Raises:
+            sr.UnknownValueError: Speech was not understood
+            sr.RequestError: The engine is unavailable
+        """
+        start = time.perf_counter()
+        text, confidence = self._recognize(audio, language)
+        return RecognitionResult(text, confidence, time.perf_counter() - start, self.name, language)
+    
+    def _recognize(self, audio, language):
+        """Return (text, confidence) or raise sr.UnknownValueError/sr.RequestError."""
+        raise NotImplementedError
+    
+    def stream(self, language, sample_rate, sample_width):
+        """
+        Start incremental recognition of one utterance.
+        
+        Backends without a streaming engine buffer the audio and recognize
+        it in one call when the utterance ends, with no partial results.
+        
+        Returns:
+            An object with feed(chunk) -> partial text or None, and
+            finish() -> RecognitionResult
+        """
+        return BufferedStream(self, language, sample_rate, sample_width)
+
+
+class BufferedStream:
+    """Stream adapter for backends that only recognize whole utterances."""
+    
+    def __init__(self, backend, language, sample_rate, sample_width):
+        self.backend = backend
+        self.language = language
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self._chunks = []
+    
+    def feed(self, chunk):
+        self._chunks.append(chunk)
+        return None
+    
+    def finish(self):
+        audio = sr.AudioData(b"".join(self._chunks), self.sample_rate, self.sample_width)
+        return self.backend.recognize(audio, self.language)
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API (needs an internet connection)."""
+    
+    name = "google"
+    
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer or sr.Recognizer()
+    
+    def _recognize(self, audio, language):
+        result = self.recognizer.recognize_google(audio, language=language, show_all=True)
+        alternatives = result.get("alternative") if isinstance(result, dict) else None
+        if not alternatives:
+            raise sr.UnknownValueError()
+        best = alternatives[0]
+        return best["transcript"], best.get("confidence")
+
+
+class VoskBackend(RecognizerBackend):
+    """
+    Offline recognition on the CPU with Vosk (Kaldi) models.
+    
+    Models are loaded lazily, one per language, from model_dir/<language>
+    (e.g. models/es-CO), and shared by every call.
+    """
+    
+    name = "vosk"
+    SAMPLE_RATE = 16000
+    
+    def __init__(self, model_dir=None):
+        self.model_dir = model_dir or os.environ.get("LUISQUISITE_VOSK_MODEL_DIR", "models")
+        self._models = {}
+        self._lock = threading.Lock()
+    
+    def model(self, language):
+        """Load (once) and return the Vosk model for a language."""
+        with self._lock:
+            model = self._models.get(language)
+            if model is None:
+                try:
+                    import vosk
+                except ImportError as e:
+                    raise sr.RequestError("vosk is not installed; pip install vosk") from e
+                path = os.path.join(self.model_dir, language)
+                if not os.path.isdir(path):
+                    raise sr.RequestError(f"no Vosk model for {language} at {path}")
+                vosk.SetLogLevel(-1)
+                model = self._models[language] = vosk.Model(path)
+            return model
+    
+    def recognizer_for(self, language):
+        """A fresh KaldiRecognizer, also used for streaming recognition."""
+        model = self.model(language)  # Raises RequestError if vosk is missing
+        import vosk
+        recognizer = vosk.KaldiRecognizer(model, self.SAMPLE_RATE)
+        recognizer.SetWords(True)
+        return recognizer
+    
+    def _recognize(self, audio, language):
+        recognizer = self.recognizer_for(language)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2))
+        return self._parse(recognizer.FinalResult())
+    
+    @staticmethod
+    def _parse(result_json):
+        """Turn a Vosk JSON result into (text, confidence)."""
+        result = json.loads(result_json)
+        text = result.get("text", "").strip()
+        if not text:
+            raise sr.UnknownValueError()
+        words = result.get("result") or []
+        confidence = sum(word["conf"] for word in words) / len(words) if words else None
+        return text, confidence
+    
+    def stream(self, language, sample_rate, sample_width):
+        if sample_width != 2:
+            return super().stream(language, sample_rate, sample_width)
+        return VoskStream(self, language, sample_rate)
+
+
+class VoskStream:
+    """Incremental Vosk recognition with partial hypotheses."""
+    
+    def __init__(self, backend, language, sample_rate):
+        model = backend.model(language)  # Raises RequestError if vosk is missing
+        import vosk
+        self.backend = backend
+        self.language = language
+        self.recognizer = vosk.KaldiRecognizer(model, sample_rate)
+        self.recognizer.SetWords(True)
+        self._segments = []  # Vosk finalizes a segment at each internal pause
+        self._words = []
+    
+    def _add_segment(self, result_json):
+        result = json.loads(result_json)
+        if result.get("text"):
+            self._segments.append(result["text"])
+            self._words.extend(result.get("result") or [])
+    
+    def feed(self, chunk):
+        """Add audio; return the current best transcript of the utterance."""
+        if self.recognizer.AcceptWaveform(chunk):
+            self._add_segment(self.recognizer.Result())
+            return " ".join(self._segments)
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return " ".join(self._segments + [partial]).strip()
+    
+    def finish(self):
+        """Finalize; latency counts from the end of the utterance."""
+        start = time.perf_counter()
+        self._add_segment(self.recognizer.FinalResult())
+        text = " ".join(self._segments).strip()
+        if not text:
+            raise sr.UnknownValueError()
+        words = self._words
+        confidence = sum(word["conf"] for word in words) / len(words) if words else None
+        return RecognitionResult(text, confidence, time.perf_counter() - start, self.backend.name, self.language)
+
+
+class SphinxBackend(RecognizerBackend):
+    """Offline recognition with CMU PocketSphinx (needs language packs)."""
+    
+    name = "sphinx"
+    
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer or sr.Recognizer()
+    
+    def _recognize(self, audio, language):
+        decoder = self.recognizer.recognize_sphinx(audio, language=language, show_all=True)
+        hypothesis = decoder.hyp()
+        if hypothesis is None or not hypothesis.hypstr:
+            raise sr.UnknownValueError()
+        confidence = decoder.get_logmath().exp(hypothesis.prob)
+        return hypothesis.hypstr, confidence
+
+
+class ScriptedBackend(RecognizerBackend):
+    """
+    Deterministic stand-in for tests and benchmarks.
+    
+    Returns canned transcripts in order, ignoring the audio. A None entry
+    means "not understood"; an exception instance is raised as is. An entry
+    can also be (text, language): calls in another language get the same
+    text at a lower confidence, so MultiLanguageRecognizer picks the
+    language it was spoken in.
+    """
+    
+    name = "scripted"
+    # Confidence factor for a transcript recognized in a language it wasn't spoken in
+    OFF_LANGUAGE_CONFIDENCE = 0.5
+    
+    def __init__(self, transcripts=(), confidence=1.0, delay=0.0, calls_per_phrase=1):
+        """
+        Args:
+            transcripts: Iterable of transcripts, (transcript, language)
+                pairs, None or exceptions
+            confidence: Confidence reported with every transcript
+            delay: Seconds to sleep per call, to simulate engine latency
+            calls_per_phrase: Calls sharing one transcript, e.g. the number
+                of languages a MultiLanguageRecognizer asks for
+        """
+        self._transcripts = iter(transcripts)
+        self.confidence = confidence
+        self.delay = delay
+        self.calls_per_phrase = calls_per_phrase
+        self._calls = 0
+        self._current = None
+        self._lock = threading.Lock()
+    
+    def _next(self):
+        with self._lock:
+            if self._calls % self.calls_per_phrase == 0:
+                self._current = next(self._transcripts, None)
+            self._calls += 1
+            return self._current
+    
+    def _recognize(self, audio, language):
+        return self._result(self._next(), language)
+    
+    def _result(self, entry, language):
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(entry, Exception):
+            raise entry
+        text, spoken = entry if isinstance(entry, tuple) else (entry, None)
+        if not text:
+            raise sr.UnknownValueError()
+        if spoken and spoken.split("-")[0] != language.split("-")[0]:
+            return text, self.confidence * self.OFF_LANGUAGE_CONFIDENCE
+        return text, self.confidence
+    
+    def stream(self, language, sample_rate, sample_width):
+        return ScriptedStream(self, language, self._next())
+
+
+class ScriptedStream:
+    """Reveals a canned transcript one word per few chunks, like partials."""
+    
+    CHUNKS_PER_WORD = 4
+    
+    def __init__(self, backend, language, entry):
+        self.backend = backend
+        self.language = language
+        self.entry = entry
+        self._chunks = 0
+    
+    def feed(self, chunk):
+        self._chunks += 1
+        text = self.entry[0] if isinstance(self.entry, tuple) else self.entry
+        if not isinstance(text, str):
+            return None
+        words = text.split()
+        return " ".join(words[:self._chunks // self.CHUNKS_PER_WORD]) or None
+    
+    def finish(self):
+        start = time.perf_counter()
+        text, confidence = self.backend._result(self.entry, self.language)
+        return RecognitionResult(text, confidence, time.perf_counter() - start, self.backend.name, self.language)
+
+
+class FallbackBackend(RecognizerBackend):
+    """Try backends in order, moving on when one is unavailable (RequestError)."""
+    
+    def __init__(self, backends):
+        self.backends = list(backends)
+        self.name = ",".join(backend.name for backend in self.backends)
+    
+    def recognize(self, audio, language="es-CO"):
+        error = None
+        for backend in self.backends:
+            try:
+                return backend.recognize(audio, language)
+            except sr.RequestError as e:
+                print(f"⚠️ {backend.name} recognizer unavailable ({e}), trying next")
+                error = e
+        raise error
+    
+    def stream(self, language, sample_rate, sample_width):
+        # Which backend is reachable is only known per call, so buffer
+        return BufferedStream(self, language, sample_rate, sample_width)
+
+
+class MultiLanguageRecognizer:
+    """
+    Recognize each phrase in several languages at once and keep the best.
+    
+    Every language runs on its own pool thread, so the wall-clock latency is
+    that of the slowest call rather than the sum. Hypotheses are ranked by
+    the engine's confidence plus a bonus for each intent keyword or dish name
+    they contain (see IntentMatcher.score); ties go to the first language.
+    """
+    
+    # Confidence assumed when an engine reports none
+    DEFAULT_CONFIDENCE = 0.5
+    # Score added per matched term, and the most terms that count
+    TERM_WEIGHT = 0.2
+    MAX_TERMS = 3
+    
+    def __init__(self, backend, languages=("es-CO", "en-US"), scorer=None, executor=None):
+        """
+        Args:
+            backend: RecognizerBackend used for every language
+            languages: Language tags, the primary (tie-winning) one first
+            scorer: Callable text -> number of matched domain terms
+            executor: Executor for the per-language calls
+        """
+        self.backend = backend
+        self.languages = tuple(languages)
+        self.scorer = scorer
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=len(self.languages), thread_name_prefix="recognize"
+        )
+    
+    def score(self, result):
+        confidence = result.confidence if result.confidence is not None else self.DEFAULT_CONFIDENCE
+        terms = self.scorer(result.text) if self.scorer is not None else 0
+        return confidence + self.TERM_WEIGHT * min(terms, self.MAX_TERMS)
+    
+    def best(self, results):
+        """The highest-scoring RecognitionResult (the first one on ties)."""
+        best = None
+        best_score = None
+        for result in results:
+            score = self.score(result)
+            if best is None or score > best_score:
+                best, best_score = result, score
+        return best
+    
+    def recognize(self, audio):
+        """
+        Transcribe audio in every language in parallel.
+        
+        Returns:
+            RecognitionResult: The best hypothesis; latency is wall-clock time
+        
+        Raises:
+            sr.UnknownValueError: No language understood anything
+            sr.RequestError: Every call failed because the engine is unavailable
+        """
+        start = time.perf_counter()
+        futures = [self.executor.submit(self.backend.recognize, audio, language) for language in self.languages]
+        return self._pick(futures, start)
+    
+    def stream(self, sample_rate, sample_width):
+        """Stream to one recognizer per language; partials come from the primary."""
+        streams = [self.backend.stream(language, sample_rate, sample_width) for language in self.languages]
+        return MultiLanguageStream(self, streams)
+    
+    def _pick(self, futures, start):
+        results = []
+        errors = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except (sr.UnknownValueError, sr.RequestError) as e:
+                errors.append(e)
+        if results:
+            return self.best(results)._replace(latency=time.perf_counter() - start)
+        for error in errors:
+            if isinstance(error, sr.UnknownValueError):
+                raise error
+        raise errors[0]
+
+
+class MultiLanguageStream:
+    """Feeds every chunk to one stream per language."""
+    
+    def __init__(self, recognizer, streams):
+        self.recognizer = recognizer
+        self.streams = streams
+    
+    def feed(self, chunk):
+        partials = [stream.feed(chunk) for stream in self.streams]
+        return partials[0]
+    
+    def finish(self):
+        start = time.perf_counter()
+        futures = [self.recognizer.executor.submit(stream.finish) for stream in self.streams]
+        return self.recognizer._pick(futures, start)
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "vosk": VoskBackend,
+    "sphinx": SphinxBackend,
+    "scripted": ScriptedBackend,
+}
+
+
+def create_backend(name=None, **options):
+    """
+    Build a recognizer backend by name.
+    
+    Args:
+        name: Backend name, a comma-separated fallback chain ("google,vosk"),
+            or None to read LUISQUISITE_RECOGNIZER (default "google")
+        **options: Keyword arguments for a single backend's constructor
+    
+    Returns:
+        RecognizerBackend
+    """
+    name = name or os.environ.get("LUISQUISITE_RECOGNIZER", "google")
+    names = [part.strip() for part in name.split(",") if part.strip()]
+    unknown = [part for part in names if part not in BACKENDS]
+    if unknown or not names:
+        raise ValueError(f"unknown recognizer {name!r}; choose from {', '.join(BACKENDS)}")
+    if len(names) == 1:
+        return BACKENDS[names[0]](**options)
+    return FallbackBackend(BACKENDS[part]() for part in names)
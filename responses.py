@@ -0,0 +1,308 @@
+"""
+Response catalog for Luisquisite: every reply, per intent and language.
+
+Replies come in English ("en") and Spanish ("es"), picked by the language
+the guest was recognized in. Until that is known (the web app, the first
+turn of a conversation), the bilingual replies the robot has always given
+are used. Spoken replies in one language are shorter, and speech rendering
+is the slowest stage of a turn.
+
+The catalog is compiled once at import: static replies are interned and
+stored ready to return, templates become functions that concatenate their
+interned literal parts with the fields, and every language of a reply is
+checked to take the same fields. Lists of dishes are
+joined by one memoized routine, so a repeated order line or list costs a
+dict lookup.
+"""
+
+import string
+import sys
+from functools import lru_cache
+
+
+ENGLISH = "en"
+SPANISH = "es"
+BILINGUAL = None  # Language not known yet
+LANGUAGES = (BILINGUAL, ENGLISH, SPANISH)
+
+# {key: {language: text}}; a missing bilingual text falls back to English.
+# Texts with {fields} are templates (see template()), the rest static replies
+# (see response()).
+CATALOG = {
+    "greeting": {
+        BILINGUAL: (
+            "¡Bienvenido a Luisquisite! Welcome to Luisquisite! "
+            "I'm your robot waitress. How can I help you today? "
+            "Would you like to see our menu?"
+        ),
+        ENGLISH: (
+            "Welcome to Luisquisite! I'm your robot waitress. "
+            "How can I help you today? Would you like to see our menu?"
+        ),
+        SPANISH: (
+            "¡Bienvenido a Luisquisite! Soy tu mesera robot. "
+            "¿En qué te puedo ayudar hoy? ¿Quieres ver nuestro menú?"
+        ),
+    },
+    "not_heard": {
+        ENGLISH: "I'm sorry, I didn't catch that. Could you repeat?",
+        SPANISH: "Lo siento, no te entendí. ¿Me lo repites?",
+    },
+    "nothing_to_confirm": {
+        ENGLISH: "You haven't ordered anything yet. What would you like?",
+        SPANISH: "Todavía no has pedido nada. ¿Qué te gustaría?",
+    },
+    "empty_order": {
+        ENGLISH: "You haven't ordered anything yet.",
+        SPANISH: "Todavía no has pedido nada.",
+    },
+    "canceled": {
+        ENGLISH: "Order canceled. How can I help you?",
+        SPANISH: "Pedido cancelado. ¿En qué te puedo ayudar?",
+    },
+    "fallback": {
+        ENGLISH: (
+            "I'm here to take your order. You can ask for the menu, "
+            "order a dish, or say 'that's all' when you're done. What would you like?"
+        ),
+        SPANISH: (
+            "Estoy aquí para tomar tu pedido. Puedes pedir el menú, "
+            "pedir un plato o decir 'eso es todo' cuando termines. ¿Qué te gustaría?"
+        ),
+    },
+    "unknown_dish": {
+        ENGLISH: (
+            "I'm sorry, I didn't recognize that dish. "
+            "Please ask for the menu if you'd like to see our options, "
+            "or try ordering one of our dishes: {dishes}."
+        ),
+        SPANISH: (
+            "Lo siento, no reconocí ese plato. "
+            "Pide el menú si quieres ver nuestras opciones, "
+            "o pide uno de nuestros platos: {dishes}."
+        ),
+    },
+    "menu": {
+        ENGLISH: "Here is our menu today: {dishes}.",
+        SPANISH: "Este es nuestro menú de hoy: {dishes}.",
+    },
+    "added": {
+        ENGLISH: "Great! I've added {items} to your order. Anything else?",
+        SPANISH: "¡Perfecto! Agregué {items} a tu pedido. ¿Algo más?",
+    },
+    "added_total": {
+        ENGLISH: "Great! I've added {items} to your order. Your order now has {total} item(s). Anything else?",
+        SPANISH: "¡Perfecto! Agregué {items} a tu pedido. Ahora tu pedido tiene {total} plato(s). ¿Algo más?",
+    },
+    "summary": {
+        ENGLISH: "Your order: {items}.",
+        SPANISH: "Tu pedido: {items}.",
+    },
+    "confirmed": {
+        BILINGUAL: (
+            "Perfect! Your order is confirmed: {items}. "
+            "{ready} ¡Gracias por visitar Luisquisite! "
+            "Thank you for visiting Luisquisite!"
+        ),
+        ENGLISH: "Perfect! Your order is confirmed: {items}. {ready} Thank you for visiting Luisquisite!",
+        SPANISH: "¡Perfecto! Tu pedido está confirmado: {items}. {ready} ¡Gracias por visitar Luisquisite!",
+    },
+    # The wait in "confirmed", from the kitchen's estimate
+    "ready_shortly": {
+        ENGLISH: "Your order will be ready shortly.",
+        SPANISH: "Tu pedido estará listo en breve.",
+    },
+    "ready_in": {
+        ENGLISH: "Your order will be ready in about {minutes} minute(s).",
+        SPANISH: "Tu pedido estará listo en unos {minutes} minuto(s).",
+    },
+    "kitchen_busy": {
+        ENGLISH: (
+            "I'm sorry, the kitchen is full right now and can't take your order yet. "
+            "It should have room in about {minutes} minute(s); say 'that's all' again then, "
+            "or keep adding to your order."
+        ),
+        SPANISH: (
+            "Lo siento, la cocina está llena y todavía no puede recibir tu pedido. "
+            "Debería tener espacio en unos {minutes} minuto(s); entonces di 'eso es todo' otra vez, "
+            "o sigue agregando platos a tu pedido."
+        ),
+    },
+}
+
+# Pieces of other replies rather than replies of their own
+FRAGMENTS = ("ready_shortly", "ready_in")
+
+# Words joining the last two items of a list, per language
+_LIST_AND = {BILINGUAL: "and", ENGLISH: "and", SPANISH: "y"}
+_LIST_OR = {BILINGUAL: "or", ENGLISH: "or", SPANISH: "o"}
+# Stressed final vowels, unaccented when a Spanish plural adds a syllable ("camarón" -> "camarones")
+_UNSTRESS = str.maketrans("áéíóú", "aeiou")
+_VOWELS = "aeiouáéíóú"
+
+
+def compile_template(text):
+    """
+    Compile a template into a function of its fields.
+    
+    "Hi {name}!" becomes the equivalent of lambda *, name: f"Hi {name}!",
+    with the literal text interned, so rendering concatenates strings
+    instead of parsing the template again (as str.format does).
+    
+    Returns:
+        tuple: (render function, frozenset of field names)
+    
+    Raises:
+        ValueError: A field isn't a plain name (no indexing, conversions or specs)
+    """
+    names = {}
+    pieces = []
+    for literal, field, spec, conversion in string.Formatter().parse(text):
+        if literal:
+            name = f"_{len(names)}"
+            names[name] = sys.intern(literal)
+            pieces.append("{" + name + "}")
+        if field is not None:
+            if not field.isidentifier() or field.startswith("_") or spec or conversion:
+                raise ValueError(f"unsupported field {{{field}}} in template: {text!r}")
+            pieces.append("{" + field + "}")
+    fields = frozenset(field for _, field, _, _ in string.Formatter().parse(text) if field is not None)
+    source = f"lambda *, {', '.join(sorted(fields))}: f'{''.join(pieces)}'"
+    return eval(source, names), fields
+
+
+def _compile(catalog):
+    """
+    Compile the catalog into {(key, language): text} and {(key, language): render function}.
+    
+    Raises:
+        ValueError: A reply is missing a language, or its languages take
+            different fields
+    """
+    static = {}
+    templates = {}
+    for key, texts in catalog.items():
+        texts = {BILINGUAL: texts.get(BILINGUAL, texts.get(ENGLISH)), **texts}
+        missing = [language for language in LANGUAGES if not texts.get(language)]
+        if missing:
+            raise ValueError(f"response '{key}' has no text for {missing}")
+        fields = set()
+        for language, text in texts.items():
+            if "{" not in text:
+                static[key, language] = sys.intern(text)
+                fields.add(frozenset())
+                continue
+            templates[key, language], names = compile_template(text)
+            fields.add(names)
+        if len(fields) > 1:
+            raise ValueError(f"response '{key}' takes different fields per language")
+    return static, templates
+
+
+_STATIC, _TEMPLATES = _compile(CATALOG)
+
+
+@lru_cache(maxsize=64)
+def language_code(language):
+    """
+    Catalog language for a recognition language tag.
+    
+    Args:
+        language: BCP-47 tag ("es-CO", "en-US") or None
+    
+    Returns:
+        str: ENGLISH or SPANISH, or BILINGUAL (None) for None and other languages
+    """
+    code = language.split("-")[0].lower() if language else None
+    return code if code in (ENGLISH, SPANISH) else BILINGUAL
+
+
+def response(key, language=None):
+    """A static reply in a catalog language (see language_code)."""
+    return _STATIC[key, language]
+
+
+def template(key, language=None):
+    """
+    A template reply in a catalog language, as a function of its fields.
+    
+    Example:
+        template("summary", SPANISH)(items="Bowl de Atún")
+    """
+    return _TEMPLATES[key, language]
+
+
+def static_responses(language=None):
+    """Every static reply in a language, e.g. for pre-rendering speech."""
+    return tuple(
+        text for (key, text_language), text in _STATIC.items()
+        if text_language == language and key not in FRAGMENTS
+    )
+
+
+def _pluralize_es(word):
+    """
+    Spanish plural of one word: "Taco" -> "Tacos", "Camarón" -> "Camarones",
+    "Sándwich" -> "Sándwiches", "Bowl" -> "Bowls", "Brunch" -> "Brunchs".
+    
+    Plurals that don't follow these rules come from the menu (name_es_plural).
+    """
+    lower = word.lower()
+    last = lower[-1:]
+    if not last or last in _VOWELS or not last.isalpha():
+        return word + "s"
+    if last in "sx":
+        return word  # "Nachos", "Tórax"
+    if last == "z":
+        return word[:-1] + ("C" if word[-1] == "Z" else "c") + "es"
+    # -es only after a single vowel and one of these; loanwords ending in a
+    # consonant cluster ("Bowl", "Brunch", "Club") take a plain -s
+    consonant = 2 if lower.endswith("ch") else 1
+    vowel = len(word) - consonant - 1
+    if (consonant == 2 or last in "lrndj") and vowel >= 0 and lower[vowel] in _VOWELS:
+        # An accent on the last syllable moves off it with the extra syllable
+        word = word[:vowel] + word[vowel].translate(_UNSTRESS) + word[vowel + 1:]
+        return word + "es"
+    return word + "s"
+
+
+def _pluralize(name, language):
+    """Plural of a dish name: "Tuna Bowl" -> "Tuna Bowls", "Bowl de Atún" -> "Bowls de Atún"."""
+    if language == SPANISH:
+        # The head noun comes first in Spanish dish names
+        head, _, rest = name.partition(" ")
+        head = _pluralize_es(head)
+        return f"{head} {rest}" if rest else head
+    if name.endswith(("s", "x", "z", "ch", "sh")):
+        return name + "es"
+    return name + "s"
+
+
+@lru_cache(maxsize=4096)
+def dish_phrase(name, quantity, language=None, plural=None):
+    """
+    One order line, e.g. "Salmon Bowl" or "2 Tuna Bowls".
+    
+    Args:
+        plural: The name's plural, when the menu gives one; derived if None
+    """
+    return name if quantity == 1 else f"{quantity} {plural or _pluralize(name, language)}"
+
+
+@lru_cache(maxsize=4096)
+def format_list(items, language=None, choice=False):
+    """
+    Join items for speech: "A", "A and B", "A, B, and C" ("A, B y C" in Spanish).
+    
+    Args:
+        items: Tuple of strings (hashable, for the cache)
+        language: Catalog language
+        choice: Join with "or" ("o") instead of "and"
+    """
+    if len(items) <= 1:
+        return items[0] if items else ""
+    conjunction = (_LIST_OR if choice else _LIST_AND)[language]
+    if len(items) == 2:
+        return f"{items[0]} {conjunction} {items[1]}"
+    comma = "," if language != SPANISH else ""
+    return ", ".join(items[:-1]) + f"{comma} {conjunction} {items[-1]}"
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Asyncio conversation server for Luisquisite.
+
+Serves many tables from one process: each table (session) gets its own
+OrderHandler, turns arrive over a small local HTTP/1.1 JSON API, and
+sessions that go quiet are expired.
+
+API:
+    POST /turn      {"session_id": "table-7", "text": "quiero un tuna bowl",
+                     "language": "es-CO" (optional)}
+                    -> {"session_id", "response", "should_continue", "items"}
+    GET  /health    -> {"status": "ok", "sessions": <active sessions>, "menu_version": <n>,
+                        "kitchen": <Kitchen.stats()> (with --simulate-kitchen)}
+    GET  /metrics   -> Prometheus text format (see metrics.py)
+
+The menu file is watched and reloaded while serving (see menu_store.py).
+With --processes N the sessions are spread over N worker processes by
+table (see supervisor.py); this process only parses HTTP and routes turns.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from kitchen import Kitchen, SimulatedKitchen
+from menu_store import MenuWatcher, current_menu, on_publish
+from order_handler import OrderHandler
+from order_journal import OrderJournal
+from supervisor import ShardedRegistry
+
+
+MAX_BODY_BYTES = 64 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+# Stands in for the body of a request whose Content-Length isn't a valid size
+_BAD_LENGTH = object()
+# ...and of one whose request line or a header is longer than the stream limit
+_TOO_LONG = object()
+
+
+class Session:
+    """One table's conversation state."""
+    
+    __slots__ = ("handler", "lock", "last_seen")
+    
+    def __init__(self, journal=None, kitchen=None):
+        self.handler = OrderHandler(journal=journal, kitchen=kitchen)
+        # asyncio.Lock wakes waiters in FIFO order, so turns for a table are
+        # processed one at a time and in arrival order
+        self.lock = asyncio.Lock()
+        self.last_seen = time.monotonic()
+
+
+class SessionRegistry:
+    """Per-table OrderHandler sessions with idle expiry."""
+    
+    def __init__(self, idle_timeout=900, executor=None, journal=None, kitchen=None):
+        """
+        Initialize the registry.
+        
+        Args:
+            idle_timeout: Seconds without a turn before a session is dropped
+            executor: Executor that runs process_input off the event loop
+            journal: OrderJournal shared by all sessions for confirmed orders
+            kitchen: Kitchen that all sessions dispatch confirmed orders to
+        """
+        self.idle_timeout = idle_timeout
+        self.journal = journal
+        self.kitchen = kitchen
+        self.sessions = {}
+        self.executor = executor or ThreadPoolExecutor(max_workers=4, thread_name_prefix="turn")
+    
+    def get(self, session_id):
+        """Return the session for session_id, creating it on first use."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(self.journal, self.kitchen)
+        return session
+    
+    async def process_turn(self, session_id, text, language=None):
+        """
+        Run one turn for a session without blocking the event loop.
+        
+        Returns:
+            tuple: (response, should_continue, items)
+        """
+        session = self.get(session_id)
+        # Includes waiting behind the table's earlier turns
+        with metrics.STAGE_SECONDS.time("turn"):
+            async with session.lock:
+                session.last_seen = time.monotonic()
+                loop = asyncio.get_running_loop()
+                response, should_continue = await loop.run_in_executor(
+                    self.executor, session.handler.process_input, text, language
+                )
+                items = session.handler.last_items
+                if not should_continue:
+                    # Order confirmed; the table starts fresh on its next turn
+                    session.handler.reset()
+                session.last_seen = time.monotonic()
+        return response, should_continue, items
+    
+    def expire_idle(self):
+        """Drop sessions idle for longer than idle_timeout; return how many."""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [
+            session_id for session_id, session in self.sessions.items()
+            if session.last_seen < cutoff and not session.lock.locked()
+        ]
+        for session_id in expired:
+            del self.sessions[session_id]
+        return len(expired)
+    
+    def close(self):
+        self.executor.shutdown(wait=False)
+    
+    async def run_expiry(self, interval=30):
+        """Background task: periodically expire idle sessions."""
+        while True:
+            await asyncio.sleep(interval)
+            expired = self.expire_idle()
+            if expired:
+                print(f"🧹 Expired {expired} idle session(s), {len(self.sessions)} active")
+
+
+class ConversationServer:
+    """Minimal keep-alive HTTP/1.1 front end for a SessionRegistry."""
+    
+    def __init__(self, registry):
+        self.registry = registry
+    
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it."""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _read_request(self, reader):
+        """Parse one request; return None when the connection is closed."""
+        # readline() raises ValueError for a line over the reader's limit (64 KiB)
+        too_long = "", "", {"connection": "close"}, _TOO_LONG
+        try:
+            request_line = await reader.readline()
+        except ValueError:
+            return too_long
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return None
+        
+        headers = {}
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                return too_long
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body can't be found, so neither can the next request
+            return method, path, {"connection": "close"}, _BAD_LENGTH
+        if length > MAX_BODY_BYTES:
+            return method, path, {"connection": "close"}, None
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+    
+    async def _dispatch(self, method, path, body):
+        """Route a request and return (status, payload)."""
+        if body is None:
+            return 413, {"error": "request body too large"}
+        if body is _BAD_LENGTH:
+            return 400, {"error": "invalid Content-Length"}
+        if body is _TOO_LONG:
+            return 431, {"error": "request line or header too long"}
+        if path == "/health":
+            health = {"status": "ok", "sessions": len(self.registry.sessions), "menu_version": current_menu().version}
+            if self.registry.kitchen is not None:
+                health["kitchen"] = self.registry.kitchen.stats()
+            return 200, health
+        if path == "/metrics":
+            return 200, metrics.render()
+        if path != "/turn":
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        
+        try:
+            data = json.loads(body or b"{}")
+            session_id = str(data["session_id"])
+            text = data.get("text")
+            language = data.get("language")
+            if text is not None and not isinstance(text, str):
+                raise TypeError("text must be a string")
+            if language is not None and not isinstance(language, str):
+                raise TypeError("language must be a string")
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": "expected JSON with session_id and text"}
+        
+        try:
+            response, should_continue, items = await self.registry.process_turn(session_id, text, language)
+        except Exception as e:
+            # e.g. a turn that failed in a worker process; the connection stays usable
+            print(f"❌ Turn failed for {session_id}: {e}")
+            return 500, {"error": "turn failed"}
+        return 200, {
+            "session_id": session_id,
+            "response": response,
+            "should_continue": should_continue,
+            "items": list(items),
+        }
+    
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body = payload.encode("utf-8")
+            content_type = metrics.CONTENT_TYPE
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+
+async def serve(host="127.0.0.1", port=8765, idle_timeout=900, workers=4, journal_path="orders.db",
+                simulate_kitchen=False, menu_path=None, processes=1):
+    """Start the conversation server and run until cancelled."""
+    journal = None
+    kitchen = None
+    watcher = MenuWatcher(menu_path).start()
+    if processes > 1:
+        # Sessions live in worker processes, which journal their own orders
+        registry = ShardedRegistry(processes, idle_timeout, journal_path or None, menu_path).start()
+    else:
+        journal = OrderJournal(journal_path) if journal_path else None
+        if simulate_kitchen:
+            # Fake cooks work through the station queues at the menu's prep times
+            kitchen = Kitchen()
+            on_publish(lambda snapshot: kitchen.update_menu(snapshot.menu))
+            SimulatedKitchen(kitchen).start()
+        registry = SessionRegistry(
+            idle_timeout=idle_timeout,
+            executor=ThreadPoolExecutor(max_workers=workers, thread_name_prefix="turn"),
+            journal=journal,
+            kitchen=kitchen,
+        )
+    server = ConversationServer(registry)
+    listener = await asyncio.start_server(server.handle_connection, host, port, backlog=2048)
+    expiry = asyncio.create_task(registry.run_expiry(interval=min(30, idle_timeout)))
+    
+    address = listener.sockets[0].getsockname()
+    print(f"🍽️ Luisquisite conversation server on http://{address[0]}:{address[1]}", flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        expiry.cancel()
+        watcher.stop()
+        registry.close()
+        if journal is not None:
+            journal.close()
+        if kitchen is not None:
+            kitchen.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Luisquisite multi-table conversation server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--idle-timeout", type=float, default=900,
+                        help="seconds before an idle table's session is dropped")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="threads running process_input")
+    parser.add_argument("--journal", default="orders.db",
+                        help="SQLite journal for confirmed orders ('' to disable)")
+    parser.add_argument("--simulate-kitchen", action="store_true",
+                        help="dispatch confirmed orders to a simulated kitchen")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes to spread tables over (see supervisor.py)")
+    parser.add_argument("--menu", help="menu file (JSON or TOML), reloaded when it changes; "
+                                       "defaults to LUISQUISITE_MENU or menu.json")
+    args = parser.parse_args()
+    if args.processes > 1 and args.simulate_kitchen:
+        parser.error("--simulate-kitchen needs a single process (the kitchen is shared state)")
+    try:
+        asyncio.run(serve(args.host, args.port, args.idle_timeout, args.workers, args.journal,
+                          args.simulate_kitchen, args.menu, args.processes))
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down...")
+
+
+if __name__ == "__main__":
+    main()
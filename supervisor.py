@@ -0,0 +1,353 @@
+"""
+Sharded multi-process sessions for the conversation server.
+
+One Python process runs one turn at a time (the GIL), so ShardedRegistry
+spreads tables over worker processes. Each session is pinned to a worker by
+a hash of its id (crc32 modulo the number of workers), so its OrderHandler
+lives in one place and its turns are handled in order. Turns submitted
+during one pass of the event loop travel to a worker as one message, and
+the worker answers a message with one message, so the pipe and pickling
+cost is paid per batch rather than per turn.
+
+With every reply the worker sends the session's OrderHandler.to_bytes()
+snapshot (a few bytes per dish), which the supervisor keeps. A worker that
+dies is restarted, the turns it hadn't answered are sent again, and every
+session it held is restored from its snapshot on its next turn, so orders
+in progress survive. Each turn carries an id that becomes the journal id of
+an order it confirms, so a confirmation the dead worker had already
+journaled isn't recorded twice when its turn is sent again. A session that lands on a worker that hasn't seen it
+(after a restart, or when the number of workers changes) is restored the
+same way.
+
+ShardedRegistry has SessionRegistry's interface; `server.py --processes N`
+uses it. Each worker records confirmed orders in its own OrderJournal on
+the shared database and follows the menu file; /metrics in the front
+process covers end-to-end turn time only.
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zlib
+
+import metrics
+
+
+# A turn that was in flight when its worker died is sent again this many
+# times before it fails, so one poisonous turn can't crash workers forever
+MAX_ATTEMPTS = 2
+# A worker that dies within this many seconds of starting is restarted
+# after the same delay, rather than in a tight loop
+RESTART_DELAY = 1.0
+
+
+def shard_of(session_id, workers):
+    """Index of the worker that owns a session."""
+    return zlib.crc32(session_id.encode("utf-8")) % workers
+
+
+def _run_turns(sessions, turns, journal):
+    """Process a batch of turns in a worker; see ShardedRegistry."""
+    # Imported here so only worker processes build the menu and matcher
+    from order_handler import OrderHandler
+    
+    replies = []
+    for request_id, session_id, text, language, snapshot in turns:
+        try:
+            handler = sessions.get(session_id)
+            if handler is None:
+                if snapshot:
+                    handler = OrderHandler.from_bytes(snapshot, journal=journal)
+                else:
+                    handler = OrderHandler(journal=journal)
+                sessions[session_id] = handler
+            # The same id when the turn is resent, so the journal ignores the repeat
+            handler.order_uid = request_id
+            response, should_continue = handler.process_input(text, language)
+            handler.order_uid = None
+            items = handler.last_items
+            if not should_continue:
+                # Order confirmed; the table starts fresh on its next turn
+                handler.reset()
+            replies.append((request_id, (response, should_continue, items, handler.to_bytes()), None))
+        except Exception as e:
+            replies.append((request_id, None, f"{type(e).__name__}: {e}"))
+    return replies
+
+
+def _worker_main(conn, journal_path, menu_path):
+    """Worker process: run turn batches from the supervisor until told to stop."""
+    from menu_store import MenuWatcher
+    from order_journal import OrderJournal
+    
+    journal = OrderJournal(journal_path) if journal_path else None
+    watcher = MenuWatcher(menu_path).start()
+    sessions = {}
+    try:
+        while True:
+            try:
+                kind, payload = conn.recv()
+            except EOFError:
+                break  # The supervisor is gone
+            if kind == "turns":
+                conn.send(_run_turns(sessions, payload, journal))
+            elif kind == "drop":
+                for session_id in payload:
+                    sessions.pop(session_id, None)
+            elif kind == "stop":
+                break
+    except KeyboardInterrupt:
+        pass  # Ctrl-C reaches the whole process group; the supervisor stops us
+    finally:
+        watcher.stop()
+        if journal is not None:
+            journal.close()
+
+
+class _Worker:
+    """Supervisor-side handle for one worker process."""
+    
+    __slots__ = ("index", "process", "conn", "generation", "started", "outbox", "pending")
+    
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.generation = None  # Changes with every (re)start
+        self.started = 0.0
+        self.outbox = []  # Turns waiting for this pass of the event loop to end
+        self.pending = {}  # request_id -> [turn, future, attempts], in submission order
+
+
+class _ShardedSession:
+    __slots__ = ("snapshot", "generation", "last_seen", "in_flight")
+    
+    def __init__(self):
+        self.snapshot = None  # Latest OrderHandler.to_bytes() from a worker
+        self.generation = None  # Worker generation that holds the live handler
+        self.last_seen = time.monotonic()
+        self.in_flight = 0
+
+
+class ShardedRegistry:
+    """Sessions spread over worker processes by sticky hashing."""
+    
+    def __init__(self, processes=None, idle_timeout=900, journal_path=None, menu_path=None):
+        """
+        Initialize the registry; start() launches the workers.
+        
+        Args:
+            processes: Number of worker processes (defaults to the CPU count)
+            idle_timeout: Seconds without a turn before a session is dropped
+            journal_path: SQLite journal for confirmed orders (None to disable)
+            menu_path: Menu file the workers load and watch (None for the default)
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.idle_timeout = idle_timeout
+        self.journal_path = journal_path
+        self.menu_path = menu_path
+        self.sessions = {}
+        self.kitchen = None  # The simulated kitchen needs a single process
+        self.workers = [_Worker(index) for index in range(self.processes)]
+        self.restarts = 0
+        # Workers start fresh interpreters: no threads (journal writer, menu
+        # watcher) or locks are inherited from this process
+        self._context = multiprocessing.get_context("spawn")
+        # Request ids double as order ids in the shared journal, so they are
+        # unique across supervisor runs
+        self._run_id = uuid.uuid4().hex
+        self._request_ids = (f"{self._run_id}-{n}" for n in itertools.count())
+        self._generations = itertools.count()
+        self._loop = None
+        self._closing = False
+    
+    def start(self):
+        """Launch the worker processes; call from the event loop that will use the registry."""
+        self._loop = asyncio.get_running_loop()
+        for worker in self.workers:
+            self._spawn(worker)
+        print(f"🧩 {self.processes} worker process(es) started")
+        return self
+    
+    def _spawn(self, worker):
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main, args=(child_conn, self.journal_path, self.menu_path),
+            name=f"luisquisite-worker-{worker.index}", daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker.process = process
+        worker.conn = conn
+        worker.generation = next(self._generations)
+        worker.started = time.monotonic()
+        threading.Thread(
+            target=self._read_replies, args=(worker, conn, process), name=f"worker-{worker.index}-replies", daemon=True
+        ).start()
+    
+    async def process_turn(self, session_id, text, language=None):
+        """
+        Run one turn for a session on its worker.
+        
+        Returns:
+            tuple: (response, should_continue, items)
+        
+        Raises:
+            RuntimeError: The turn failed in the worker
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = _ShardedSession()
+        worker = self.workers[shard_of(session_id, self.processes)]
+        with metrics.STAGE_SECONDS.time("turn"):
+            session.last_seen = time.monotonic()
+            session.in_flight += 1
+            # A worker that doesn't hold the session restores it from its snapshot
+            snapshot = session.snapshot if session.generation != worker.generation else None
+            session.generation = worker.generation
+            future = self._loop.create_future()
+            request_id = next(self._request_ids)
+            turn = (request_id, session_id, text, language, snapshot)
+            worker.pending[request_id] = [turn, future, 1]
+            self._submit(worker, turn)
+            try:
+                response, should_continue, items = await future
+            finally:
+                session.in_flight -= 1
+                session.last_seen = time.monotonic()
+        return response, should_continue, items
+    
+    def _submit(self, worker, turn):
+        worker.outbox.append(turn)
+        if len(worker.outbox) == 1:
+            # Everything submitted before the loop comes back around goes in one message
+            self._loop.call_soon(self._flush, worker)
+    
+    def _flush(self, worker):
+        turns, worker.outbox = worker.outbox, []
+        if not turns:
+            return
+        try:
+            worker.conn.send(("turns", turns))
+        except OSError:
+            pass  # The worker is gone; its reply thread restarts it and resends these
+    
+    def _read_replies(self, worker, conn, process):
+        """Reply thread for one worker process: hand replies to the event loop."""
+        try:
+            while True:
+                try:
+                    replies = conn.recv()
+                except (EOFError, OSError):
+                    break
+                self._loop.call_soon_threadsafe(self._resolve, worker, replies)
+            if not self._closing:
+                self._loop.call_soon_threadsafe(self._restart, worker, process)
+        except RuntimeError:
+            pass  # The event loop is closed; we're shutting down
+    
+    def _resolve(self, worker, replies):
+        for request_id, result, error in replies:
+            entry = worker.pending.pop(request_id, None)
+            if entry is None:
+                continue
+            turn, future, _ = entry
+            if error is not None:
+                if not future.done():
+                    future.set_exception(RuntimeError(f"turn failed in worker {worker.index}: {error}"))
+                continue
+            response, should_continue, items, snapshot = result
+            # Replies for a session arrive in turn order, so this is its latest state
+            session = self.sessions.get(turn[1])
+            if session is not None:
+                session.snapshot = snapshot
+            if not future.done():  # Not cancelled by a dropped connection
+                future.set_result((response, should_continue, items))
+    
+    def _restart(self, worker, process):
+        """Replace a dead worker and resend the turns it hadn't answered."""
+        if self._closing or worker.process is not process:
+            return
+        process.join(timeout=1)
+        print(f"⚠️ Worker {worker.index} exited ({process.exitcode}); restarting")
+        delay = RESTART_DELAY if time.monotonic() - worker.started < RESTART_DELAY else 0
+        self._loop.call_later(delay, self._respawn, worker)
+    
+    def _respawn(self, worker):
+        if self._closing:
+            return
+        self.restarts += 1
+        worker.conn.close()
+        self._spawn(worker)
+        
+        # Everything in the outbox is also pending, so it's all rebuilt here
+        worker.outbox = []
+        restored = set()
+        for request_id, entry in list(worker.pending.items()):
+            turn, future, attempts = entry
+            session_id = turn[1]
+            if attempts >= MAX_ATTEMPTS or future.done():
+                del worker.pending[request_id]
+                if not future.done():
+                    future.set_exception(RuntimeError(f"worker {worker.index} died {attempts} time(s) on this turn"))
+                continue
+            # The first resent turn of each session brings its snapshot
+            session = self.sessions.get(session_id)
+            snapshot = None
+            if session is not None and session_id not in restored:
+                snapshot = session.snapshot
+                session.generation = worker.generation
+            restored.add(session_id)
+            entry[0] = (request_id, session_id, turn[2], turn[3], snapshot)
+            entry[2] = attempts + 1
+            self._submit(worker, entry[0])
+    
+    def expire_idle(self):
+        """Drop sessions idle for longer than idle_timeout; return how many."""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [
+            session_id for session_id, session in self.sessions.items()
+            if session.last_seen < cutoff and not session.in_flight
+        ]
+        by_worker = {}
+        for session_id in expired:
+            del self.sessions[session_id]
+            by_worker.setdefault(shard_of(session_id, self.processes), []).append(session_id)
+        for index, session_ids in by_worker.items():
+            try:
+                self.workers[index].conn.send(("drop", session_ids))
+            except OSError:
+                pass  # Restarting; the new process doesn't have them anyway
+        return len(expired)
+    
+    async def run_expiry(self, interval=30):
+        """Background task: periodically expire idle sessions."""
+        while True:
+            await asyncio.sleep(interval)
+            expired = self.expire_idle()
+            if expired:
+                print(f"🧹 Expired {expired} idle session(s), {len(self.sessions)} active")
+    
+    def close(self, timeout=5.0):
+        """Stop the workers after the turns already sent to them."""
+        self._closing = True
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            try:
+                self._flush(worker)
+                worker.conn.send(("stop", None))
+            except OSError:
+                pass
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
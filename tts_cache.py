@@ -0,0 +1,127 @@
+"""
+On-disk cache of synthesized speech for the Luisquisite voice agent.
+
+Rendered phrases are stored as WAV files named by a hash of everything that
+changes the audio: the text, the voice, the speech rate and the volume. The
+cache is bounded in bytes and evicts the least recently played files first;
+recency is kept in the files' modification times, so it survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_CACHE_DIR = ".tts_cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def cache_key(text, voice, rate, volume):
+    """Content address of a rendered phrase."""
+    payload = json.dumps([text, voice, rate, volume], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Size-bounded LRU cache of WAV files keyed by cache_key()."""
+    
+    SUFFIX = ".wav"
+    
+    def __init__(self, directory=None, max_bytes=None):
+        """
+        Open (or create) a cache directory.
+        
+        Args:
+            directory: Cache directory; defaults to LUISQUISITE_TTS_CACHE,
+                then .tts_cache
+            max_bytes: Size bound; defaults to LUISQUISITE_TTS_CACHE_BYTES,
+                then 64 MB
+        """
+        self.directory = directory or os.environ.get("LUISQUISITE_TTS_CACHE", DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("LUISQUISITE_TTS_CACHE_BYTES", DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> bytes, least recently used first
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+    
+    def _load(self):
+        """Index existing files, oldest first, and drop stale temp files."""
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+            elif name.endswith(self.SUFFIX):
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name[:-len(self.SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.size += size
+        self._evict()
+    
+    def path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+    
+    def temp_path(self, key):
+        """Where to render a phrase before put() moves it into the cache."""
+        return os.path.join(self.directory, f"{key}.{threading.get_ident()}.tmp")
+    
+    def __contains__(self, key):
+        return key in self._entries
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key):
+        """
+        Look up a rendered phrase and mark it recently used.
+        
+        Returns:
+            str: Path of the WAV file, or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            path = self.path(key)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # Removed behind our back
+                self.size -= self._entries.pop(key)
+                return None
+            return path
+    
+    def put(self, key, rendered_path):
+        """
+        Move a rendered WAV file into the cache.
+        
+        Returns:
+            str: Path of the cached file, or None if the render was empty
+        """
+        size = os.path.getsize(rendered_path)
+        if not size:
+            os.remove(rendered_path)
+            return None
+        path = self.path(key)
+        with self._lock:
+            os.replace(rendered_path, path)
+            self.size += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+            return path if key in self._entries else None
+    
+    def _evict(self):
+        """Remove least recently used files until the cache fits."""
+        while self.size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,133 @@
+"""
+Voice-activity detection for captured phrases.
+
+Runs between capture and recognition: the whole phrase is split into short
+frames and scored at once with NumPy (RMS energy and zero-crossing rate per
+frame), leading and trailing silence is trimmed, phrases with no speech are
+dropped before they reach the recognizer, and the audio can be downsampled
+to the rate recognizers actually use.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+
+VADResult = namedtuple("VADResult", ["audio", "sample_rate", "speech_seconds", "kept_seconds", "input_seconds"])
+
+
+def rms(data, sample_width):
+    """
+    RMS level of a chunk of signed little-endian PCM, as audioop.rms
+    computes it (the units of the recognizer's energy_threshold).
+    
+    Args:
+        data: PCM bytes
+        sample_width: Bytes per sample (1, 2 or 4)
+    """
+    samples = np.frombuffer(data, dtype=f"<i{sample_width}", count=len(data) // sample_width)
+    if not len(samples):
+        return 0
+    return int(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+
+
+class VoiceActivityDetector:
+    """Frame-level speech detection, trimming and downsampling for 16-bit PCM."""
+    
+    def __init__(self, frame_seconds=0.02, max_zero_crossing_rate=0.35, min_speech_seconds=0.15,
+                 padding_seconds=0.2, target_rate=16000):
+        """
+        Args:
+            frame_seconds: Analysis frame length
+            max_zero_crossing_rate: Frames crossing zero more often than this
+                (fraction of samples) are treated as hiss or clatter, not voice
+            min_speech_seconds: Less speech than this and the phrase is dropped
+            padding_seconds: Audio kept around the detected speech, so soft
+                onsets and endings aren't cut
+            target_rate: Downsample to this rate (None keeps the input rate)
+        """
+        self.frame_seconds = frame_seconds
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+        self.min_speech_seconds = min_speech_seconds
+        self.padding_seconds = padding_seconds
+        self.target_rate = target_rate
+    
+    def frame_features(self, samples, sample_rate):
+        """
+        Per-frame RMS energy and zero-crossing rate, for all frames at once.
+        
+        Returns:
+            tuple: (energy, zero_crossing_rate, frame_length) arrays
+        """
+        frame_length = max(1, int(sample_rate * self.frame_seconds))
+        count = len(samples) // frame_length
+        frames = samples[:count * frame_length].reshape(count, frame_length).astype(np.float32)
+        energy = np.sqrt(np.mean(frames * frames, axis=1))
+        signs = np.signbit(frames)
+        zero_crossing_rate = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length
+        return energy, zero_crossing_rate, frame_length
+    
+    def speech_mask(self, samples, sample_rate, energy_threshold):
+        """Boolean speech/non-speech decision per frame."""
+        energy, zero_crossing_rate, frame_length = self.frame_features(samples, sample_rate)
+        # Loud frames are speech unless they look like broadband noise; very
+        # loud frames count regardless (fricatives like "s" cross zero a lot)
+        mask = (energy > energy_threshold) & (
+            (zero_crossing_rate < self.max_zero_crossing_rate) | (energy > 3 * energy_threshold)
+        )
+        return mask, frame_length
+    
+    def process(self, raw_data, sample_rate, sample_width, energy_threshold):
+        """
+        Trim a phrase to its speech and optionally downsample it.
+        
+        Args:
+            raw_data: PCM bytes
+            sample_rate: Samples per second
+            sample_width: Bytes per sample; only 16-bit audio is analyzed
+            energy_threshold: RMS level separating speech from background,
+                in the units of rms() (the recognizer's energy_threshold)
+        
+        Returns:
+            VADResult, or None if the phrase contains no speech
+        """
+        input_seconds = len(raw_data) / (sample_rate * sample_width)
+        if sample_width != 2:
+            return VADResult(raw_data, sample_rate, None, input_seconds, input_seconds)
+        
+        samples = np.frombuffer(raw_data, dtype="<i2")
+        mask, frame_length = self.speech_mask(samples, sample_rate, energy_threshold)
+        speech_frames = int(np.count_nonzero(mask))
+        speech_seconds = speech_frames * frame_length / sample_rate
+        if speech_seconds < self.min_speech_seconds:
+            return None
+        
+        voiced = np.flatnonzero(mask)
+        padding = int(self.padding_seconds * sample_rate)
+        start = max(0, voiced[0] * frame_length - padding)
+        end = min(len(samples), (voiced[-1] + 1) * frame_length + padding)
+        trimmed = samples[start:end]
+        
+        rate = sample_rate
+        if self.target_rate and sample_rate > self.target_rate:
+            trimmed = downsample(trimmed, sample_rate, self.target_rate)
+            rate = self.target_rate
+        return VADResult(
+            trimmed.astype("<i2").tobytes(), rate, speech_seconds, (end - start) / sample_rate, input_seconds
+        )
+
+
+def downsample(samples, from_rate, to_rate):
+    """
+    Resample 16-bit samples to a lower rate.
+    
+    Integer ratios (48 kHz to 16 kHz) average each group of samples, which
+    also low-passes; other ratios interpolate linearly.
+    """
+    if from_rate % to_rate == 0:
+        factor = from_rate // to_rate
+        count = len(samples) // factor
+        return samples[:count * factor].reshape(count, factor).mean(axis=1).round().astype(np.int16)
+    count = int(len(samples) * to_rate / from_rate)
+    positions = np.arange(count) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).round().astype(np.int16)
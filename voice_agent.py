@@ -4,71 +4,697 @@ Handles speech recognition and text-to-speech.
 """
 
 import speech_recognition as sr
-import pyttsx3
 import threading
 import queue
+import contextlib
+import json
+import os
+import time
+import wave
+
+from audio_capture import AudioCapture
+from metrics import PHRASES, RECOGNITION_ERRORS, STAGE_SECONDS, UNRECOGNIZED
+from recognizers import MultiLanguageRecognizer, RecognizerBackend, create_backend
+from tts_cache import AudioCache, cache_key
+from vad import VoiceActivityDetector, rms
+
+
+class CalibrationStore:
+    """Microphone energy thresholds per device, kept on disk across restarts."""
+    
+    def __init__(self, path=None):
+        """
+        Args:
+            path: JSON file; defaults to LUISQUISITE_CALIBRATION, then
+                .calibration.json
+        """
+        self.path = path or os.environ.get("LUISQUISITE_CALIBRATION", ".calibration.json")
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._thresholds = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._thresholds = {}
+    
+    def get(self, device):
+        """Saved energy threshold for a device, or None."""
+        return self._thresholds.get(device)
+    
+    def save(self, device, threshold):
+        self._thresholds[device] = round(threshold, 1)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._thresholds, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+class Utterance:
+    """
+    Something the waitress was asked to say, as returned by speak().
+    
+    The speech worker stamps when it started and finished playing
+    (perf_counter()); interrupted is set when barge-in cut it off or dropped
+    it from the queue.
+    """
+    
+    __slots__ = ("text", "queued", "started", "finished", "interrupted")
+    
+    def __init__(self, text):
+        self.text = text
+        self.queued = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.interrupted = False
 
 
 class VoiceAgent:
-    def __init__(self):
-        """Initialize the voice agent with speech recognition and TTS."""
+    # How often the idle speech worker checks for phrases to pre-render
+    RENDER_POLL_SECONDS = 0.05
+    PLAYBACK_FRAMES = 1024
+    # Audio kept by the capture ring; longer than any phrase_time_limit
+    CAPTURE_SECONDS = 30
+    # Save the recalibrated threshold when it drifts this much from the saved one
+    CALIBRATION_SAVE_DRIFT = 0.1
+    
+    def __init__(self, recognizer_backend=None, language=('es-CO', 'en-US'), barge_in=True, barge_in_factor=2.0,
+                 audio_cache=None, calibration=None, voice=None, rate=150, volume=0.9, vad=None, scorer=None,
+                 microphone=None, executor=None, output=None):
+        """
+        Initialize the voice agent with speech recognition and TTS.
+        
+        Returns right away: the speech engine and the microphone start on
+        background threads, speak() queues until the engine is up and
+        listen() waits for the microphone.
+        
+        Args:
+            recognizer_backend: RecognizerBackend or backend name ("google",
+                "vosk", "sphinx", "google,vosk"); defaults to the
+                LUISQUISITE_RECOGNIZER environment variable, then "google"
+            language: Recognition language, or several to recognize in
+                parallel (the first one wins ties)
+            barge_in: Stop talking as soon as the customer starts speaking
+            barge_in_factor: Energy threshold multiplier while the waitress is
+                talking, so her own voice from the speaker doesn't interrupt her
+            audio_cache: AudioCache for rendered phrases; defaults to one in
+                LUISQUISITE_TTS_CACHE (.tts_cache), False disables caching
+            calibration: CalibrationStore for energy thresholds; defaults to
+                LUISQUISITE_CALIBRATION (.calibration.json)
+            voice: pyttsx3 voice id, None for the system default
+            rate: Speed of speech (words per minute)
+            volume: Volume level (0 to 1)
+            vad: VoiceActivityDetector run on each phrase before recognition;
+                defaults to one downsampling to 16 kHz, False disables it
+            scorer: Callable text -> matched intent/dish terms, used to pick
+                between languages (e.g. OrderHandler.match_score)
+            microphone: Audio source to listen on (an sr.AudioSource such as
+                sr.Microphone(device_index=...) or wav_devices.WavMicrophone);
+                defaults to the system's default microphone
+            executor: Executor for recognition calls; defaults to a pool of
+                this agent's own (see voice_host.py for a shared one)
+            output: Speech output with say(text, is_current) to speak
+                through instead of this agent's pyttsx3 engine and sound
+                card; it returns once the text is spoken or is_current()
+                turns False (barge-in)
+        """
+        self._started = time.perf_counter()
         self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
-        self.tts_engine = pyttsx3.init()
+        self.microphone = None  # Opened in the background
+        self._source = microphone
+        self.capture = None
+        self._reader = None
+        if not isinstance(recognizer_backend, RecognizerBackend):
+            recognizer_backend = create_backend(recognizer_backend)
+        self.backend = recognizer_backend
+        self.languages = (language,) if isinstance(language, str) else tuple(language)
+        self.language = self.languages[0]
+        self.recognition = MultiLanguageRecognizer(recognizer_backend, self.languages, scorer, executor)
+        self.last_recognition = None  # RecognitionResult of the latest listen()
+        self.phrase_ended = None  # perf_counter() when the latest phrase finished recording
+        self.last_timings = {}  # Seconds per stage (capture, vad, recognition) of the latest listen()
+        self.barge_in = barge_in
+        self.barge_in_factor = barge_in_factor
+        self.voice = voice
+        self.rate = rate
+        self.volume = volume
+        self.vad = VoiceActivityDetector() if vad is None else vad or None
+        
+        # Rendered phrases play from disk instead of being synthesized again
+        # (an output does its own synthesis)
+        if output is not None:
+            audio_cache = False
+        # (an AudioCache is falsy while empty, so compare against None/False)
+        if audio_cache is None:
+            audio_cache = AudioCache()
+        self.audio_cache = None if audio_cache is False else audio_cache
+        self._render_queue = queue.Queue()
+        # The reply prepared from the latest partial transcript (prepare_reply):
+        # one slot that each newer partial replaces, rendered to a scratch
+        # clip outside the cache so one-off replies don't evict fixed phrases
+        self._reply_lock = threading.Lock()
+        self._pending_reply = None
+        self._reply_clip = None  # (text, path) of the rendered reply
+        
+        # Speech runs on a worker thread that owns the pyttsx3 engine, so
+        # speak() returns immediately and listening can start while talking
+        self.output = output
+        self.tts_engine = None  # Created by the worker on first use
+        self._speech_queue = queue.Queue()
+        self._speaking = threading.Event()
+        self._generation = 0  # Bumped by stop_speaking() to drop queued/current speech
+        self._playing_generation = 0
+        self._audio_ready = threading.Event()  # PortAudio initialized by the worker
+        self._speech_thread = threading.Thread(target=self._speech_worker, name="tts", daemon=True)
+        self._speech_thread.start()
+        
+        # The energy threshold is reused from the last run on this device, and
+        # kept up to date from the quiet audio heard while waiting for speech
+        self.calibration = CalibrationStore() if calibration is None else calibration
+        self.device = None
+        self._saved_threshold = None
+        self._microphone_ready = threading.Event()
+        self._microphone_error = None
+        threading.Thread(target=self._init_microphone, name="microphone", daemon=True).start()
+    
+    def wait_until_ready(self, timeout=None):
+        """
+        Block until the microphone is open.
+        
+        Returns:
+            bool: False if it isn't open yet after timeout seconds
+        
+        Raises:
+            Exception: Whatever kept the microphone from opening
+        """
+        if not self._microphone_ready.wait(timeout):
+            return False
+        if self._microphone_error is not None:
+            raise self._microphone_error
+        return True
+    
+    def _elapsed_ms(self):
+        return (time.perf_counter() - self._started) * 1000
+    
+    def _init_microphone(self):
+        """Open the microphone and set its energy threshold."""
+        try:
+            # PortAudio initialization isn't thread-safe; let the worker go first
+            self._audio_ready.wait()
+            microphone = self._source or sr.Microphone()
+            self.device = getattr(microphone, "device_name", None) or self._device_name(microphone)
+            saved = self.calibration.get(self.device)
+            if saved:
+                self.recognizer.energy_threshold = saved
+                self._saved_threshold = saved
+                how = "saved calibration"
+            else:
+                print("Adjusting for ambient noise... Please wait.")
+                with microphone as source:
+                    self.recognizer.adjust_for_ambient_noise(source, duration=1)
+                self._save_threshold()
+                how = "calibrated"
+            self.microphone = microphone
+            # One stream stays open from here on; listen() reads from the ring
+            self.capture = AudioCapture(microphone, self.is_speaking, seconds=self.CAPTURE_SECONDS)
+            self.capture.start()
+            self._reader = self.capture.reader()
+            print(f"⏱️ Microphone ready after {self._elapsed_ms():.0f} ms "
+                  f"({self.device}, threshold {self.recognizer.energy_threshold:.0f}, {how})")
+            print("Ready to listen!")
+        except Exception as e:
+            self._microphone_error = e
+        finally:
+            self._microphone_ready.set()
+    
+    @staticmethod
+    def _device_name(microphone):
+        """Name of the input device, used as the calibration key."""
+        audio = microphone.pyaudio_module.PyAudio()
+        try:
+            if microphone.device_index is None:
+                info = audio.get_default_input_device_info()
+            else:
+                info = audio.get_device_info_by_index(microphone.device_index)
+            return info.get("name") or "default"
+        finally:
+            audio.terminate()
+    
+    def _save_threshold(self):
+        """Persist the current threshold if it drifted from the saved one."""
+        threshold = self.recognizer.energy_threshold
+        saved = self._saved_threshold
+        if saved and abs(threshold - saved) <= saved * self.CALIBRATION_SAVE_DRIFT:
+            return
+        try:
+            self.calibration.save(self.device, threshold)
+            self._saved_threshold = threshold
+        except OSError as e:
+            print(f"⚠️ Could not save microphone calibration: {e}")
+    
+    def _recalibrate(self, energy, seconds):
+        """Move the threshold toward the energy of a quiet chunk (as sr.Recognizer does)."""
+        recognizer = self.recognizer
+        if not recognizer.dynamic_energy_threshold:
+            return
+        damping = recognizer.dynamic_energy_adjustment_damping ** seconds
+        target = energy * recognizer.dynamic_energy_ratio
+        recognizer.energy_threshold = recognizer.energy_threshold * damping + target * (1 - damping)
+    
+    def _wait_for_microphone(self):
+        """Block until capture is running; return the listening reader."""
+        if not self._microphone_ready.is_set():
+            print("⏳ Waiting for the microphone...")
+            self._microphone_ready.wait()
+        if self._microphone_error is not None:
+            raise self._microphone_error
+        return self._reader
+    
+    def _speech_worker(self):
+        """Speak queued utterances one at a time until shutdown."""
+        player = None
+        try:
+            if self.output is None:
+                # Imported here so loading the audio drivers doesn't hold up startup
+                import pyaudio
+                player = pyaudio.PyAudio() if self.audio_cache is not None else None
+        except Exception as e:
+            # No audio output for cached clips (e.g. a headless box); every
+            # phrase goes through the TTS engine instead of the worker dying
+            print(f"⚠️ Cached speech playback unavailable, using the TTS engine: {e}")
+            self.audio_cache = None
+        finally:
+            self._audio_ready.set()
+        
+        while True:
+            try:
+                item = self._speech_queue.get(timeout=self.RENDER_POLL_SECONDS)
+            except queue.Empty:
+                # Idle: render one pending phrase, so speech waits at most one render
+                try:
+                    self._render_next()
+                except Exception as e:
+                    # A failed render is only a cache miss; keep the worker alive
+                    print(f"⚠️ Could not render phrase: {e}")
+                continue
+            try:
+                if item is None:
+                    break
+                generation, utterance = item
+                if generation != self._generation:
+                    utterance.interrupted = True  # Flushed by barge-in
+                    continue
+                text = utterance.text
+                self._playing_generation = generation
+                self._speaking.set()
+                utterance.started = time.perf_counter()
+                try:
+                    with STAGE_SECONDS.time("speak"):
+                        if self.output is not None:
+                            self.output.say(text, lambda: generation == self._generation)
+                        else:
+                            cache = self.audio_cache
+                            path = cache.get(self._cache_key(text)) if cache is not None else None
+                            clip = self._reply_clip
+                            if path is None and clip is not None and clip[0] == text:
+                                path = clip[1]
+                            if path is None or player is None or not self._play(player, path, generation):
+                                engine = self._engine()
+                                engine.say(text)
+                                engine.runAndWait()
+                except Exception as e:
+                    # One failed phrase mustn't stop the worker, or later speech is lost
+                    print(f"❌ Error speaking: {e}")
+                utterance.finished = time.perf_counter()
+                utterance.interrupted = generation != self._generation
+            finally:
+                if self._speech_queue.empty():
+                    self._speaking.clear()
+                self._speech_queue.task_done()
+        if player is not None:
+            player.terminate()
+        if self._reply_clip is not None and os.path.exists(self._reply_clip[1]):
+            os.remove(self._reply_clip[1])
+    
+    def _engine(self):
+        """The pyttsx3 engine, created on first use by the speech worker."""
+        if self.tts_engine is None:
+            start = time.perf_counter()
+            import pyttsx3
+            engine = pyttsx3.init()
+            
+            # Configure TTS
+            if self.voice is not None:
+                engine.setProperty('voice', self.voice)
+            engine.setProperty('rate', self.rate)  # Speed of speech
+            engine.setProperty('volume', self.volume)  # Volume level
+            
+            def on_word(name, location, length):
+                # pyttsx3 must be stopped from its own thread; check between words
+                if self._playing_generation != self._generation:
+                    engine.stop()
+            
+            engine.connect('started-word', on_word)
+            self.tts_engine = engine
+            print(f"⏱️ Speech engine ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return self.tts_engine
+    
+    def _cache_key(self, text):
+        return cache_key(text, self.voice, self.rate, self.volume)
+    
+    def _render_next(self):
+        """Render the prepared reply, else the next requested phrase into the audio cache, if any."""
+        with self._reply_lock:
+            reply, self._pending_reply = self._pending_reply, None
+        if reply is not None:
+            if self.audio_cache is None or self._cache_key(reply) in self.audio_cache:
+                return
+            # Overwrites the previous reply's clip
+            self._reply_clip = None
+            path = self.audio_cache.temp_path("reply")
+            if self._render(reply, path):
+                self._reply_clip = (reply, path)
+            return
+        try:
+            text = self._render_queue.get_nowait()
+        except queue.Empty:
+            return
+        if self.audio_cache is None:
+            return  # Disabled since the phrase was queued
+        key = self._cache_key(text)
+        if key in self.audio_cache:
+            return
+        temp_path = self.audio_cache.temp_path(key)
+        if self._render(text, temp_path):
+            self.audio_cache.put(key, temp_path)
+    
+    def _render(self, text, path):
+        """
+        Synthesize text into a WAV file.
+        
+        Returns:
+            bool: False if the TTS driver can't write WAV (the audio cache is then disabled)
+        """
+        self._playing_generation = self._generation
+        engine = self._engine()
+        with STAGE_SECONDS.time("tts_render"):
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+        try:
+            # Some drivers (macOS) write AIFF, which we can't play back
+            with wave.open(path, 'rb'):
+                pass
+        except (wave.Error, EOFError, FileNotFoundError):
+            print("⚠️ TTS driver doesn't render WAV files, audio cache disabled")
+            self.audio_cache = None
+            if os.path.exists(path):
+                os.remove(path)
+            return False
+        return True
+    
+    def _play(self, player, path, generation):
+        """
+        Play a cached WAV file, stopping early on barge-in.
         
-        # Configure TTS
-        self.tts_engine.setProperty('rate', 150)  # Speed of speech
-        self.tts_engine.setProperty('volume', 0.9)  # Volume level
+        Returns:
+            bool: False if the file couldn't be played
+        """
+        try:
+            wav = wave.open(path, 'rb')
+        except (wave.Error, EOFError, FileNotFoundError):
+            return False
+        with wav:
+            stream = player.open(
+                format=player.get_format_from_width(wav.getsampwidth()),
+                channels=wav.getnchannels(),
+                rate=wav.getframerate(),
+                output=True,
+            )
+            try:
+                while generation == self._generation:
+                    data = wav.readframes(self.PLAYBACK_FRAMES)
+                    if not data:
+                        break
+                    stream.write(data)
+            finally:
+                stream.stop_stream()
+                stream.close()
+        return True
+    
+    def prepare(self, *texts):
+        """
+        Render phrases into the audio cache in the background.
         
-        # Adjust for ambient noise
-        print("Adjusting for ambient noise... Please wait.")
-        with self.microphone as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration=1)
-        print("Ready to listen!")
+        The speech worker renders them when it has nothing to say, so they
+        play without synthesis delay when spoken later. For the fixed
+        phrases, at startup; replies to partial transcripts go through
+        prepare_reply().
+        """
+        if self.audio_cache is None:
+            return
+        for text in texts:
+            self._render_queue.put(text)
+    
+    def prepare_reply(self, text):
+        """
+        Render the reply prepared from a partial transcript, ahead of the cache.
+        
+        Only the latest one is kept: it replaces a reply to an earlier partial
+        that hasn't been rendered yet, and its clip replaces the previous
+        one's instead of going into the audio cache.
+        """
+        if self.audio_cache is None:
+            return
+        with self._reply_lock:
+            self._pending_reply = text
     
-    def speak(self, text):
-        """Convert text to speech and speak it."""
+    def speak(self, text, block=False):
+        """
+        Queue text to be spoken and return without waiting for it.
+        
+        Args:
+            text: What the waitress says
+            block: Wait until everything queued so far has been spoken
+        
+        Returns:
+            Utterance: Stamped by the speech worker as it plays
+        """
         print(f"🤖 Waitress: {text}")
-        self.tts_engine.say(text)
-        self.tts_engine.runAndWait()
+        with self._reply_lock:
+            self._pending_reply = None  # The turn is over; too late to render it
+        utterance = Utterance(text)
+        self._speaking.set()
+        self._speech_queue.put((self._generation, utterance))
+        if block:
+            self.wait_until_done()
+        return utterance
+    
+    def wait_until_done(self):
+        """Block until all queued speech has finished (or been interrupted)."""
+        self._speech_queue.join()
     
-    def listen(self, timeout=5, phrase_time_limit=10):
+    def is_speaking(self):
+        """Whether speech is playing or queued."""
+        return self._speaking.is_set()
+    
+    def stop_speaking(self):
+        """Barge-in: cut off the current utterance and drop everything queued."""
+        self._generation += 1
+        while True:
+            try:
+                item = self._speech_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].interrupted = True
+            self._speech_queue.task_done()
+        self._speaking.clear()
+    
+    def audio_ended(self):
+        """Whether the microphone has run out of audio (a WAV fixture played to the end)."""
+        capture = self.capture
+        return capture is not None and capture.ring.closed
+    
+    def shutdown(self):
+        """Finish queued speech, stop the speech worker and close the microphone."""
+        self._speech_queue.put(None)
+        self._speech_thread.join()
+        if self.capture is not None:
+            self.capture.stop()
+    
+    def _record_phrase(self, reader, timeout, phrase_time_limit, on_chunk=None):
+        """
+        Record one phrase from the capture ring, interrupting speech when it starts.
+        
+        Follows sr.Recognizer.listen, but calls stop_speaking() on the first
+        loud chunk, raises the threshold for chunks captured while the
+        waitress was talking, and only counts the timeout for the others. If
+        given, on_chunk is called with each recorded chunk (pre-roll first).
+        """
+        recognizer = self.recognizer
+        seconds_per_chunk = reader.CHUNK / reader.SAMPLE_RATE
+        pause_chunks = int(recognizer.pause_threshold / seconds_per_chunk)
+        phrase_chunks = int(recognizer.phrase_threshold / seconds_per_chunk)
+        preroll_chunks = int(recognizer.non_speaking_duration / seconds_per_chunk)
+        ring = reader.capture.ring
+        
+        # Wait for speech to start
+        waited = 0.0
+        while True:
+            buffer, speaking = reader.read()
+            if buffer is None:
+                raise sr.WaitTimeoutError("audio source ended")
+            threshold = recognizer.energy_threshold * (self.barge_in_factor if speaking else 1)
+            energy = rms(buffer, reader.SAMPLE_WIDTH)
+            if energy > threshold:
+                break
+            if not speaking:
+                # Only ambient noise here; the speaker's own output would skew it
+                self._recalibrate(energy, seconds_per_chunk)
+                waited += seconds_per_chunk
+                if timeout and waited > timeout:
+                    raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+        
+        if self.barge_in and self.is_speaking():
+            print("✋ Customer started talking, stopping speech")
+            self.stop_speaking()
+        
+        # The phrase starts a little before the first loud chunk, so the first
+        # syllable isn't clipped; the pre-roll is still in the ring
+        start = max(reader.position - 1 - preroll_chunks, ring.oldest)
+        if on_chunk is not None:
+            for seq in range(start, reader.position):
+                on_chunk(ring.chunk(seq)[0])
+        
+        # Record until a long enough pause or the phrase time limit
+        loud_chunks = 1
+        quiet_chunks = 0
+        phrase_limit_chunks = int(phrase_time_limit / seconds_per_chunk) if phrase_time_limit else None
+        while quiet_chunks <= pause_chunks:
+            if phrase_limit_chunks and reader.position - start >= phrase_limit_chunks:
+                break
+            buffer, _ = reader.read()
+            if buffer is None:
+                break
+            if on_chunk is not None:
+                on_chunk(buffer)
+            if rms(buffer, reader.SAMPLE_WIDTH) > recognizer.energy_threshold:
+                loud_chunks += 1
+                quiet_chunks = 0
+            else:
+                quiet_chunks += 1
+        
+        if loud_chunks < phrase_chunks:
+            return None  # Too short to be speech (a click or a bang)
+        return sr.AudioData(ring.extract(start, reader.position), reader.SAMPLE_RATE, reader.SAMPLE_WIDTH)
+    
+    def _trim(self, audio):
+        """Cut a phrase down to its speech with the VAD; None if there is none."""
+        result = self.vad.process(
+            audio.get_raw_data(), audio.sample_rate, audio.sample_width, self.recognizer.energy_threshold
+        )
+        if result is None:
+            return None
+        if result.kept_seconds < result.input_seconds or result.sample_rate != audio.sample_rate:
+            print(f"✂️ Trimmed {result.input_seconds:.1f}s to {result.kept_seconds:.1f}s "
+                  f"at {result.sample_rate // 1000} kHz")
+        return sr.AudioData(result.audio, result.sample_rate, audio.sample_width)
+    
+    @staticmethod
+    def _partial_feeder(stream, on_partial):
+        """Chunk callback feeding a recognition stream, reporting new partials."""
+        last = [None]
+        
+        def feed(chunk):
+            # The chunk is a view into the capture ring; recognizers keep or
+            # pass on bytes
+            partial = stream.feed(bytes(chunk))
+            if partial and partial != last[0]:
+                last[0] = partial
+                on_partial(partial)
+        
+        return feed
+    
+    @contextlib.contextmanager
+    def _stage(self, name):
+        """Time a stage of listen() into STAGE_SECONDS and last_timings."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.last_timings[name] = seconds
+            STAGE_SECONDS.observe(seconds, name)
+    
+    def listen(self, timeout=5, phrase_time_limit=10, on_partial=None):
         """
         Listen for voice input and return transcribed text.
         
+        Listening may start while the waitress is still talking; the timeout
+        only runs once she has finished. The microphone stays open between
+        calls, so speech that starts before listen() is called is kept.
+        
+        With on_partial, audio is streamed to the recognizer while the
+        customer talks and on_partial(text) is called with each new partial
+        transcript, so the reply can be prepared before they finish.
+        
         Args:
             timeout: Maximum seconds to wait for speech to start
             phrase_time_limit: Maximum seconds for a phrase
-            
+            on_partial: Optional callback for partial transcripts
+        
         Returns:
             str: Transcribed text or None if no speech detected
         """
+        reader = self._wait_for_microphone()
+        self.last_recognition = None
+        self.last_timings = {}
         try:
-            with self.microphone as source:
-                print("🎤 Listening...")
-                audio = self.recognizer.listen(
-                    source, 
-                    timeout=timeout, 
-                    phrase_time_limit=phrase_time_limit
-                )
-            
-            print("🔄 Processing speech...")
+            stream = None
+            on_chunk = None
+            print("🎤 Listening...")
+            if on_partial is not None:
+                stream = self.recognition.stream(reader.SAMPLE_RATE, reader.SAMPLE_WIDTH)
+                on_chunk = self._partial_feeder(stream, on_partial)
             try:
-                # Use Google's speech recognition (works offline with fallback)
-                text = self.recognizer.recognize_google(audio, language='es-CO')
-                print(f"👤 Customer: {text}")
-                return text.lower()
-            except sr.UnknownValueError:
+                with self._stage("capture"):
+                    audio = self._record_phrase(reader, timeout, phrase_time_limit, on_chunk)
+                # When the phrase ended in the room; the reader may be behind the live audio
+                backlog = reader.capture.ring.written - reader.position
+                self.phrase_ended = time.perf_counter() - backlog * reader.CHUNK / reader.SAMPLE_RATE
+            finally:
+                self._save_threshold()
+            if audio is None:
                 print("❌ Could not understand audio")
                 return None
-            except sr.RequestError as e:
-                print(f"❌ Error with speech recognition service: {e}")
-                return None
+            
+            if self.vad is not None:
+                with self._stage("vad"):
+                    audio = self._trim(audio)
+                if audio is None:
+                    print("🔇 No speech in that sound, skipping recognition")
+                    return None
+            
+            print("🔄 Processing speech...")
+            PHRASES.inc()
+            with self._stage("recognition"):
+                if stream is not None:
+                    result = stream.finish()
+                else:
+                    result = self.recognition.recognize(audio)
+            self.last_recognition = result
+            confidence = f"{result.confidence:.2f}" if result.confidence is not None else "n/a"
+            print(f"👤 Customer: {result.text}  "
+                  f"({result.backend} {result.language}, {result.latency:.2f}s, confidence {confidence})")
+            return result.text.lower()
+        except sr.UnknownValueError:
+            UNRECOGNIZED.inc()
+            print("❌ Could not understand audio")
+            return None
+        except sr.RequestError as e:
+            RECOGNITION_ERRORS.inc()
+            print(f"❌ Error with speech recognition service: {e}")
+            return None
         except sr.WaitTimeoutError:
             print("⏱️ No speech detected within timeout")
             return None
         except Exception as e:
             print(f"❌ Error listening: {e}")
             return None
-
-
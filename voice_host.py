@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+One host driving the microphones and speakers of many tables.
+
+Each table (audio device) gets its own VoiceAgent, whose capture thread
+keeps that device's stream open, its own OrderHandler and a thread running
+its conversation. Recognition and speech synthesis for every table run on
+one shared FairPool instead of a pool per table.
+
+FairPool schedules by device: the next job comes from the device that has
+had the least worker time (so a table whose guests talk a lot doesn't get
+more than its share), each device has at most max_in_flight jobs running,
+and a recognition job that waited longer than its device's latency budget
+is dropped rather than run late (the guest is asked to repeat). A noisy
+table falls behind on its own phrases instead of delaying everyone else's.
+Synthesis is never dropped, only scheduled fairly.
+
+Devices are real microphones (sr.Microphone(device_index=...)) or WAV files
+played in real time (wav_devices.py), which is how the host is tested:
+python -m benchmarks.voice_host compares it with a plain shared pool.
+
+Usage:
+    python voice_host.py --mic 1 --mic 3:4 [--workers 4] [--budget 2.0]
+    python voice_host.py --wav table1.wav --wav table2.wav
+    python voice_host.py --list-devices
+"""
+
+import argparse
+import threading
+import time
+import wave
+from collections import deque, namedtuple
+from concurrent.futures import Future
+
+import speech_recognition as sr
+
+from order_handler import OrderHandler
+from voice_agent import VoiceAgent
+
+
+class BudgetExceeded(sr.RequestError):
+    """A job waited longer than its device's latency budget and was dropped."""
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "future", "submitted", "budgeted")
+    
+    def __init__(self, fn, args, kwargs, budgeted):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.submitted = time.perf_counter()
+        self.budgeted = budgeted
+
+
+class _DeviceQueue:
+    __slots__ = ("name", "budget", "jobs", "in_flight", "service", "done", "shed", "waits")
+    
+    def __init__(self, name, budget):
+        self.name = name
+        self.budget = budget
+        self.jobs = deque()
+        self.in_flight = 0
+        self.service = 0.0  # Worker seconds used, for fair ordering
+        self.done = 0
+        self.shed = 0
+        self.waits = deque(maxlen=1024)  # Recent queue waits, for stats()
+
+
+class _DeviceExecutor:
+    """Executor interface (submit) onto one device's queue, e.g. for MultiLanguageRecognizer."""
+    
+    def __init__(self, pool, device):
+        self.pool = pool
+        self.device = device
+    
+    def submit(self, fn, *args, **kwargs):
+        return self.pool.submit(self.device, fn, *args, **kwargs)
+
+
+class FairPool:
+    """Worker threads shared by devices, scheduled fairly and within latency budgets."""
+    
+    def __init__(self, workers=4, budget=2.0, max_in_flight=2, fair=True):
+        """
+        Args:
+            workers: Worker threads
+            budget: Seconds a budgeted job may wait before it is dropped
+                (per device overrides with add_device)
+            max_in_flight: Jobs of one device running at once
+            fair: False for a plain shared FIFO pool (no per-device order,
+                limits or budgets), for comparison
+        """
+        self.workers = workers
+        self.budget = budget
+        self.max_in_flight = max_in_flight
+        self.fair = fair
+        self._devices = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"pool-{idx}", daemon=True) for idx in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def add_device(self, name, budget=None):
+        """Register a device; returns an executor submitting to it."""
+        with self._cond:
+            self._devices[name] = _DeviceQueue(name, budget or self.budget)
+        return _DeviceExecutor(self, name)
+    
+    def submit(self, device, fn, *args, budgeted=True, **kwargs):
+        """
+        Queue fn(*args, **kwargs) for a device.
+        
+        Args:
+            budgeted: Drop the job (BudgetExceeded) if it waits longer
+                than the device's budget
+        
+        Returns:
+            concurrent.futures.Future
+        """
+        job = _Job(fn, args, kwargs, budgeted)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("pool is closed")
+            queue = self._devices[device]
+            if not queue.jobs and not queue.in_flight:
+                # A device coming back from idle keeps its lead over the busy
+                # ones (that's what puts quiet tables first), but at most
+                # one budget's worth, so a long idle spell can't be cashed in
+                # to hold the workers
+                busy = [other.service for other in self._devices.values() if other.jobs or other.in_flight]
+                if busy:
+                    queue.service = max(queue.service, min(busy) - queue.budget)
+            queue.jobs.append(job)
+            self._cond.notify()
+        return job.future
+    
+    def _next_job(self):
+        """Wait for the next job to run; None once the pool is closed."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if self.fair:
+                    ready = [q for q in self._devices.values() if q.jobs and q.in_flight < self.max_in_flight]
+                    queue = min(ready, key=lambda q: q.service, default=None)
+                else:
+                    ready = [q for q in self._devices.values() if q.jobs]
+                    queue = min(ready, key=lambda q: q.jobs[0].submitted, default=None)
+                if queue is None:
+                    self._cond.wait()
+                    continue
+                job = queue.jobs.popleft()
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                wait = time.perf_counter() - job.submitted
+                queue.waits.append(wait)
+                if self.fair and job.budgeted and wait > queue.budget:
+                    queue.shed += 1
+                    job.future.set_exception(BudgetExceeded(
+                        f"{queue.name}: waited {wait:.2f}s for a worker, over its {queue.budget:.2f}s budget"
+                    ))
+                    continue
+                queue.in_flight += 1
+                return queue, job
+    
+    def _work(self):
+        while True:
+            item = self._next_job()
+            if item is None:
+                return
+            queue, job = item
+            start = time.perf_counter()
+            try:
+                job.future.set_result(job.fn(*job.args, **job.kwargs))
+            except BaseException as e:
+                job.future.set_exception(e)
+            finally:
+                with self._cond:
+                    queue.in_flight -= 1
+                    queue.service += time.perf_counter() - start
+                    queue.done += 1
+                    self._cond.notify_all()
+    
+    def stats(self):
+        """{device: {"done", "shed", "service_s", "max_wait_s"}}"""
+        with self._cond:
+            return {
+                name: {
+                    "done": queue.done,
+                    "shed": queue.shed,
+                    "service_s": round(queue.service, 3),
+                    "max_wait_s": round(max(queue.waits, default=0.0), 3),
+                }
+                for name, queue in self._devices.items()
+            }
+    
+    def close(self):
+        """Stop the workers after the jobs running now; queued jobs are cancelled."""
+        with self._cond:
+            self._closed = True
+            for queue in self._devices.values():
+                while queue.jobs:
+                    queue.jobs.popleft().future.cancel()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+
+class SpeechRenderer:
+    """
+    pyttsx3 synthesis into the shared AudioCache, for pool workers.
+    
+    pyttsx3 keeps one engine per process and isn't thread-safe, so renders
+    take turns on a lock; rendered phrases are shared by every table.
+    """
+    
+    def __init__(self, audio_cache, voice=None, rate=150, volume=0.9):
+        self.audio_cache = audio_cache
+        self.voice = voice
+        self.rate = rate
+        self.volume = volume
+        self._engine = None
+        self._lock = threading.Lock()
+    
+    def _key(self, text):
+        from tts_cache import cache_key
+        return cache_key(text, self.voice, self.rate, self.volume)
+    
+    def cached(self, text):
+        """Path of the rendered phrase, or None."""
+        return self.audio_cache.get(self._key(text))
+    
+    def render(self, text):
+        """Render text (unless another table just did); return its WAV path."""
+        key = self._key(text)
+        with self._lock:
+            path = self.audio_cache.get(key)
+            if path is not None:
+                return path
+            if self._engine is None:
+                import pyttsx3
+                self._engine = pyttsx3.init()
+                if self.voice is not None:
+                    self._engine.setProperty('voice', self.voice)
+                self._engine.setProperty('rate', self.rate)
+                self._engine.setProperty('volume', self.volume)
+            temp_path = self.audio_cache.temp_path(key)
+            self._engine.save_to_file(text, temp_path)
+            self._engine.runAndWait()
+            self.audio_cache.put(key, temp_path)
+            return self.audio_cache.get(key)
+
+
+class DevicePlayer:
+    """Plays rendered WAV files on one output device, stopping on barge-in."""
+    
+    PLAYBACK_FRAMES = VoiceAgent.PLAYBACK_FRAMES
+    
+    def __init__(self, output_device_index=None):
+        import pyaudio
+        self.output_device_index = output_device_index
+        self._audio = pyaudio.PyAudio()
+    
+    def play(self, path, is_current):
+        with wave.open(path, 'rb') as wav:
+            stream = self._audio.open(
+                format=self._audio.get_format_from_width(wav.getsampwidth()),
+                channels=wav.getnchannels(),
+                rate=wav.getframerate(),
+                output=True,
+                output_device_index=self.output_device_index,
+            )
+            try:
+                while is_current():
+                    data = wav.readframes(self.PLAYBACK_FRAMES)
+                    if not data:
+                        return True
+                    stream.write(data)
+            finally:
+                stream.stop_stream()
+                stream.close()
+        return False
+
+
+class PooledSpeech:
+    """VoiceAgent output for one table: synthesis on the shared pool, playback on the table's speaker."""
+    
+    def __init__(self, pool, device, renderer, player):
+        self.pool = pool
+        self.device = device
+        self.renderer = renderer
+        self.player = player
+    
+    def say(self, text, is_current):
+        try:
+            clip = self.renderer.cached(text)
+            if clip is None:
+                clip = self.pool.submit(self.device, self.renderer.render, text, budgeted=False).result()
+            if is_current():
+                self.player.play(clip, is_current)
+        except Exception as e:
+            print(f"⚠️ [{self.device}] Could not speak: {e}")
+
+
+# One table's audio: an input source, a player for its speaker, and
+# optionally its own recognizer backend and latency budget
+Device = namedtuple("Device", ["name", "microphone", "player", "backend", "budget"], defaults=(None, None))
+
+
+class Table:
+    """One device's conversation: listen, take the order, answer, repeat."""
+    
+    def __init__(self, name, voice_agent, order_handler):
+        self.name = name
+        self.voice = voice_agent
+        self.order_handler = order_handler
+        self.turns = 0
+        self.latencies = []  # Seconds from the end of a phrase to its reply being queued
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"table-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+    
+    def _ended(self):
+        return self._stop.is_set() or self.voice.capture is None or self.voice.audio_ended()
+    
+    def _run(self):
+        voice = self.voice
+        try:
+            while not self._ended():
+                text = voice.listen(timeout=None, phrase_time_limit=15)
+                if text is None and self._ended():
+                    break
+                result = voice.last_recognition
+                language = result.language if result is not None else None
+                response, should_continue = self.order_handler.process_input(text, language)
+                if voice.phrase_ended is not None:
+                    self.latencies.append(time.perf_counter() - voice.phrase_ended)
+                self.turns += 1
+                voice.speak(response)
+                if not should_continue:
+                    # The next guest at this table starts a new order
+                    self.order_handler.reset()
+        except Exception as e:
+            print(f"❌ [{self.name}] Table stopped: {e}")
+    
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def stop(self):
+        self._stop.set()
+        self.voice.shutdown()
+
+
+class VoiceHost:
+    """Many tables on one host, sharing one FairPool."""
+    
+    def __init__(self, devices, renderer, workers=4, budget=2.0, fair=True, recognizer_backend=None,
+                 language=('es-CO', 'en-US'), journal=None, calibration=None, vad=None):
+        """
+        Args:
+            devices: Device tuples, one per table
+            renderer: Shared speech renderer (SpeechRenderer, or a
+                SimulatedRenderer for WAV devices)
+            workers: Shared pool threads for recognition and synthesis
+            budget: Default latency budget per device (seconds a phrase
+                may wait for recognition)
+            fair: False to use a plain FIFO pool instead (for comparison)
+            recognizer_backend: Backend for devices without their own
+            language: Recognition language(s), as for VoiceAgent
+            journal: OrderJournal shared by the tables
+            calibration: CalibrationStore shared by the tables
+            vad: VoiceActivityDetector (False disables it), as for VoiceAgent
+        """
+        self.devices = list(devices)
+        self.renderer = renderer
+        # A table runs at most one recognition job per language and one
+        # synthesis job at once; a reply being rendered doesn't hold up the
+        # next phrase
+        languages = 1 if isinstance(language, str) else len(language)
+        self.pool = FairPool(workers, budget, max_in_flight=languages + 1, fair=fair)
+        self.recognizer_backend = recognizer_backend
+        self.language = language
+        self.journal = journal
+        self.calibration = calibration
+        self.vad = vad
+        self.tables = []
+    
+    def start(self):
+        """Open every device (one at a time: PortAudio setup isn't thread-safe) and start the tables."""
+        for device in self.devices:
+            executor = self.pool.add_device(device.name, device.budget)
+            order_handler = OrderHandler(journal=self.journal)
+            voice_agent = VoiceAgent(
+                recognizer_backend=device.backend or self.recognizer_backend,
+                language=self.language,
+                calibration=self.calibration,
+                vad=self.vad,
+                scorer=order_handler.match_score,
+                microphone=device.microphone,
+                executor=executor,
+                output=PooledSpeech(self.pool, device.name, self.renderer, device.player),
+            )
+            try:
+                voice_agent.wait_until_ready()
+            except Exception as e:
+                print(f"❌ [{device.name}] Microphone failed to open: {e}")
+                voice_agent.shutdown()
+                continue
+            self.tables.append(Table(device.name, voice_agent, order_handler).start())
+        print(f"🎙️ Serving {len(self.tables)} table(s) with {self.pool.workers} shared worker(s)")
+        return self
+    
+    def join(self):
+        """Wait until every table's audio has ended."""
+        for table in self.tables:
+            table.join()
+    
+    def stop(self, timeout=5.0):
+        """Stop the tables (finishing what they're saying), then the pool."""
+        for table in self.tables:
+            table.stop()
+        for table in self.tables:
+            table.join(timeout)
+        self.pool.close()
+    
+    def stats(self):
+        """Per table: turns, reply latency p50/p99 (ms) and the pool's counters."""
+        pool = self.pool.stats()
+        stats = {}
+        for table in self.tables:
+            latencies = sorted(table.latencies)
+            stats[table.name] = {
+                "turns": table.turns,
+                "p50_ms": _percentile(latencies, 0.50) * 1e3,
+                "p99_ms": _percentile(latencies, 0.99) * 1e3,
+                **pool.get(table.name, {}),
+            }
+        return stats
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+
+def _parse_mic(spec):
+    """"3" or "3:4" -> (input index, output index or None)."""
+    input_index, _, output_index = spec.partition(":")
+    return int(input_index), int(output_index) if output_index else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Luisquisite: many tables from one host")
+    parser.add_argument("--mic", action="append", default=[], metavar="IN[:OUT]",
+                        help="input device index, optionally with an output device index")
+    parser.add_argument("--wav", action="append", default=[], metavar="FILE",
+                        help="simulated table: a WAV recording played in real time, replies not played")
+    parser.add_argument("--workers", type=int, default=4, help="shared recognition/synthesis threads")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds a phrase may wait for recognition")
+    parser.add_argument("--list-devices", action="store_true")
+    args = parser.parse_args()
+    
+    if args.list_devices:
+        for index, name in enumerate(sr.Microphone.list_microphone_names()):
+            print(f"{index:>3}  {name}")
+        return
+    if not args.mic and not args.wav:
+        parser.error("give at least one --mic or --wav device")
+    
+    from order_journal import OrderJournal
+    from tts_cache import AudioCache
+    from wav_devices import SimulatedRenderer, SimulatedSpeaker, WavMicrophone
+    
+    devices = []
+    for spec in args.mic:
+        input_index, output_index = _parse_mic(spec)
+        devices.append(Device(f"mic-{input_index}", sr.Microphone(device_index=input_index),
+                              DevicePlayer(output_index)))
+    for path in args.wav:
+        microphone = WavMicrophone(path)
+        devices.append(Device(microphone.device_name, microphone, SimulatedSpeaker()))
+    renderer = SpeechRenderer(AudioCache()) if args.mic else SimulatedRenderer()
+    
+    journal = OrderJournal()
+    host = VoiceHost(devices, renderer, workers=args.workers, budget=args.budget, journal=journal).start()
+    try:
+        host.join()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down...")
+    finally:
+        host.stop()
+        journal.close()
+        for name, stats in host.stats().items():
+            print(f"📊 {name}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
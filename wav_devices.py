@@ -0,0 +1,177 @@
+"""
+Simulated audio devices for running the voice agent without hardware.
+
+WavMicrophone is an sr.AudioSource that plays a WAV file into whatever
+reads it as if a guest were talking into a microphone: a chunk can be read
+once it has been "spoken", in real time or sped up. SimulatedSpeaker and
+SimulatedRenderer stand in for the sound card and the speech engine, taking
+as long as speaking and synthesizing a reply would. write_phrases() writes
+WAV fixtures of speech-like bursts between stretches of room noise.
+
+Used by voice_host.py and the voice benchmarks (benchmarks/voice_host.py,
+benchmarks/voice_pipeline.py) to run the voice path without hardware.
+"""
+
+import array
+import math
+import os
+import random
+import sys
+import threading
+import time
+import wave
+
+import speech_recognition as sr
+
+
+class WavMicrophone(sr.AudioSource):
+    """sr.Microphone stand-in that plays a 16-bit mono WAV file."""
+    
+    def __init__(self, path, device_name=None, chunk_size=1024, speed=1.0):
+        """
+        Args:
+            path: WAV file (16-bit mono PCM)
+            device_name: Name reported as the device (calibration key);
+                defaults to the file name
+            chunk_size: Frames per read, like sr.Microphone's
+            speed: How many times faster than real time the audio arrives;
+                None delivers it as fast as it is read
+        """
+        with wave.open(path, "rb") as wav:
+            if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected 16-bit mono audio")
+            self.SAMPLE_RATE = wav.getframerate()
+            self._frames = wav.readframes(wav.getnframes())
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = chunk_size
+        self.path = path
+        self.device_name = device_name or os.path.basename(path)
+        self.speed = speed
+        self.stream = None
+    
+    @property
+    def seconds(self):
+        return len(self._frames) / (self.SAMPLE_RATE * self.SAMPLE_WIDTH)
+    
+    def __enter__(self):
+        # Like a real microphone, the audio carries on between opens
+        if self.stream is None:
+            self.stream = _WavStream(self)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class _WavStream:
+    """Reads of a WavMicrophone, released at the pace the audio was recorded."""
+    
+    def __init__(self, microphone):
+        self.microphone = microphone
+        self.position = 0  # Bytes read so far
+        self.started = None
+        self._lock = threading.Lock()
+    
+    def read(self, frames):
+        """The next frames of audio once they've been spoken; b"" at the end of the file."""
+        microphone = self.microphone
+        with self._lock:
+            start = self.position
+            data = microphone._frames[start:start + frames * microphone.SAMPLE_WIDTH]
+            self.position += len(data)
+            if self.started is None:
+                self.started = time.perf_counter()
+            if not microphone.speed:
+                return data
+            spoken = self.position / (microphone.SAMPLE_RATE * microphone.SAMPLE_WIDTH)
+            due = self.started + spoken / microphone.speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return data
+    
+    def close(self):
+        pass
+
+
+class SimulatedSpeaker:
+    """
+    Speech output that takes as long as speaking the text would, and stops on barge-in.
+    
+    Plays clips for PooledSpeech (voice_host.py), or is a VoiceAgent output
+    on its own (say()).
+    """
+    
+    def __init__(self, chars_per_second=15.0):
+        self.chars_per_second = chars_per_second
+        self.spoken = 0
+    
+    def say(self, text, is_current):
+        return self.play(text, is_current)
+    
+    def play(self, clip, is_current):
+        """Play a clip from a renderer (here, the text itself)."""
+        end = time.perf_counter() + len(clip) / self.chars_per_second
+        while is_current():
+            remaining = end - time.perf_counter()
+            if remaining <= 0:
+                self.spoken += 1
+                return True
+            time.sleep(min(remaining, 0.05))
+        return False
+
+
+class SimulatedRenderer:
+    """Speech synthesis stand-in: takes seconds_per_char per character, remembers what it rendered."""
+    
+    def __init__(self, seconds_per_char=0.002):
+        self.seconds_per_char = seconds_per_char
+        self._rendered = set()
+        self._lock = threading.Lock()
+    
+    def cached(self, text):
+        """The clip for text if it was rendered before, else None."""
+        return text if text in self._rendered else None
+    
+    def render(self, text):
+        time.sleep(len(text) * self.seconds_per_char)
+        with self._lock:
+            self._rendered.add(text)
+        return text
+
+
+def write_phrases(path, phrases, sample_rate=16000, noise=40, seed=0):
+    """
+    Write a WAV fixture of speech-like bursts separated by room noise.
+    
+    Args:
+        path: WAV file to write (16-bit mono)
+        phrases: Sequence of (seconds of noise before, seconds of speech)
+        sample_rate: Samples per second
+        noise: Amplitude of the room noise
+        seed: Seed for the noise
+    
+    Returns:
+        float: Length of the file in seconds
+    """
+    rng = random.Random(seed)
+    samples = array.array("h")
+    for silence, speech in phrases:
+        samples.extend(int(rng.gauss(0, noise)) for _ in range(int(silence * sample_rate)))
+        # A 140 Hz voice with two harmonics, its loudness rising and
+        # falling with the syllables (about four a second)
+        step = 2 * math.pi / sample_rate
+        for n in range(int(speech * sample_rate)):
+            envelope = 0.7 + 0.3 * math.sin(4 * step * n)
+            voice = math.sin(140 * step * n) + 0.5 * math.sin(280 * step * n) + 0.25 * math.sin(420 * step * n)
+            samples.append(int(5000 * envelope * voice + rng.gauss(0, noise)))
+    # Trailing noise, so the last phrase ends with a pause
+    samples.extend(int(rng.gauss(0, noise)) for _ in range(sample_rate))
+    if sys.byteorder == "big":
+        samples.byteswap()  # WAV is little-endian
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return len(samples) / sample_rate
@@ -0,0 +1,164 @@
+"""
+Per-browser-session state for the Streamlit app, with bounded memory.
+
+Each session keeps its OrderHandler and a ConversationHistory that holds
+only the newest messages in memory and appends older ones to a JSON-lines
+archive on disk, which is deleted along with the session. Sessions register
+in a process-wide WeakValueDictionary, so the app can report how many are
+alive and what they cost without keeping closed sessions around.
+"""
+
+import json
+import os
+import sys
+import uuid
+import weakref
+from collections import deque, namedtuple
+
+from order_handler import OrderHandler
+
+
+Message = namedtuple("Message", ["kind", "text", "html"])
+
+DEFAULT_HISTORY_DIR = ".history"
+
+
+def _remove_archive(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ConversationHistory:
+    """
+    Conversation messages, the newest `capacity` in memory and the rest on disk.
+    
+    Messages are numbered from 0 in the order they were added; get(start, end)
+    serves any range, reading from the archive for spilled messages.
+    """
+    
+    def __init__(self, session_id, capacity=200, archive_dir=None, render=None):
+        """
+        Args:
+            session_id: Names the archive file
+            capacity: Messages kept in memory
+            archive_dir: Archive directory; defaults to LUISQUISITE_HISTORY_DIR,
+                then .history
+            render: Callable (kind, text, index) -> html, to rebuild the HTML
+                of archived messages (only kind and text are archived)
+        """
+        self.capacity = capacity
+        self.archive_dir = archive_dir or os.environ.get("LUISQUISITE_HISTORY_DIR", DEFAULT_HISTORY_DIR)
+        self.archive_path = os.path.join(self.archive_dir, f"{session_id}.jsonl")
+        self.render = render
+        self.archived = 0  # Messages spilled to disk
+        self._recent = deque()
+        # The archive goes when the history is collected (a session Streamlit
+        # dropped) or the process exits, so disk use stays bounded like memory
+        weakref.finalize(self, _remove_archive, self.archive_path)
+    
+    def __len__(self):
+        return self.archived + len(self._recent)
+    
+    def __bool__(self):
+        return len(self) > 0
+    
+    def append(self, kind, text, html=None):
+        if len(self._recent) >= self.capacity:
+            self._spill(self._recent.popleft())
+        self._recent.append(Message(kind, text, html))
+    
+    def _spill(self, message):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with open(self.archive_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps([message.kind, message.text], ensure_ascii=False) + "\n")
+        self.archived += 1
+    
+    def get(self, start, end):
+        """Messages start..end-1 (clamped to what exists)."""
+        start = max(0, start)
+        end = min(end, len(self))
+        messages = []
+        if start < self.archived:
+            messages.extend(self._read_archive(start, min(end, self.archived)))
+        first_recent = max(start, self.archived) - self.archived
+        last_recent = end - self.archived
+        for offset in range(first_recent, last_recent):
+            messages.append(self._recent[offset])
+        return messages
+    
+    def _read_archive(self, start, end):
+        messages = []
+        with open(self.archive_path, encoding="utf-8") as f:
+            for index, line in enumerate(f):
+                if index >= end:
+                    break
+                if index >= start:
+                    kind, text = json.loads(line)
+                    html = self.render(kind, text, index) if self.render else None
+                    messages.append(Message(kind, text, html))
+        return messages
+    
+    def clear(self):
+        """Forget the conversation, including its archive."""
+        self._recent.clear()
+        self.archived = 0
+        _remove_archive(self.archive_path)
+    
+    def memory_bytes(self):
+        """Approximate bytes held in memory (messages and their strings)."""
+        size = sys.getsizeof(self._recent)
+        for message in self._recent:
+            size += sys.getsizeof(message) + sum(sys.getsizeof(part) for part in message if part is not None)
+        return size
+
+
+# Live sessions in this process; entries vanish when Streamlit drops a session
+_SESSIONS = weakref.WeakValueDictionary()
+
+
+class WebSession:
+    """One browser session: its order handler and conversation."""
+    
+    def __init__(self, matcher=None, history_capacity=200, render=None, journal=None):
+        self.session_id = uuid.uuid4().hex
+        self.handler = OrderHandler(matcher, journal)
+        self.history = ConversationHistory(self.session_id, capacity=history_capacity, render=render)
+        _SESSIONS[self.session_id] = self
+    
+    def memory_bytes(self):
+        """Approximate bytes this session holds beyond the shared resources."""
+        order = self.handler.current_order
+        # An empty order is the shared EMPTY_ORDER
+        order_bytes = sys.getsizeof(order) if order else 0
+        return sys.getsizeof(self) + sys.getsizeof(self.handler) + order_bytes + self.history.memory_bytes()
+
+
+def process_rss_bytes():
+    """Resident memory of this process (current on Linux, peak elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def memory_report():
+    """
+    Per-process session memory metrics.
+    
+    Returns:
+        dict: sessions, session_bytes (total), bytes_per_session, process_rss
+    """
+    sessions = list(_SESSIONS.values())
+    total = sum(session.memory_bytes() for session in sessions)
+    return {
+        "sessions": len(sessions),
+        "session_bytes": total,
+        "bytes_per_session": total / len(sessions) if sessions else 0,
+        "process_rss": process_rss_bytes(),
+    }